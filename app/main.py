@@ -1,22 +1,152 @@
-from fastapi import FastAPI
-from src.api.pydantic_models import BaseModel
-from src.predict import load_model, run_predictions
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from src.api.micro_batcher import MicroBatcher
+from src.feature_schema import FeatureSchema, schema_for
+from src.predict import MODEL_PATHS, get_model, registry, run_batch_predictions, served_versions
+from src.utils.config import load_config
+from src.utils.metrics import metrics
+from src.feature_store import AGGREGATE_COLUMNS, STORE_PATH, shared_store
+import threading
+import time
+from contextlib import asynccontextmanager
 import numpy as np
-import pandas as pd
-import joblib
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Dict, List, Optional, Union
+
+# Startup state reported by /ready
+readiness = {"ready": False, "error": None, "startup_seconds": None}
+
+
+def warm_up():
+    """
+    Load every serving artifact exactly once (models, preprocessing tables,
+    feature schema) so the first request does not pay for it.
+    """
+    start = time.perf_counter()
+    try:
+        for name in MODEL_PATHS:
+            try:
+                get_model(name)
+            except FileNotFoundError as e:
+                print(f"[WARN] {e}")
+        # Fail if the request model no longer covers the model's features
+        get_schema().check_fields(CreditRequest.model_fields)
+    except Exception as e:
+        readiness["error"] = f"{type(e).__name__}: {e}"
+        raise
+    readiness["startup_seconds"] = round(time.perf_counter() - start, 4)
+    readiness["ready"] = True
+    print(f"[✓] Serving artifacts loaded in {readiness['startup_seconds']}s")
+
+
+def snapshot_customer_store(stop, interval_s):
+    """
+    Save the online customer store every ``interval_s`` seconds while it
+    takes updates, and once more when ``stop`` is set (shutdown).
+    """
+    while True:
+        stopping = stop.wait(interval_s)
+        if customer_store.updates != customer_store.saved_updates:
+            customer_store.save(STORE_PATH)
+            print(f"[INFO] Customer feature store snapshot saved to: {STORE_PATH}")
+        if stopping:
+            return
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm up in the background: the server accepts requests (and answers
+    # liveness checks) immediately, /ready turns 200 once loading is done
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    stop = threading.Event()
+    interval_s = load_config().get("serving", {}).get("feature_store", {}).get("snapshot_interval_s", 300)
+    snapshots = threading.Thread(
+        target=snapshot_customer_store, args=(stop, interval_s), name="store-snapshots", daemon=True
+    )
+    snapshots.start()
+    yield
+    stop.set()
+    await run_in_threadpool(snapshots.join)
+
 
 # Initialize FastAPI app
-app = FastAPI(title="Credit Scoring API")
+app = FastAPI(title="Credit Scoring API", lifespan=lifespan)
+
+
+class LatencyMiddleware:
+    """
+    Plain ASGI middleware timing every HTTP request into the "request" histogram.
+    The arrival time is kept in the scope so handlers can time body parsing.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = scope["received_at"] = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Route template, not the raw path, to keep label cardinality bounded
+            path = getattr(scope.get("route"), "path", "unmatched")
+            metrics.observe("request", time.perf_counter() - start, path=path)
+
+
+app.add_middleware(LatencyMiddleware)
+
+
+def observe_parse(http_request: Request):
+    """Record the time from arrival to handler entry (body parsing and validation)."""
+    metrics.observe("parse", time.perf_counter() - http_request.scope["received_at"], path=http_request.url.path)
+
+
+_explanation_service = []
+
+
+def get_explanation_service():
+    """
+    SHAP explainers, built once per model version, with an LRU cache of
+    explained rows. Imported on first use: scoring never needs it.
+    """
+    if not _explanation_service:
+        from src.explain import ExplanationService
+        _explanation_service.append(ExplanationService(registry))
+    return _explanation_service[0]
+
+
+# Online per-customer aggregates, seeded from the process_data snapshot; the
+# same live object the preprocessing pipeline's aggregate stage reads
+customer_store = shared_store(STORE_PATH)
 
-# Load trained model at startup
-model = load_model("models/logreg_best.pkl")
 
 @app.get("/")
 def home():
     return {"message": "Credit Scoring API is running!"}
 
+
+@app.get("/ready")
+def ready():
+    """Readiness: 200 once every serving artifact is loaded, 503 before."""
+    if not readiness["ready"]:
+        raise HTTPException(status_code=503, detail=readiness["error"] or "Loading models")
+    return {"ready": True, "startup_seconds": readiness["startup_seconds"]}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Per-stage and per-model latency quantiles in Prometheus text format."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/models")
+def models():
+    """Versions of the artifacts the models are currently served from."""
+    return served_versions()
+
+
 # Define the request model
 class CreditRequest(BaseModel):
     countrycode: str
@@ -29,101 +159,358 @@ class CreditRequest(BaseModel):
     transaction_day: int
     transaction_month: int
     transaction_year: int
-    total_amount: float
-    average_amount: float
-    transaction_count: int
-    amount_std: float
-    productcategory_data_bundles: int
-    productcategory_financial_services: int
-    productcategory_movies: int
-    productcategory_other: int
-    productcategory_ticket: int
-    productcategory_transport: int
-    productcategory_tv: int
-    productcategory_utility_bill: int
+    # Customer aggregates: looked up from the feature store by customerid when omitted
+    total_amount: Optional[float] = None
+    average_amount: Optional[float] = None
+    transaction_count: Optional[int] = None
+    amount_std: Optional[float] = None
+    # Product category: the raw label (expanded on the fitted one-hot layout),
+    # or the one-hot flags themselves
+    productcategory: Optional[str] = None
+    productcategory_data_bundles: Optional[int] = None
+    productcategory_financial_services: Optional[int] = None
+    productcategory_movies: Optional[int] = None
+    productcategory_other: Optional[int] = None
+    productcategory_ticket: Optional[int] = None
+    productcategory_transport: Optional[int] = None
+    productcategory_tv: Optional[int] = None
+    productcategory_utility_bill: Optional[int] = None
     fraudresult: Optional[int] = None  # Add this field
     pricingstrategy: Optional[str] = None  # Add this field
+    customerid: Optional[str] = None
+
+
+PRODUCT_CATEGORY_COLUMNS = [name for name in CreditRequest.model_fields if name.startswith("productcategory_")]
+
+
+def check_product_category(request: CreditRequest) -> None:
+    """Reject requests with neither a productcategory nor all of its one-hot flags."""
+    if request.productcategory is None and any(getattr(request, col) is None for col in PRODUCT_CATEGORY_COLUMNS):
+        raise HTTPException(
+            status_code=422,
+            detail=f"Provide productcategory or all of {PRODUCT_CATEGORY_COLUMNS}",
+        )
+
 
 # Define the response model
 class CreditResponse(BaseModel):
     probability_of_default: float
     prediction: str
 
-# Load your model (update with your model's path)
-model = joblib.load("models/logreg_best.pkl")
-
-
-
-@app.post("/predict", response_model=CreditResponse)
-def predict(request: CreditRequest):
-    # Prepare features for prediction
-    features = pd.DataFrame([{
-        "countrycode": request.countrycode,
-        "providerid": request.providerid,
-        "productid": request.productid,
-        "channelid": request.channelid,
-        "amount": request.amount,
-        "value": request.value,
-        "transaction_hour": request.transaction_hour,
-        "transaction_day": request.transaction_day,
-        "transaction_month": request.transaction_month,
-        "transaction_year": request.transaction_year,
-        "total_amount": request.total_amount,
-        "average_amount": request.average_amount,
-        "transaction_count": request.transaction_count,
-        "amount_std": request.amount_std,
-        "fraudresult": request.fraudresult,  # Include this field
-        "pricingstrategy": request.pricingstrategy,  # Include this field
-        "productcategory_data_bundles": request.productcategory_data_bundles,
-        "productcategory_financial_services": request.productcategory_financial_services,
-        "productcategory_movies": request.productcategory_movies,
-        "productcategory_other": request.productcategory_other,
-        "productcategory_ticket": request.productcategory_ticket,
-        "productcategory_transport": request.productcategory_transport,
-        "productcategory_tv": request.productcategory_tv,
-        "productcategory_utility_bill": request.productcategory_utility_bill,
-    }])
-
-    # Ensure the order of features matches the training data
-    feature_order = [
-        "countrycode",
-        "providerid",
-        "productid",
-        "channelid",
-        "amount",
-        "value",
-        "pricingstrategy",
-        "fraudresult",
-        "transaction_hour",
-        "transaction_day",
-        "transaction_month",
-        "transaction_year",
-        "total_amount",
-        "average_amount",
-        "transaction_count",
-        "amount_std",
-        "productcategory_data_bundles",
-        "productcategory_financial_services",
-        "productcategory_movies",
-        "productcategory_other",
-        "productcategory_ticket",
-        "productcategory_transport",
-        "productcategory_tv",
-        "productcategory_utility_bill",
+
+class PredictResponse(CreditResponse):
+    model_used: str  # "ensemble", or the fallback model when over the latency budget
+    details: Dict[str, Any]
+
+
+class CustomerTransaction(BaseModel):
+    amount: float
+
+
+class CustomerFeatures(BaseModel):
+    customerid: str
+    total_amount: float
+    average_amount: float
+    transaction_count: int
+    amount_std: float
+
+
+def get_schema() -> FeatureSchema:
+    """
+    Serving column layout, derived once per loaded model from its
+    ``feature_names_in_`` (categorical tables from the fitted pipeline).
+    """
+    from src.data_processing import preprocessors
+
+    model = get_model("logreg")
+    try:
+        pipeline = preprocessors.get("preprocessor")
+    except FileNotFoundError:
+        pipeline = None
+    return schema_for(model, pipeline)
+
+
+# Columnar batch body: one list of values per feature
+class ColumnarCreditRequest(BaseModel):
+    columns: Dict[str, List[Any]]
+
+
+class BatchCreditResponse(BaseModel):
+    model_used: str
+    results: List[CreditResponse]
+
+
+def build_batch_features(columns: Dict[str, Any]) -> np.ndarray:
+    """
+    Build one float32 feature matrix, in model column order, from columnar input.
+    Optional fields that are absent are imputed like in /predict.
+    """
+    schema = get_schema()
+    optional = {"fraudresult", "pricingstrategy"}
+    if "customerid" in columns:
+        optional.update(AGGREGATE_COLUMNS)
+    missing = [
+        col for col in schema.feature_names
+        if col not in columns and col not in optional and schema.one_hot_sources.get(col) not in columns
     ]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Missing feature columns: {missing}")
+
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise HTTPException(status_code=422, detail="All feature columns must have the same length")
+    n_rows = lengths.pop() if lengths else 0
+
+    try:
+        features = schema.from_columns(columns, n_rows)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid feature value: {e}")
+    return finish_features(features, columns.get("customerid"))
+
+
+def encode_request(request: CreditRequest, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Raw float32 feature row of one request; 422 if a field cannot be encoded.
+    """
+    check_product_category(request)
+    try:
+        return get_schema().row(request, out=out)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid feature value: {e}")
+
+
+def finish_features(features: np.ndarray, customer_ids) -> np.ndarray:
+    """
+    Fill omitted aggregates from the store, then impute and scale the raw rows
+    like the training pipeline's output.
+    """
+    features = fill_customer_aggregates(features, customer_ids)
+    return get_schema().normalize(features)
+
+
+def build_request_features(requests: List[CreditRequest]) -> np.ndarray:
+    """
+    Float32 feature matrix for CreditRequest objects, without building a DataFrame.
+    """
+    features = np.empty((len(requests), get_schema().n_features), dtype=np.float32)
+    for r, request in enumerate(requests):
+        encode_request(request, out=features[r])
+    return finish_features(features, [item.customerid for item in requests])
+
+
+def fill_customer_aggregates(features: np.ndarray, customer_ids) -> np.ndarray:
+    """
+    Fill rows whose aggregate features were omitted from the customer feature store.
+    """
+    columns = [get_schema().index[col] for col in AGGREGATE_COLUMNS]
+    missing = np.isnan(features[:, columns]).any(axis=1)
+    if not missing.any():
+        return features
+
+    if customer_ids is None:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Provide {AGGREGATE_COLUMNS} or a customerid to look them up",
+        )
+    customer_ids = np.asarray(customer_ids, dtype=object)
+    if any(value is None or value != value for value in customer_ids[missing]):
+        raise HTTPException(status_code=422, detail="customerid is required when aggregates are omitted")
+
+    stats = customer_store.lookup(customer_ids[missing])
+    rows = np.flatnonzero(missing)
+    for col, i in zip(AGGREGATE_COLUMNS, columns):
+        features[rows, i] = stats[col]
+    return features
+
+
+def score_batch(features: np.ndarray, budget_ms: Optional[float] = None) -> BatchCreditResponse:
+    if len(features) == 0:
+        return BatchCreditResponse(model_used="ensemble", results=[])
+
+    # One predict_proba call per model for the whole batch, models in parallel
+    results = run_batch_predictions(model_choice="both", features=features, budget_ms=budget_ms)
+
+    with metrics.timer("serialize"):
+        probabilities = results["ensemble_risk_probability"]
+        predictions = results["ensemble_prediction"]
+        return BatchCreditResponse(
+            model_used=results["model_used"],
+            results=[
+                CreditResponse(
+                    probability_of_default=float(proba),
+                    prediction="default" if pred == 1 else "no default",
+                )
+                for proba, pred in zip(probabilities.tolist(), predictions.tolist())
+            ],
+        )
+
+
+def score_requests(items) -> List[Dict[str, Any]]:
+    """
+    Score a micro-batch of (/predict request, raw feature row, latency budget)
+    items with one call per model. Rows were encoded (and validated) by the
+    handlers; the batch runs under the tightest budget among its requests.
+    """
+    requests = [request for request, _, _ in items]
+    budgets = [budget for _, _, budget in items if budget is not None]
+    with metrics.timer("feature_build"):
+        features = finish_features(np.vstack([row for _, row, _ in items]), [item.customerid for item in requests])
+    results = run_batch_predictions(model_choice="both", features=features,
+                                    budget_ms=min(budgets) if budgets else None)
+    with metrics.timer("serialize"):
+        shared = {key: value for key, value in results.items() if not isinstance(value, np.ndarray)}
+        columns = {key: value.tolist() for key, value in results.items() if isinstance(value, np.ndarray)}
+        return [{**{key: values[i] for key, values in columns.items()}, **shared} for i in range(len(requests))]
+
+
+# Concurrent /predict calls are coalesced into vectorized batches
+serving_config = load_config().get("serving", {}).get("batching", {})
+predict_batcher = MicroBatcher(
+    score_requests,
+    max_batch_size=serving_config.get("max_batch_size", 64),
+    max_wait_ms=serving_config.get("max_wait_ms", 2.0),
+)
 
-    # Reorder the DataFrame columns to match the training data
-    features = features[feature_order]
+
+@app.post("/predict", response_model=PredictResponse)
+async def predict(request: CreditRequest, http_request: Request, budget_ms: Optional[float] = None):
+    """
+    Ensemble risk of one applicant.
+
+    Args:
+        budget_ms: Latency budget; if the slower models miss it the fallback
+            model (logreg) answers alone (default: serving.ensemble config).
+    """
+    observe_parse(http_request)
+
+    # Reject here what would otherwise fail the whole micro-batch
+    if request.customerid is None and any(getattr(request, col) is None for col in AGGREGATE_COLUMNS):
+        raise HTTPException(
+            status_code=422,
+            detail=f"Provide {AGGREGATE_COLUMNS} or a customerid to look them up",
+        )
+    row = encode_request(request)
 
     # Make prediction
-    results = run_predictions(model_choice="both", features=features)
+    results = await predict_batcher.submit((request, row, budget_ms))
 
     return {
-        "model_used": "logreg",  # Example: specify which model was used
-        "probability_of_default": results.get("logreg_risk_probability", 0),
-        "prediction": "default" if results.get("logreg_prediction", 0) == 1 else "no default",
-        "details": results  # Include more details if needed
+        "model_used": results["model_used"],
+        "probability_of_default": results["ensemble_risk_probability"],
+        "prediction": "default" if results["ensemble_prediction"] == 1 else "no default",
+        "details": results,
     }
+
+
+@app.get("/customers/{customer_id}/features", response_model=CustomerFeatures)
+def customer_features(customer_id: str):
+    """Current aggregate features of a customer from the online store."""
+    stats = customer_store.get(customer_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail=f"Unknown customer: {customer_id}")
+    return CustomerFeatures(customerid=customer_id, **stats)
+
+
+@app.post("/customers/{customer_id}/transactions", response_model=CustomerFeatures)
+def add_customer_transaction(customer_id: str, transaction: CustomerTransaction):
+    """Record a new transaction (O(1) update) and return the updated aggregates."""
+    customer_store.update(customer_id, transaction.amount)
+    return CustomerFeatures(customerid=customer_id, **customer_store.get(customer_id))
+
+
+@app.post("/predict/batch", response_model=BatchCreditResponse)
+def predict_batch(request: Union[List[CreditRequest], ColumnarCreditRequest], http_request: Request,
+                  budget_ms: Optional[float] = None):
+    """
+    Score many applicants in one call.
+
+    Accepts either a JSON list of CreditRequest objects or a columnar body
+    ``{"columns": {"amount": [...], ...}}``.
+    """
+    observe_parse(http_request)
+    with metrics.timer("feature_build"):
+        if isinstance(request, ColumnarCreditRequest):
+            features = build_batch_features(request.columns)
+        else:
+            features = build_request_features(request)
+    return score_batch(features, budget_ms=budget_ms)
+
+
+@app.post("/predict/batch/arrow", response_model=BatchCreditResponse)
+async def predict_batch_arrow(request: Request):
+    """
+    Score a batch sent as an Arrow IPC stream
+    (``Content-Type: application/vnd.apache.arrow.stream``).
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPException(status_code=501, detail="pyarrow is not installed")
+
+    body = await request.body()
+    start = time.perf_counter()
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except pa.ArrowInvalid as e:
+        raise HTTPException(status_code=400, detail=f"Invalid Arrow stream: {e}")
+
+    columns = {
+        name: table.column(name).to_numpy(zero_copy_only=False)
+        for name in table.column_names
+    }
+    metrics.observe("parse", time.perf_counter() - start, path=request.url.path)
+
+    with metrics.timer("feature_build"):
+        features = build_batch_features(columns)
+    # Scoring is CPU-bound: keep it off the event loop
+    return await run_in_threadpool(score_batch, features)
+
+
+class ExplainResponse(BaseModel):
+    model_used: str
+    model_version: str
+    output: str  # "log_odds" (logreg) or "probability" (random_forest)
+    expected_value: float
+    contributions: List[Dict[str, float]]
+
+
+@app.post("/explain", response_model=ExplainResponse)
+def explain(request: Union[List[CreditRequest], CreditRequest], model: str = "logreg"):
+    """
+    Per-feature SHAP contributions for one or many applicants.
+
+    Args:
+        model: "logreg" (exact linear SHAP) or "random_forest" (tree SHAP).
+    """
+    if model not in ("logreg", "random_forest"):
+        raise HTTPException(status_code=422, detail=f"Unknown model: {model}")
+    requests = request if isinstance(request, list) else [request]
+    if not requests:
+        raise HTTPException(status_code=422, detail="No applicants to explain")
+
+    schema = get_schema()
+    features = build_request_features(requests)
+    try:
+        # Columns in the explained model's own order
+        names = getattr(registry.get(model), "feature_names_in_", None)
+        feature_names = [str(name) for name in names] if names is not None else schema.feature_names
+        if feature_names != schema.feature_names:
+            features = features[:, [schema.index[name] for name in feature_names]]
+        result = get_explanation_service().explain(model, features)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ImportError:
+        raise HTTPException(status_code=501, detail="shap is not installed")
+
+    return ExplainResponse(
+        model_used=model,
+        model_version=result["version"],
+        output=result["output"],
+        expected_value=result["expected_value"],
+        contributions=[dict(zip(feature_names, row)) for row in result["values"].tolist()],
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="127.0.0.1", port=8000)
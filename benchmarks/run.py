@@ -0,0 +1,422 @@
+"""
+Benchmark suite: times and memory-profiles the processing, training,
+evaluation and serving paths on synthetic data, and writes the results as
+JSON so runs can be compared across commits.
+
+    python -m benchmarks.run --rows 10000 100000
+    python -m benchmarks.run --compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import contextlib
+import copy
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from benchmarks.synthetic import write_transactions
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+
+
+# ===== Measurement =====
+
+def measure(name, fn, rows=None, trace_memory=True, **extra):
+    """
+    Run ``fn`` once and record wall time and (optionally) tracemalloc peak.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            fn()
+    finally:
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+    result = {'name': name, 'rows': rows, 'seconds': round(seconds, 4)}
+    if peak is not None:
+        result['peak_mb'] = round(peak / 2 ** 20, 2)
+    result.update(extra)
+    print(f"[INFO] {name} (rows={rows}): {seconds:.3f}s"
+          + (f", peak {result['peak_mb']} MB" if peak is not None else ''))
+    return result
+
+
+def measure_latency(name, fn, repeat, rows=None, **extra):
+    """
+    Call ``fn`` ``repeat`` times and record per-call latency percentiles.
+    """
+    fn()  # warm-up (model loads, caches)
+    timings = np.empty(repeat)
+    with contextlib.redirect_stdout(sys.stderr):
+        for i in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings[i] = time.perf_counter() - start
+    result = {
+        'name': name,
+        'rows': rows,
+        'repeat': repeat,
+        'mean_ms': round(timings.mean() * 1e3, 4),
+        'p50_ms': round(np.percentile(timings, 50) * 1e3, 4),
+        'p95_ms': round(np.percentile(timings, 95) * 1e3, 4),
+        'p99_ms': round(np.percentile(timings, 99) * 1e3, 4),
+    }
+    result.update(extra)
+    print(f"[INFO] {name}: p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms")
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ===== Workspace =====
+
+def benchmark_config(full_grid=False):
+    """
+    Repo config with workspace-relative paths. Unless ``full_grid``, every
+    hyperparameter grid is cut to its first value so training time stays
+    proportional to the data size.
+    """
+    with open(os.path.join(REPO_ROOT, 'config.yaml')) as f:
+        config = yaml.safe_load(f)
+    config = copy.deepcopy(config)
+    config.pop('stage_cache', None)
+    if not full_grid:
+        for model_cfg in config['models'].values():
+            model_cfg['grid'] = {param: values[:1] for param, values in model_cfg['grid'].items()}
+    return config
+
+
+@contextlib.contextmanager
+def workspace(path):
+    """Run inside ``path``, where config.yaml, data/ and models/ resolve like in the repo."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def credit_requests(processed, n, seed=0):
+    """
+    /predict payloads sampled from processed rows.
+    """
+    from app.main import CreditRequest
+
+    fields = [name for name in CreditRequest.model_fields if name in processed.columns]
+    sample = processed.sample(n=min(n, len(processed)), replace=n > len(processed), random_state=seed)
+    payloads = []
+    for record in sample[fields].to_dict(orient='records'):
+        payload = {}
+        for name, value in record.items():
+            annotation = str(CreditRequest.model_fields[name].annotation)
+            if 'str' in annotation:
+                value = str(value)
+            elif 'int' in annotation:
+                value = int(value)
+            else:
+                value = float(value)
+            payload[name] = value
+        payloads.append(payload)
+    return payloads
+
+
+# ===== Benchmarks =====
+
+def run_scale(n_rows, workdir, args):
+    """
+    All benchmarks at one data scale, inside a fresh workspace.
+    """
+    results = []
+    trace = not args.no_tracemalloc
+    os.makedirs(os.path.join(workdir, 'models'), exist_ok=True)
+    with open(os.path.join(workdir, 'config.yaml'), 'w') as f:
+        yaml.safe_dump(benchmark_config(args.full_grid), f)
+
+    raw_path = os.path.join(workdir, 'data', 'raw', 'data.csv')
+    results.append(measure(
+        'generate_data', lambda: write_transactions(raw_path, n_rows, seed=args.seed), rows=n_rows,
+        trace_memory=False,
+    ))
+
+    with workspace(workdir):
+        from src.data_processing import process_data, process_input, process_input_row
+        from src.utils.config import load_config
+
+        processed_path = load_config()['paths']['processed']
+        results.append(measure(
+            'process_data',
+            lambda: process_data(raw_path, processed_path, chunksize=args.chunksize),
+            rows=n_rows, trace_memory=trace, chunksize=args.chunksize,
+        ))
+
+        raw_records = pd.read_csv(raw_path, nrows=args.repeat).to_dict(orient='records')
+        records = iter(raw_records * 2)
+        results.append(measure_latency(
+            'process_input', lambda: process_input(next(records)), repeat=args.repeat - 1, rows=1,
+        ))
+        records = iter(raw_records * 2)
+        results.append(measure_latency(
+            'process_input_row', lambda: process_input_row(next(records)), repeat=args.repeat - 1, rows=1,
+        ))
+
+        if not args.skip_train:
+            from src import evaluate, train
+            results.append(measure('train', lambda: train.main('config.yaml'), rows=n_rows,
+                                   trace_memory=trace, full_grid=args.full_grid))
+            results.append(measure('evaluate', evaluate.main, rows=n_rows, trace_memory=trace))
+
+        if os.path.exists(os.path.join('models', 'logreg_best.pkl')):
+            results.extend(benchmark_api(pd.read_parquet(processed_path) if processed_path.endswith('.parquet')
+                                         else pd.read_csv(processed_path), args))
+            if args.cold_start:
+                results.append(benchmark_cold_start(args.cold_start))
+            forest_path = os.path.join('models', 'random_forest_best.pkl')
+            if args.workers and os.path.exists(forest_path) and os.path.exists('/proc/self/smaps_rollup'):
+                for artifact in ('pickle', 'compiled'):
+                    results.extend(benchmark_worker_memory(os.path.abspath(forest_path), args.workers, artifact))
+        else:
+            print("[WARN] No trained models in the workspace, skipping /predict benchmarks")
+
+    for result in results:
+        result['scale'] = n_rows
+    return results
+
+
+def benchmark_api(processed, args):
+    """
+    /predict single and /predict/batch latency through the ASGI test client.
+    """
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    payloads = credit_requests(processed, args.repeat + args.batch_size, seed=args.seed)
+    singles = iter(payloads * 2)
+    batch = payloads[:args.batch_size]
+    columnar = {'columns': {name: [p[name] for p in batch] for name in batch[0]}}
+
+    def post(path, body):
+        response = client.post(path, json=body)
+        response.raise_for_status()
+
+    return [
+        measure_latency('api_predict', lambda: post('/predict', next(singles)), repeat=args.repeat, rows=1),
+        measure_latency('api_predict_batch', lambda: post('/predict/batch', batch),
+                        repeat=max(1, args.repeat // 10), rows=len(batch)),
+        measure_latency('api_predict_batch_columnar', lambda: post('/predict/batch', columnar),
+                        repeat=max(1, args.repeat // 10), rows=len(batch)),
+    ]
+
+
+# Run in a fresh interpreter per sample: imports and model loads must be cold
+COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from fastapi.testclient import TestClient
+from app.main import app
+imported = time.perf_counter()
+with TestClient(app) as client:
+    first = time.perf_counter()
+    while client.get('/ready').status_code != 200:
+        time.sleep(0.005)
+    ready = time.perf_counter()
+print(json.dumps({'import_s': imported - start, 'ready_s': ready - start, 'ready_after_startup_s': ready - first}))
+"""
+
+
+def benchmark_cold_start(repeat):
+    """
+    Process start to /ready returning 200, measured in ``repeat`` fresh interpreters.
+    """
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', COLD_START_SCRIPT, REPO_ROOT],
+                                         text=True, stderr=subprocess.DEVNULL)
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    result = {'name': 'cold_start', 'rows': None, 'repeat': repeat}
+    for metric in ('import_s', 'ready_s'):
+        values = np.array([sample[metric] for sample in samples])
+        result[f'{metric[:-2]}_p50_ms'] = round(np.percentile(values, 50) * 1e3, 2)
+        result[f'{metric[:-2]}_max_ms'] = round(values.max() * 1e3, 2)
+    # Headline metric for --compare
+    result['seconds'] = round(float(np.median([sample['ready_s'] for sample in samples])), 4)
+    print(f"[INFO] cold_start: import {result['import_p50_ms']} ms, ready {result['ready_p50_ms']} ms (p50)")
+    return result
+
+
+# A serving worker: load one model, score once, then idle until stdin closes
+WORKER_SCRIPT = """
+import sys
+import numpy as np
+sys.path.insert(0, sys.argv[1])
+if sys.argv[3] == 'pickle':
+    import joblib
+    model = joblib.load(sys.argv[2])
+else:
+    from src.compiled_model import CompiledModel
+    model = CompiledModel.load(sys.argv[2])
+model.predict_proba(np.zeros((1000, model.n_features_in_)))
+print('ready', flush=True)
+sys.stdin.read()
+"""
+
+
+def smaps_rollup(pid):
+    """Rss/Pss/private memory of a process in MB (Linux /proc)."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        'rss_mb': fields['Rss'],
+        'pss_mb': fields['Pss'],
+        'private_mb': fields['Private_Clean'] + fields['Private_Dirty'],
+    }
+
+
+def benchmark_worker_memory(model_path, worker_counts, artifact='compiled'):
+    """
+    Memory of N concurrent worker processes serving the same model.
+
+    PSS splits shared pages between the processes mapping them, so the pod
+    total stays flat in N when the model arrays are shared and grows by one
+    model copy per worker when every worker unpickles its own.
+    """
+    from src.compiled_model import compiled_path
+
+    path = compiled_path(model_path) if artifact == 'compiled' else model_path
+    results = []
+    for n_workers in worker_counts:
+        workers = [subprocess.Popen([sys.executable, '-c', WORKER_SCRIPT, REPO_ROOT, path, artifact],
+                                    stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, text=True)
+                   for _ in range(n_workers)]
+        try:
+            for worker in workers:
+                if worker.stdout.readline().strip() != 'ready':
+                    raise RuntimeError(f"Worker failed to load {path}")
+            usage = [smaps_rollup(worker.pid) for worker in workers]
+        finally:
+            for worker in workers:
+                worker.stdin.close()
+                worker.wait()
+        result = {
+            'name': f'worker_memory_{artifact}',
+            'rows': None,
+            'workers': n_workers,
+            'model_mb': round(os.path.getsize(model_path) / 2 ** 20, 2),
+            'total_pss_mb': round(sum(u['pss_mb'] for u in usage), 2),
+            'mean_private_mb': round(float(np.mean([u['private_mb'] for u in usage])), 2),
+            'mean_rss_mb': round(float(np.mean([u['rss_mb'] for u in usage])), 2),
+        }
+        print(f"[INFO] {result['name']} x{n_workers}: total PSS {result['total_pss_mb']} MB, "
+              f"private {result['mean_private_mb']} MB/worker")
+        results.append(result)
+    return results
+
+
+# ===== Comparison =====
+
+def compare(old_path, new_path):
+    """
+    Print new/old ratios of the headline metric of every benchmark in both files.
+    """
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def index(run):
+        return {(r['name'] + (f"_x{r['workers']}" if 'workers' in r else ''), r['scale']): r
+                for r in run['results']}
+
+    old_results, new_results = index(old), index(new)
+    print(f"{'benchmark':32} {'scale':>10} {'old':>12} {'new':>12} {'ratio':>8}")
+    for key in sorted(old_results.keys() & new_results.keys(), key=lambda k: (k[1], k[0])):
+        for metric in ('seconds', 'p50_ms', 'p99_ms', 'peak_mb', 'total_pss_mb'):
+            if metric in old_results[key] and metric in new_results[key]:
+                a, b = old_results[key][metric], new_results[key][metric]
+                ratio = b / a if a else float('nan')
+                print(f"{key[0] + ' ' + metric:32} {key[1]:>10} {a:>12.4f} {b:>12.4f} {ratio:>8.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000],
+                        help='Data scales to benchmark (e.g. 10000 1000000 50000000)')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='Run process_data out-of-core with this chunk size (large scales)')
+    parser.add_argument('--repeat', type=int, default=200, help='Calls per latency benchmark')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows per /predict/batch call')
+    parser.add_argument('--cold-start', type=int, default=5,
+                        help='Fresh processes timed from start to /ready (0 to skip)')
+    parser.add_argument('--workers', type=int, nargs='*', default=[1, 2, 4],
+                        help='Concurrent worker processes for the model memory benchmark (none to skip)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-train', action='store_true', help='Skip train.py and evaluate.py')
+    parser.add_argument('--full-grid', action='store_true', help='Train with the full config.yaml grids')
+    parser.add_argument('--no-tracemalloc', action='store_true', help='Time only (tracemalloc adds overhead)')
+    parser.add_argument('--workdir', default=None, help='Keep generated data and models here')
+    parser.add_argument('--output', default=None, help='Results JSON path')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two results files')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    sys.path.insert(0, REPO_ROOT)
+    commit = git_commit()
+    run = {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'args': vars(args),
+        'results': [],
+    }
+    for n_rows in args.rows:
+        print(f"[INFO] ===== Scale: {n_rows} rows =====")
+        if args.workdir:
+            run['results'].extend(run_scale(n_rows, os.path.join(os.path.abspath(args.workdir), str(n_rows)), args))
+        else:
+            with tempfile.TemporaryDirectory(prefix='credit-bench-') as workdir:
+                run['results'].extend(run_scale(n_rows, workdir, args))
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{commit or 'nocommit'}.json"
+    )
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f"[✓] Benchmark results saved to: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+PRODUCT_CATEGORIES = [
+    'airtime', 'financial_services', 'utility_bill', 'data_bundles', 'tv',
+    'ticket', 'movies', 'transport', 'other',
+]
+# Rough Xente category mix (airtime and financial services dominate)
+CATEGORY_WEIGHTS = [0.47, 0.47, 0.02, 0.01, 0.01, 0.005, 0.005, 0.005, 0.005]
+
+START_TIME = np.datetime64('2018-11-15T00:00:00')
+SPAN_SECONDS = 90 * 86400
+
+
+def generate_transactions(n_rows, n_customers=None, seed=0, start_index=0):
+    """
+    Seeded synthetic transactions in the raw Xente schema read by process_data.
+
+    Args:
+        n_rows (int): Number of transactions.
+        n_customers (int): Distinct customers (default: one per ~25 transactions).
+        seed (int | np.random.SeedSequence): Random seed.
+        start_index (int): First TransactionId number (for chunked generation).
+
+    Returns:
+        pd.DataFrame: Raw transactions with the original capitalized columns.
+    """
+    rng = np.random.default_rng(seed)
+    n_customers = n_customers or max(10, n_rows // 25)
+    customers = rng.integers(1, n_customers + 1, n_rows)
+    seconds = rng.integers(0, SPAN_SECONDS, n_rows).astype('timedelta64[s]')
+    amount = np.round(rng.lognormal(7, 1.5, n_rows)) * np.where(rng.random(n_rows) < 0.3, -1, 1)
+
+    def ids(prefix, values):
+        return np.char.add(prefix, values.astype(str))
+
+    return pd.DataFrame({
+        'TransactionId': ids('TransactionId_', np.arange(start_index, start_index + n_rows)),
+        'BatchId': ids('BatchId_', rng.integers(1, max(2, n_rows), n_rows)),
+        'AccountId': ids('AccountId_', customers),
+        'SubscriptionId': ids('SubscriptionId_', customers),
+        'CustomerId': ids('CustomerId_', customers),
+        'CurrencyCode': 'UGX',
+        'CountryCode': 256,
+        'ProviderId': ids('ProviderId_', rng.integers(1, 7, n_rows)),
+        'ProductId': ids('ProductId_', rng.integers(1, 28, n_rows)),
+        'ProductCategory': rng.choice(PRODUCT_CATEGORIES, n_rows, p=CATEGORY_WEIGHTS),
+        'ChannelId': ids('ChannelId_', rng.integers(1, 6, n_rows)),
+        'Amount': amount,
+        'Value': np.abs(amount).astype(np.int64),
+        'TransactionStartTime': np.datetime_as_string(START_TIME + seconds) + 'Z',
+        'PricingStrategy': rng.integers(0, 5, n_rows),
+        'FraudResult': (rng.random(n_rows) < 0.002).astype(np.int64),
+    })
+
+
+def write_transactions(path, n_rows, n_customers=None, seed=0, chunk_rows=1_000_000):
+    """
+    Write ``n_rows`` synthetic transactions to CSV in bounded-memory chunks.
+
+    Each chunk draws from its own child seed, so the file is reproducible for
+    a given (n_rows, seed, chunk_rows) at any scale.
+    """
+    n_customers = n_customers or max(10, n_rows // 25)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    n_chunks = max(1, -(-n_rows // chunk_rows))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    for i, chunk_seed in enumerate(seeds):
+        start = i * chunk_rows
+        size = min(chunk_rows, n_rows - start)
+        chunk = generate_transactions(size, n_customers=n_customers, seed=chunk_seed, start_index=start)
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    return path
@@ -1,14 +1,55 @@
 from fastapi import FastAPI
-from pydantic_models import CreditRequest, CreditResponse
-import joblib
-import pandas as pd
-
-# Load best models
-logreg_model = joblib.load("models/logreg_best.pkl")
-rf_model = joblib.load("models/random_forest_best.pkl")
+from src.api.micro_batcher import MicroBatcher
+from src.api.pydantic_models import CreditRequest, CreditResponse
+from src.feature_schema import schema_for
+from src.predict import get_model, run_model
+from src.utils.config import load_config
 
 app = FastAPI(title="Credit Risk Probability API", version="1.0")
 
+# Registry name and display name per ?model= choice
+MODELS = {
+    "logreg": ("logreg", "Logistic Regression"),
+    "rf": ("random_forest", "Random Forest"),
+}
+
+
+def get_schema(model):
+    """
+    Column layout of ``model``, with the fitted pipeline's categorical tables,
+    fills and scaling when process_data has written it.
+    """
+    from src.data_processing import preprocessors
+
+    try:
+        pipeline = preprocessors.get("preprocessor")
+    except FileNotFoundError:
+        pipeline = None
+    return schema_for(model, pipeline)
+
+
+def make_scorer(name):
+    def score(requests):
+        # One float32 matrix and one predict_proba call per micro-batch,
+        # imputed and scaled like the training data
+        model = get_model(name)
+        schema = get_schema(model)
+        _, proba = run_model(model, schema.normalize(schema.matrix(requests)), name=name)
+        return [float(p) for p in proba]
+    return score
+
+
+# One micro-batcher per model: concurrent requests are scored together
+batching = load_config().get("serving", {}).get("batching", {})
+batchers = {
+    choice: MicroBatcher(
+        make_scorer(name),
+        max_batch_size=batching.get("max_batch_size", 64),
+        max_wait_ms=batching.get("max_wait_ms", 2.0),
+    )
+    for choice, (name, _) in MODELS.items()
+}
+
 
 @app.get("/")
 def root():
@@ -16,26 +57,19 @@ def root():
 
 
 @app.post("/predict", response_model=CreditResponse)
-def predict(request: CreditRequest, model: str = "logreg"):
+async def predict(request: CreditRequest, model: str = "logreg"):
     """
     Predict credit risk probability using specified model.
     Args:
         request: JSON payload with borrower features.
         model: "logreg" or "rf" (default = "logreg").
     """
-    # Convert request to DataFrame for model
-    X = pd.DataFrame([request.dict()])
-
     # Choose model
-    if model == "rf":
-        chosen_model = rf_model
-        model_name = "Random Forest"
-    else:
-        chosen_model = logreg_model
-        model_name = "Logistic Regression"
+    choice = "rf" if model == "rf" else "logreg"
+    model_name = MODELS[choice][1]
 
     # Predict probability
-    prob_default = float(chosen_model.predict_proba(X)[0][1])
+    prob_default = await batchers[choice].submit(request)
     prediction = "High Risk" if prob_default > 0.5 else "Low Risk"
 
     return CreditResponse(
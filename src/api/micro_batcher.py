@@ -0,0 +1,97 @@
+import asyncio
+
+from fastapi.concurrency import run_in_threadpool
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent requests into one vectorized scoring call.
+
+    Callers ``await submit(item)``. Items are queued and flushed as one batch
+    once ``max_batch_size`` items are waiting or ``max_wait_ms`` has passed
+    since the first item of the batch arrived. ``score_fn(items)`` runs in the
+    threadpool, so the event loop keeps accepting requests (which form the
+    next batch) while a batch is scored; its results are fanned back out to
+    the awaiting callers in order. If a batch fails, its items are scored one
+    by one, so an exception only reaches the callers whose items raise it.
+
+    Args:
+        score_fn (callable): list of items -> list of results (same length).
+        max_batch_size (int): Flush as soon as this many items are queued.
+        max_wait_ms (float): Longest time the first item of a batch waits
+            for others. 0 flushes whatever is queued immediately.
+    """
+
+    def __init__(self, score_fn, max_batch_size=64, max_wait_ms=2.0):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = None
+        self._worker = None
+        self._loop = None
+
+    def _ensure_worker(self):
+        # Queue and worker belong to the running loop; create them lazily
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, item):
+        """
+        Queue ``item`` and wait for its result from the next batch.
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await run_in_threadpool(self.score_fn, items)
+            except Exception as e:
+                if len(batch) == 1:
+                    self._set_exception(batch[0][1], e)
+                else:
+                    await self._run_single(batch)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _run_single(self, batch):
+        # Isolate the failing items of a failed batch
+        for item, future in batch:
+            try:
+                result = (await run_in_threadpool(self.score_fn, [item]))[0]
+            except Exception as e:
+                self._set_exception(future, e)
+                continue
+            if not future.done():
+                future.set_result(result)
+
+    @staticmethod
+    def _set_exception(future, exception):
+        if not future.done():
+            future.set_exception(exception)
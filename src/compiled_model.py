@@ -0,0 +1,353 @@
+import glob
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+# Rows scored per forest traversal block (bounds the rows x trees node matrix)
+BLOCK_ROWS = 4096
+
+# Shared artifact layout: <stem>.compiled/manifest.json plus one .npy per array
+ARTIFACT_FORMAT = "credit-scoring-compiled/1"
+MANIFEST_NAME = "manifest.json"
+
+
+# ===== Compilation =====
+
+def compile_logistic(model):
+    """
+    Flatten a binary LogisticRegression to its coefficient vector and intercept.
+    """
+    return {
+        "kind": np.array("linear"),
+        "coef": np.ascontiguousarray(model.coef_[0], dtype=np.float64),
+        "intercept": np.asarray(model.intercept_[0], dtype=np.float64),
+    }
+
+
+def compile_forest(model):
+    """
+    Flatten a binary RandomForestClassifier into contiguous node arrays.
+
+    All trees are concatenated; ``left``/``right`` hold absolute node indices
+    and ``roots`` the first node of each tree. Leaves point back to
+    themselves so the traversal can run a fixed number of steps, and
+    ``value`` holds each node's positive-class probability.
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        nodes = np.arange(n_nodes, dtype=np.int32) + offset
+        is_leaf = tree.children_left == -1
+
+        left = np.where(is_leaf, nodes, tree.children_left + offset)
+        right = np.where(is_leaf, nodes, tree.children_right + offset)
+        counts = tree.value[:, 0, :]
+        proba = counts / counts.sum(axis=1, keepdims=True)
+
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(left)
+        rights.append(right)
+        values.append(proba[:, 1])
+        roots.append(offset)
+        offset += n_nodes
+        max_depth = max(max_depth, tree.max_depth)
+
+    return {
+        "kind": np.array("forest"),
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(lefts).astype(np.int32),
+        "right": np.concatenate(rights).astype(np.int32),
+        "value": np.concatenate(values).astype(np.float64),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "max_depth": np.asarray(max_depth, dtype=np.int32),
+    }
+
+
+def compile_model(model, feature_names=None):
+    """
+    Compile a fitted sklearn classifier to plain NumPy arrays.
+
+    Args:
+        model: Binary LogisticRegression or RandomForestClassifier.
+        feature_names (list): Column names, for models fitted on a sparse
+            matrix (default: the model's ``feature_names_in_``).
+
+    Returns:
+        dict: Array name -> np.ndarray, including ``classes`` and
+        ``feature_names`` (empty when the model was fitted without names).
+    """
+    if len(model.classes_) != 2:
+        raise ValueError("Only binary classifiers can be compiled")
+
+    if hasattr(model, "coef_"):
+        arrays = compile_logistic(model)
+    elif hasattr(model, "estimators_"):
+        arrays = compile_forest(model)
+    else:
+        raise TypeError(f"Cannot compile model of type {type(model).__name__}")
+
+    arrays["classes"] = np.asarray(model.classes_)
+    if feature_names is None:
+        feature_names = getattr(model, "feature_names_in_", [])
+    arrays["feature_names"] = np.asarray(feature_names, dtype=str)
+    arrays["n_features"] = np.asarray(model.n_features_in_, dtype=np.int32)
+    return arrays
+
+
+# ===== Scoring =====
+
+class CompiledModel:
+    """
+    NumPy scorer for a compiled model, a drop-in for sklearn's
+    ``predict_proba``/``predict`` without input validation overhead.
+    ``scipy.sparse`` inputs are scored as they are by linear models
+    (densified for forests).
+
+    Args:
+        arrays (dict): Output of compile_model (or the loaded .npz).
+    """
+
+    def __init__(self, arrays):
+        self.arrays = {name: np.asarray(value) for name, value in arrays.items()}
+        self.kind = str(self.arrays["kind"])
+        self.classes_ = self.arrays["classes"]
+        self.n_features_in_ = int(self.arrays["n_features"])
+        names = self.arrays["feature_names"]
+        self.feature_names_in_ = names if len(names) else None
+        self._feature_list = list(names)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a shared artifact (manifest path, memory-mapped) or a legacy .npz.
+        """
+        if path.endswith(".npz"):
+            with np.load(path, allow_pickle=False) as data:
+                return cls({name: data[name] for name in data.files})
+        return cls(load_artifact(path))
+
+    def _as_matrix(self, X):
+        if hasattr(X, "tocsr"):
+            # scipy.sparse input; duck-typed so scoring dense rows never imports scipy
+            if X.shape[1] != self.n_features_in_:
+                raise ValueError(f"Expected {self.n_features_in_} features, got {X.shape[1]}")
+            return X.tocsr() if self.kind == "linear" else X.toarray()
+        if self._feature_list and hasattr(X, "columns") and list(X.columns) != self._feature_list:
+            X = X[self._feature_list]
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got {X.shape[1]}")
+        return X
+
+    def _linear_proba(self, X):
+        # Overflow-free sigmoid; numpy only, so loading a scorer does not import scipy
+        return np.exp(-np.logaddexp(0.0, -(X @ self.arrays["coef"] + self.arrays["intercept"])))
+
+    def _forest_proba(self, X):
+        a = self.arrays
+        feature, threshold, left, right = a["feature"], a["threshold"], a["left"], a["right"]
+        # Trees compare float32 inputs against float64 thresholds, like sklearn
+        X = X.astype(np.float32)
+        out = np.empty(len(X))
+        for start in range(0, len(X), BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            rows = np.arange(len(block))[:, None]
+            node = np.broadcast_to(a["roots"], (len(block), len(a["roots"])))
+            for _ in range(int(a["max_depth"])):
+                go_left = block[rows, feature[node]] <= threshold[node]
+                node = np.where(go_left, left[node], right[node])
+            out[start:start + BLOCK_ROWS] = a["value"][node].mean(axis=1)
+        return out
+
+    def positive_proba(self, X):
+        """
+        Probability of the positive class (``classes_[1]``) per row.
+        """
+        X = self._as_matrix(X)
+        if self.kind == "linear":
+            return self._linear_proba(X)
+        return self._forest_proba(X)
+
+    def predict_proba(self, X):
+        proba = self.positive_proba(X)
+        return np.column_stack([1.0 - proba, proba])
+
+    def predict(self, X):
+        return self.classes_[(self.positive_proba(X) > 0.5).astype(int)]
+
+
+# ===== Shared Artifacts =====
+
+def _payload_digest(array):
+    digest = hashlib.sha256(f"{array.dtype.str}{array.shape}".encode())
+    digest.update(memoryview(array).cast("B") if array.size else b"")
+    return digest.hexdigest()
+
+
+def save_artifact(arrays, manifest_path):
+    """
+    Write arrays as one aligned ``.npy`` payload each plus a JSON manifest.
+
+    Payload files are named by content hash and never rewritten, and the
+    manifest is replaced atomically last, so a worker loading concurrently
+    sees either the old or the new model. Payloads no longer referenced are
+    removed; processes still mapping them keep their pages until they reload.
+
+    Args:
+        arrays (dict): Array name -> np.ndarray (output of compile_model).
+        manifest_path (str): Path of the manifest inside the artifact directory.
+    """
+    directory = os.path.dirname(manifest_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    entries = {}
+    for name, value in arrays.items():
+        array = np.require(value, requirements="C")  # keeps 0-d arrays 0-d
+        sha256 = _payload_digest(array)
+        filename = f"{name}-{sha256[:16]}.npy"
+        target = os.path.join(directory, filename)
+        if not os.path.exists(target):
+            tmp_path = f"{target}.tmp.npy"
+            np.save(tmp_path, array, allow_pickle=False)
+            os.replace(tmp_path, target)
+        entries[name] = {"file": filename, "dtype": array.dtype.str, "shape": list(array.shape), "sha256": sha256}
+
+    manifest = {"format": ARTIFACT_FORMAT, "kind": str(arrays["kind"]), "arrays": entries}
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+    referenced = {entry["file"] for entry in entries.values()}
+    for payload in glob.glob(os.path.join(directory, "*.npy")):
+        if os.path.basename(payload) not in referenced:
+            os.remove(payload)
+
+
+def load_artifact(manifest_path, mmap_mode="r", verify=False):
+    """
+    Load the arrays of a shared artifact.
+
+    With ``mmap_mode="r"`` the payloads are mapped read-only instead of read,
+    so every worker process serving the model shares one physical copy
+    through the OS page cache.
+
+    Args:
+        manifest_path (str): Path written by save_artifact.
+        mmap_mode (str): np.load memory-map mode (None reads into memory).
+        verify (bool): Re-hash every payload (reads all pages).
+
+    Returns:
+        dict: Array name -> np.ndarray (np.memmap when mapped).
+    """
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"Unsupported artifact format {manifest.get('format')!r} in {manifest_path}")
+
+    directory = os.path.dirname(manifest_path) or "."
+    arrays = {}
+    for name, entry in manifest["arrays"].items():
+        array = np.load(os.path.join(directory, entry["file"]), mmap_mode=mmap_mode, allow_pickle=False)
+        if array.dtype.str != entry["dtype"] or list(array.shape) != entry["shape"]:
+            raise ValueError(f"Payload {entry['file']} does not match its manifest entry")
+        if verify and _payload_digest(np.require(array, requirements="C")) != entry["sha256"]:
+            raise ValueError(f"Payload {entry['file']} is corrupted")
+        arrays[name] = array
+    return arrays
+
+
+# ===== Export =====
+
+def validate_compiled(model, compiled, X, atol=1e-6):
+    """
+    Check that the compiled scorer reproduces ``model.predict_proba`` on X.
+
+    Returns:
+        float: Largest absolute probability difference.
+
+    Raises:
+        ValueError: If any probability differs by more than ``atol``.
+    """
+    expected = model.predict_proba(X)[:, 1]
+    actual = compiled.positive_proba(X)
+    max_diff = float(np.max(np.abs(expected - actual))) if len(expected) else 0.0
+    if max_diff > atol:
+        raise ValueError(f"Compiled model deviates from sklearn by {max_diff:.3g} (> {atol:g})")
+    return max_diff
+
+
+def build_compiled(model, X_check=None, atol=1e-6, feature_names=None):
+    """
+    Compile ``model`` and validate it against sklearn on ``X_check``, without
+    writing anything.
+    """
+    compiled = CompiledModel(compile_model(model, feature_names=feature_names))
+    if X_check is not None:
+        max_diff = validate_compiled(model, compiled, X_check, atol=atol)
+        print(f"[INFO] Compiled {compiled.kind} model matches sklearn (max |Δp| = {max_diff:.2g})")
+    return compiled
+
+
+def save_compiled(compiled, path):
+    """
+    Save a compiled model as a shared artifact (or a single .npz when ``path``
+    ends in .npz), replacing any previous one atomically.
+    """
+    if not path.endswith(".npz"):
+        save_artifact(compiled.arrays, path)
+        return compiled
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, **compiled.arrays)
+    os.replace(tmp_path, path)
+    return compiled
+
+
+def export_compiled(model, path, X_check=None, atol=1e-6, feature_names=None):
+    """
+    Compile ``model``, validate it against sklearn on ``X_check`` and save it
+    as a shared artifact (or a single .npz when ``path`` ends in .npz).
+    """
+    return save_compiled(build_compiled(model, X_check, atol, feature_names), path)
+
+
+def compiled_path(model_path):
+    """Manifest path of the compiled artifact next to a pickled model."""
+    return os.path.join(os.path.splitext(model_path)[0] + ".compiled", MANIFEST_NAME)
+
+
+if __name__ == "__main__":
+    # Compile already-trained models, validated on the processed training data
+    import joblib
+    from src.predict import MODEL_PATHS
+    from src.utils.config import load_config
+    from src.utils.data_io import load_sparse_training_data, load_training_data, storage_format
+
+    config = load_config()
+    processed = config["paths"]["processed"]
+    X = feature_names = None
+    if os.path.exists(processed):
+        if storage_format(processed) == "sparse":
+            X, _, feature_names = load_sparse_training_data(config)
+        else:
+            X, _ = load_training_data(config)
+    for name, path in MODEL_PATHS.items():
+        if not os.path.exists(path):
+            print(f"[WARN] {name}: {path} not found, skipping", file=sys.stderr)
+            continue
+        model = joblib.load(path)
+        X_check = X[:10000] if X is not None else np.random.default_rng(0).normal(
+            size=(1000, model.n_features_in_))
+        export_compiled(model, compiled_path(path), X_check=X_check, feature_names=feature_names)
+        print(f"[✓] {name} compiled to: {compiled_path(path)}")
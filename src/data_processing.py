@@ -1,40 +1,108 @@
+import numpy as np
 import pandas as pd
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OneHotEncoder, LabelEncoder
+from sklearn.preprocessing import OneHotEncoder
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import StandardScaler
 import os
-from sklearn.cluster import KMeans
+import math
+import joblib
+import time
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import adjusted_rand_score
+from src.model_registry import ModelRegistry, dump_atomic
+from src.feature_store import CustomerFeatureStore, STORE_PATH, register_store, shared_store
+from src.utils.config import load_config
+from src.utils.data_io import ProcessedWriter, save_processed, save_sparse_features, storage_format
+from src.utils.dtypes import memory_usage_mb, optimize_dtypes
+from src.utils.stage_cache import StageCache, code_key, fingerprint_file, fit_transform_cached
+from src.utils.timestamps import datetime_parts, parse_timestamps
+from src.utils.vocabulary import Vocabulary
+
+# Fitted preprocessing pipeline, persisted next to the models
+PIPELINE_PATH = 'models/preprocessing_pipeline.pkl'
 
 # ===== Custom Transformers =====
+# Every transformer takes ``copy``: with copy=False, transform works on the
+# input frame in place instead of starting from a defensive full copy.
+
+# Calendar parts the model is trained on (src.utils.timestamps.DATETIME_PARTS lists all)
+DEFAULT_DATETIME_PARTS = ('hour', 'day', 'month', 'year')
+
 
 class DateTimeFeatures(BaseEstimator, TransformerMixin):
-    def __init__(self, datetime_column='transactionstarttime'):
+    """
+    Parse the transaction time (fast path for Xente ISO-8601 'Z' strings, see
+    src.utils.timestamps) and add ``transaction_<part>`` columns. A column that
+    is already parsed, e.g. by process_data for the RFM labels, is reused.
+
+    Args:
+        parts (tuple): Subset of timestamps.DATETIME_PARTS, e.g. add "dayofweek" and
+            "epoch_seconds" to the defaults.
+    """
+
+    def __init__(self, datetime_column='transactionstarttime', parts=DEFAULT_DATETIME_PARTS, copy=True):
         self.datetime_column = datetime_column
+        self.parts = parts
+        self.copy = copy
 
     def fit(self, X, y=None):
         return self
 
     def transform(self, X):
-        df = X.copy()
-        df[self.datetime_column] = pd.to_datetime(df[self.datetime_column], errors='coerce')
-        df['transaction_hour'] = df[self.datetime_column].dt.hour
-        df['transaction_day'] = df[self.datetime_column].dt.day
-        df['transaction_month'] = df[self.datetime_column].dt.month
-        df['transaction_year'] = df[self.datetime_column].dt.year
+        df = X.copy() if self.copy else X
+        df[self.datetime_column] = parse_timestamps(df[self.datetime_column])
+        # Pipelines pickled before ``parts`` existed produce the default parts
+        parts = getattr(self, 'parts', DEFAULT_DATETIME_PARTS)
+        for part, values in datetime_parts(df[self.datetime_column], parts).items():
+            df[f'transaction_{part}'] = values
         return df
 
 class CustomerAggregateFeatures(BaseEstimator, TransformerMixin):
-    def __init__(self, customer_id_col='customerid', amount_col='amount'):
+    """
+    Adds per-customer amount aggregates. With a CustomerFeatureStore the
+    aggregates are looked up from its running statistics instead of being
+    recomputed with a groupby over the frame.
+
+    With ``store_path`` the store is referenced by its snapshot path rather
+    than embedded: the pickled stage drops ``store`` and, once loaded, reads
+    the process's live store of that path (see shared_store), which is the
+    one the API keeps updating.
+    """
+    def __init__(self, customer_id_col='customerid', amount_col='amount', store=None, copy=True,
+                 store_path=None):
         self.customer_id_col = customer_id_col
         self.amount_col = amount_col
+        self.store = store
+        self.copy = copy
+        self.store_path = store_path
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        if getattr(self, 'store_path', None):
+            state = dict(state, store=None)
+        return state
 
     def fit(self, X, y=None):
         return self
 
+    def live_store(self):
+        """The store aggregates are read from (None: group the frame itself)."""
+        if self.store is not None:
+            return self.store
+        store_path = getattr(self, 'store_path', None)
+        return shared_store(store_path) if store_path else None
+
     def transform(self, X):
-        df = X.copy()
+        df = X.copy() if self.copy else X
+        store = self.live_store()
+        if store is not None:
+            stats = store.lookup(df[self.customer_id_col])
+            for col, values in stats.items():
+                df[col] = values
+            return df
+
         agg = df.groupby(self.customer_id_col)[self.amount_col].agg([
             'sum', 'mean', 'count', 'std'
         ]).fillna(0)
@@ -46,37 +114,99 @@ class CustomerAggregateFeatures(BaseEstimator, TransformerMixin):
             'amount_std'
         ]
 
-        df = df.merge(agg, on=self.customer_id_col, how='left')
+        # Index-aligned lookup per row instead of a merge that builds a new frame
+        aligned = agg.reindex(df[self.customer_id_col].to_numpy())
+        for col in agg.columns:
+            df[col] = aligned[col].to_numpy()
         return df
 
 class CategoricalEncoder(BaseEstimator, TransformerMixin):
-    def __init__(self, one_hot_cols=None, label_encode_cols=None):
+    """
+    Encode categoricals with vocabularies fitted once (see Vocabulary).
+
+    Label-encoded columns become integer codes, unseen labels falling into
+    the vocabulary's unknown bucket instead of raising. One-hot columns
+    expand to a fixed layout, ``{col}_{category}`` for every fitted category
+    but the first, whatever categories the batch contains; unseen categories
+    are all-zero rows. The block can also be produced sparse (one_hot_block).
+
+    Args:
+        sparse (bool): Leave the one-hot columns as raw labels in transform's
+            output; the one-hot block is assembled as a CSR matrix afterwards
+            (see sparse_feature_matrix) instead of as dense frame columns.
+    """
+
+    def __init__(self, one_hot_cols=None, label_encode_cols=None, copy=True, sparse=False):
         self.one_hot_cols = one_hot_cols or []
         self.label_encode_cols = label_encode_cols or []
-        self.encoders = {}
+        self.copy = copy
+        self.sparse = sparse
 
     def fit(self, X, y=None):
-        for col in self.label_encode_cols:
-            le = LabelEncoder()
-            le.fit(X[col].astype(str))
-            self.encoders[col] = le
+        self.set_vocabularies(
+            {col: Vocabulary.fit(X[col].astype(str)) for col in self.label_encode_cols},
+            {col: Vocabulary.fit(X[col].dropna()) for col in self.one_hot_cols},
+        )
+        return self
+
+    def set_vocabularies(self, label_vocabularies, one_hot_vocabularies):
+        """
+        Install fitted vocabularies (e.g. accumulated over chunks) and derive
+        the one-hot layout from them.
+        """
+        self.vocabularies_ = label_vocabularies
+        self.one_hot_vocabularies_ = one_hot_vocabularies
+        # Fixed one-hot layout (first category dropped), independent of the batch
+        self.categories_ = {col: list(vocab.labels) for col, vocab in one_hot_vocabularies.items()}
+        self.dummy_columns_ = [
+            f"{col}_{cat}" for col in self.one_hot_cols for cat in self.categories_[col][1:]
+        ]
         return self
 
+    def __setstate__(self, state):
+        # Pipelines pickled with the LabelEncoder version: rebuild the vocabularies
+        self.__dict__.update(state)
+        self.__dict__.setdefault('sparse', False)
+        if 'vocabularies_' not in state and 'categories_' in state:
+            self.set_vocabularies(
+                {col: Vocabulary(le.classes_) for col, le in state.get('encoders', {}).items()},
+                {col: Vocabulary(cats) for col, cats in state['categories_'].items()},
+            )
+
+    def one_hot_block(self, X, sparse=False):
+        """
+        One-hot columns of X in ``dummy_columns_`` order, as a dense bool
+        array or a ``scipy.sparse`` CSR matrix.
+        """
+        blocks = [self.one_hot_vocabularies_[col].one_hot(X[col], sparse=sparse) for col in self.one_hot_cols]
+        if sparse:
+            from scipy import sparse as sp
+
+            return sp.hstack(blocks, format='csr') if blocks else sp.csr_matrix((len(X), 0))
+        return np.hstack(blocks) if blocks else np.zeros((len(X), 0), dtype=bool)
+
     def transform(self, X):
-        df = X.copy()
+        df = X.copy() if self.copy else X
 
         # Label Encoding
-        for col in self.label_encode_cols:
-            df[col] = self.encoders[col].transform(df[col].astype(str))
-
-        # One-Hot Encoding
-        if self.one_hot_cols:
-            df = pd.get_dummies(df, columns=self.one_hot_cols, drop_first=True)
+        for col, vocab in self.vocabularies_.items():
+            df[col] = vocab.encode(df[col].astype(str))
+
+        # One-Hot Encoding on the fitted layout
+        if self.one_hot_cols and not self.sparse:
+            dummies = pd.DataFrame(self.one_hot_block(df), columns=self.dummy_columns_, index=df.index)
+            if self.copy:
+                df = pd.concat([df.drop(columns=self.one_hot_cols), dummies], axis=1)
+            else:
+                df.drop(columns=self.one_hot_cols, inplace=True)
+                for col in dummies.columns:
+                    df[col] = dummies[col].to_numpy()
 
         return df
 
 class MissingValueHandler(BaseEstimator, TransformerMixin):
-    def __init__(self):
+    def __init__(self, copy=True):
+        self.copy = copy
         self.num_imputer = SimpleImputer(strategy='median')
         self.cat_imputer = SimpleImputer(strategy='most_frequent')
         self.num_cols = []
@@ -90,13 +220,14 @@ class MissingValueHandler(BaseEstimator, TransformerMixin):
         return self
 
     def transform(self, X):
-        df = X.copy()
+        df = X.copy() if self.copy else X
         df[self.num_cols] = self.num_imputer.transform(df[self.num_cols])
         df[self.cat_cols] = self.cat_imputer.transform(df[self.cat_cols])
         return df
 
 class NumericalScaler(BaseEstimator, TransformerMixin):
-    def __init__(self):
+    def __init__(self, copy=True):
+        self.copy = copy
         self.scaler = StandardScaler()
         self.num_cols = []
 
@@ -105,94 +236,710 @@ class NumericalScaler(BaseEstimator, TransformerMixin):
         self.scaler.fit(X[self.num_cols])
         return self
 
+    def __sklearn_is_fitted__(self):
+        return hasattr(self.scaler, 'mean_')
+
     def transform(self, X):
-        df = X.copy()
+        df = X.copy() if self.copy else X
         df[self.num_cols] = self.scaler.transform(df[self.num_cols])
         return df
 
+class DtypeOptimizer(BaseEstimator, TransformerMixin):
+    """
+    Final pipeline stage: downcasts the feature frame (int8 one-hot,
+    int16/int32 codes, float32 continuous, categorical IDs).
+
+    ID columns become categoricals only if they repeat enough at fit time
+    (fewer than ``max_category_ratio`` unique values per row); unique IDs
+    such as transactionid gain nothing from it.
+    """
+    def __init__(self, category_cols=None, max_category_ratio=0.5):
+        self.category_cols = category_cols
+        self.max_category_ratio = max_category_ratio
+
+    def fit(self, X, y=None):
+        self.int_ranges_ = {}
+        self.category_counts_ = {}
+        return self.partial_fit(X)
+
+    def partial_fit(self, X, y=None):
+        """
+        Widen the recorded integer ranges and update the categorical ID
+        decision with another chunk.
+        """
+        if not hasattr(self, 'int_ranges_'):
+            return self.fit(X)
+        for col in X.select_dtypes(include='integer').columns:
+            low, high = X[col].min(), X[col].max()
+            if col in self.int_ranges_:
+                low, high = min(low, self.int_ranges_[col][0]), max(high, self.int_ranges_[col][1])
+            self.int_ranges_[col] = (low, high)
+        # Distinct values summed over chunks bound the overall count from above,
+        # so an ID only becomes categorical if it repeats enough across all chunks
+        for col in self.category_cols or []:
+            if col in X.columns:
+                distinct, rows = self.category_counts_.get(col, (0, 0))
+                self.category_counts_[col] = (distinct + X[col].nunique(), rows + len(X))
+        self.category_cols_ = [
+            col for col, (distinct, rows) in self.category_counts_.items()
+            if distinct < self.max_category_ratio * max(rows, 1)
+        ]
+        return self
+
+    def __sklearn_is_fitted__(self):
+        return hasattr(self, 'int_ranges_')
+
+    def transform(self, X):
+        return optimize_dtypes(X, category_cols=self.category_cols_, int_ranges=self.int_ranges_)
+
+
+# ===== High-Risk Target Engineering =====
+
+# Per-customer RFM inputs as named aggregations (no Python-level lambdas)
+RFM_AGGREGATIONS = {
+    'last_seen': ('transactionstarttime', 'max'),
+    'Frequency': ('transactionid', 'count'),
+    'Monetary': ('amount', 'sum'),
+}
+
+# How per-chunk RFM aggregates combine into global ones
+RFM_COMBINE = {'last_seen': 'max', 'Frequency': 'sum', 'Monetary': 'sum'}
+
+# Recency is measured in days before this date
+RFM_SNAPSHOT_DATE = '2025-07-01'
+
+
+def _naive_timestamps(values):
+    timestamps = parse_timestamps(values)
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_localize(None)
+    return timestamps
+
+
+def aggregate_rfm_inputs(df):
+    """
+    Last transaction time, transaction count and amount sum per customer.
+    Partial results (e.g. per chunk) can be merged with ``RFM_COMBINE``.
+    """
+    frame = pd.DataFrame({
+        'transactionstarttime': _naive_timestamps(df['transactionstarttime']),
+        'transactionid': df['transactionid'],
+        'amount': df['amount'],
+    })
+    return frame.groupby(df['customerid']).agg(**RFM_AGGREGATIONS)
+
+
+def rfm_table(aggregates, snapshot_date=RFM_SNAPSHOT_DATE):
+    """
+    Turn per-customer aggregates into the Recency/Frequency/Monetary table.
+    Recency (whole days before the snapshot) is one array subtraction.
+    """
+    snapshot = pd.to_datetime(snapshot_date).tz_localize(None).to_datetime64()
+    last_seen = aggregates['last_seen'].to_numpy(dtype='datetime64[ns]')
+    return pd.DataFrame({
+        'customerid': aggregates.index.to_numpy(),
+        'Recency': (snapshot - last_seen) // np.timedelta64(1, 'D'),
+        'Frequency': aggregates['Frequency'].to_numpy(),
+        'Monetary': aggregates['Monetary'].fillna(0).to_numpy(),
+    })
+
+
+def label_rfm_clusters(rfm, method='exact', sample_size=None, batch_size=4096, random_state=42):
+    """
+    Cluster customers on scaled Recency/Frequency/Monetary and flag the
+    cluster with high recency and low frequency/monetary value as high risk.
+
+    Args:
+        rfm (pd.DataFrame): customerid, Recency, Frequency, Monetary.
+        method (str): "exact" (KMeans) or "minibatch" (MiniBatchKMeans).
+        sample_size (int): If set, fit the clustering on a seeded sample of
+            customers and assign every customer to the nearest center.
+        batch_size (int): Mini-batch size for method="minibatch".
+        random_state (int): Seed for sampling and clustering.
+    """
+    scaler = StandardScaler()
+    rfm_scaled = scaler.fit_transform(rfm[['Recency', 'Frequency', 'Monetary']])
+
+    if method == 'exact':
+        kmeans = KMeans(n_clusters=3, random_state=random_state)
+    elif method == 'minibatch':
+        kmeans = MiniBatchKMeans(n_clusters=3, batch_size=batch_size, n_init=3, random_state=random_state)
+    else:
+        raise ValueError(f"Unknown clustering method: {method}")
+
+    fit_rows = rfm_scaled
+    if sample_size is not None and sample_size < len(rfm_scaled):
+        rng = np.random.default_rng(random_state)
+        fit_rows = rfm_scaled[rng.choice(len(rfm_scaled), size=sample_size, replace=False)]
+    kmeans.fit(fit_rows)
+    rfm['cluster'] = kmeans.predict(rfm_scaled)
+
+    # Scoring: high recency, low freq/monetary = high risk
+    centers = kmeans.cluster_centers_
+    high_risk_cluster = int(np.argmax(centers[:, 0] - centers[:, 1] - centers[:, 2]))
+    rfm['is_high_risk'] = (rfm['cluster'] == high_risk_cluster).astype(int)
+    return rfm[['customerid', 'is_high_risk']]
+
+
+def create_high_risk_label(df, snapshot_date=RFM_SNAPSHOT_DATE, **clustering):
+    """
+    Label customers as high risk from their RFM profile.
+    Extra keyword arguments are passed to label_rfm_clusters.
+    """
+    rfm = rfm_table(aggregate_rfm_inputs(df), snapshot_date)
+    return label_rfm_clusters(rfm, **clustering)
+
+
+def lookup_labels(rfm_labels, customer_ids):
+    """
+    Per-row is_high_risk for ``customer_ids`` (0 for unlabelled customers),
+    aligned by index lookup rather than a merge that rebuilds the frame.
+    """
+    labels = rfm_labels.set_index('customerid')['is_high_risk']
+    return labels.reindex(np.asarray(customer_ids, dtype=object)).fillna(0).astype(int).to_numpy()
+
+
+def compare_label_methods(rfm, sample_size=None, batch_size=4096, random_state=42):
+    """
+    Time the exact and mini-batch/sampled labeling paths on the same RFM
+    table and report how stable the approximate labels are.
+
+    Returns:
+        pd.DataFrame: One row per method with seconds, high-risk rate,
+        label agreement and adjusted Rand index against the exact path.
+    """
+    runs = {
+        'exact': {'method': 'exact'},
+        'minibatch': {'method': 'minibatch', 'batch_size': batch_size},
+    }
+    if sample_size is not None:
+        runs['minibatch_sampled'] = {'method': 'minibatch', 'batch_size': batch_size, 'sample_size': sample_size}
+
+    report, labels = [], {}
+    for name, options in runs.items():
+        start = time.perf_counter()
+        labels[name] = label_rfm_clusters(rfm.copy(), random_state=random_state, **options)['is_high_risk'].to_numpy()
+        seconds = time.perf_counter() - start
+        report.append({
+            'method': name,
+            'seconds': seconds,
+            'high_risk_rate': labels[name].mean(),
+            'agreement_with_exact': (labels[name] == labels['exact']).mean(),
+            'adjusted_rand_vs_exact': adjusted_rand_score(labels['exact'], labels[name]),
+        })
+    return pd.DataFrame(report)
+
 
 # ===== Main Processing Pipeline =====
 
-def process_data(input_path='data/raw/data.csv', output_path='data/processed/processed.csv'):
+# Categoricals one-hot encoded in sparse mode: the IDs too, instead of label codes
+SPARSE_ONE_HOT_COLS = ['productcategory', 'currencycode', 'providerid', 'channelid', 'productid']
+
+
+def build_pipeline(feature_store=None, copy=True, sparse=False, store_path=None):
+    """
+    Args:
+        feature_store (CustomerFeatureStore): Source of customer aggregates.
+        store_path (str): Snapshot path of the store: the fitted pipeline
+            references the store by it instead of pickling it.
+        copy (bool): If False, stages transform the input frame in place
+            (no defensive copies; the caller's frame is modified).
+        sparse (bool): One-hot encode the ID columns as well and leave the
+            one-hot block to sparse_feature_matrix.
+    """
+    if sparse:
+        encoder = CategoricalEncoder(one_hot_cols=SPARSE_ONE_HOT_COLS, copy=copy, sparse=True)
+    else:
+        encoder = CategoricalEncoder(
+            one_hot_cols=['productcategory', 'currencycode'],
+            label_encode_cols=['providerid', 'channelid', 'productid'],
+            copy=copy
+        )
+    return Pipeline([
+        ('datetime_features', DateTimeFeatures(datetime_column='transactionstarttime', copy=copy)),
+        ('aggregate_features', CustomerAggregateFeatures(
+            customer_id_col='customerid', amount_col='amount', store=feature_store, copy=copy,
+            store_path=store_path,
+        )),
+        ('categorical_encoding', encoder),
+        ('missing_value_imputation', MissingValueHandler(copy=copy)),
+        ('scaling', NumericalScaler(copy=copy)),
+        ('dtype_optimization', DtypeOptimizer(
+            category_cols=['transactionid', 'batchid', 'accountid', 'subscriptionid', 'customerid']
+        ))
+    ])
+
+
+def sparse_feature_matrix(pipeline, df):
+    """
+    Model features of a sparse-mode pipeline's output (see build_pipeline) as
+    one CSR matrix: the numeric columns, then the encoder's one-hot block.
+
+    Returns:
+        tuple: (scipy.sparse.csr_matrix, list of feature names)
+    """
+    from scipy import sparse as sp
+
+    encoder = pipeline.named_steps['categorical_encoding']
+    # IDs (categorical/object), raw one-hot labels and timestamps are not features
+    numeric = [
+        col for col in df.columns
+        if col not in encoder.one_hot_cols and pd.api.types.is_numeric_dtype(df[col])
+        and not isinstance(df[col].dtype, pd.CategoricalDtype)
+    ]
+    dense = sp.csr_matrix(df[numeric].to_numpy(dtype=np.float64))
+    X = sp.hstack([dense, encoder.one_hot_block(df, sparse=True)], format='csr')
+    return X, numeric + encoder.dummy_columns_
+
+
+def process_data(input_path='data/raw/data.csv', output_path='data/processed/processed.csv',
+                 pipeline_path=PIPELINE_PATH, store_path=STORE_PATH, chunksize=None, label_options=None,
+                 copy=True, cache_dir=None, cache_max_bytes=5 * 2 ** 30):
+    """
+    Fit the preprocessing pipeline on the raw transactions, label customers
+    and write the processed dataset.
+
+    Args:
+        chunksize (int): If set, stream the CSV in chunks of this many rows so
+            peak memory is bounded by the chunk size (see process_data_chunked).
+        label_options (dict): Clustering options for label_rfm_clusters,
+            e.g. {"method": "minibatch", "sample_size": 100000}.
+        copy (bool): If False, run the pipeline stages in place on the raw
+            frame instead of copying it at every stage.
+        cache_dir (str): If set, reuse fitted stages and their outputs from a
+            content-addressed cache keyed by the input file and each stage's
+            parameters, so retrains only recompute the stages that changed.
+        cache_max_bytes (int): Size budget of the stage cache (LRU eviction).
+
+    An ``output_path`` ending in .npz selects the sparse mode: IDs are one-hot
+    encoded too and the features are saved as a CSR matrix with the target
+    (see sparse_feature_matrix and save_sparse_features).
+    """
+    label_options = label_options or {}
+    if chunksize:
+        return process_data_chunked(input_path, output_path, pipeline_path, store_path, chunksize,
+                                    label_options=label_options)
+
     df = pd.read_csv(input_path)
 
     # Clean column names
     df.columns = df.columns.str.lower()
 
+    # Per-customer running aggregates, snapshotted for the API
+    feature_store = CustomerFeatureStore.from_frame(df, customer_id_col='customerid', amount_col='amount')
+    feature_store.save(store_path)
+    register_store(feature_store, store_path)
+    print(f"[✓] Customer feature store ({len(feature_store)} customers) saved to: {store_path}")
+
+    cache = StageCache(cache_dir, cache_max_bytes) if cache_dir else None
+    input_key = fingerprint_file(input_path) if cache else None
+
+    # Parse the transaction times once: the RFM labels and the datetime stage share them
+    df['transactionstarttime'] = parse_timestamps(df['transactionstarttime'])
+
+    # Generate target labels while the raw columns are untouched (copy=False rewrites them),
+    # cached per input, labeling code and options (snapshot date included)
+    rfm_labels = None
+    if cache:
+        labeling_code = code_key(create_high_risk_label, aggregate_rfm_inputs, _naive_timestamps, rfm_table,
+                                 label_rfm_clusters)
+        label_settings = {'snapshot_date': RFM_SNAPSHOT_DATE, **label_options}
+        labels_key = joblib.hash((input_key, 'rfm_labels', labeling_code, RFM_AGGREGATIONS, label_settings))
+        rfm_labels = cache.get(labels_key, 'labels')
+    if rfm_labels is not None:
+        print("[INFO] Stage cache hit: rfm_labels")
+    else:
+        rfm_labels = create_high_risk_label(df, **label_options)
+        if cache:
+            cache.put(labels_key, labels=rfm_labels)
+
     # Define pipeline
-    pipeline = Pipeline([
-        ('datetime_features', DateTimeFeatures(datetime_column='transactionstarttime')),
-        ('aggregate_features', CustomerAggregateFeatures(customer_id_col='customerid', amount_col='amount')),
-        ('categorical_encoding', CategoricalEncoder(
-            one_hot_cols=['productcategory', 'currencycode'],
-            label_encode_cols=['providerid', 'channelid', 'productid']
-        )),
-        ('missing_value_imputation', MissingValueHandler()), 
-        ('scaling', NumericalScaler())
-    ])
+    sparse = storage_format(output_path) == 'sparse'
+    pipeline = build_pipeline(feature_store=feature_store, copy=copy, sparse=sparse, store_path=store_path)
+
+    # Apply transformation pipeline, then downcast dtypes as its last stage
+    if cache:
+        df_processed, stage_key = fit_transform_cached(pipeline, df, cache, input_key, steps=slice(None, -1))
+    else:
+        df_processed = pipeline[:-1].fit_transform(df)
+    memory_before = memory_usage_mb(df_processed)
+    if cache:
+        df_processed, _ = fit_transform_cached(pipeline, df_processed, cache, stage_key, steps=slice(-1, None))
+    else:
+        df_processed = pipeline[-1].fit_transform(df_processed)
+    print(f"[INFO] Feature frame memory: {memory_before:.1f} MB -> {memory_usage_mb(df_processed):.1f} MB")
+
+    # Persist the fitted pipeline so serving only ever calls transform
+    dump_atomic(pipeline, pipeline_path)
+    print(f"[✓] Fitted preprocessing pipeline saved to: {pipeline_path}")
+
+    # Sparse mode: features as a CSR matrix, saved with the target labels
+    if sparse:
+        X, feature_names = sparse_feature_matrix(pipeline, df_processed)
+        save_sparse_features(output_path, X, lookup_labels(rfm_labels, df_processed['customerid']), feature_names)
+        print(f"[INFO] Sparse features: {X.shape[1]} columns, {X.nnz / max(np.prod(X.shape), 1):.1%} non-zero")
+        print(f"[✓] Processed data saved to: {output_path}")
+        return
+
+    # Merge target labels into processed data
+    df_processed['is_high_risk'] = lookup_labels(rfm_labels, df_processed['customerid'])
+
+    # Save processed data (CSV, Parquet or Feather, by extension)
+    save_processed(df_processed, output_path)
+    print(f"[✓] Processed data saved to: {output_path}")
+
+
+# ===== Out-of-Core Processing =====
+
+class _MedianSample:
+    """
+    Bounded uniform sample (bottom-k on random keys) of a numeric column.
+    The median is exact while the column has at most ``size`` observed values.
+    """
+
+    def __init__(self, size, rng):
+        self.size = size
+        self.rng = rng
+        self.values = np.empty(0)
+        self.keys = np.empty(0)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.values = np.concatenate([self.values, values])
+        self.keys = np.concatenate([self.keys, self.rng.random(len(values))])
+        if len(self.values) > self.size:
+            keep = np.argpartition(self.keys, self.size)[:self.size]
+            self.values, self.keys = self.values[keep], self.keys[keep]
+
+    def median(self):
+        return np.median(self.values) if len(self.values) else np.nan
+
+
+class _ModeCounter:
+    """
+    Running value counts of a categorical column. Beyond ``max_values``
+    distinct values only the most frequent half is kept (approximate mode).
+    """
+
+    def __init__(self, max_values):
+        self.max_values = max_values
+        self.counts = pd.Series(dtype='int64')
+
+    def add(self, values):
+        self.counts = self.counts.add(values.value_counts(), fill_value=0)
+        if len(self.counts) > self.max_values:
+            self.counts = self.counts.nlargest(self.max_values // 2)
+
+    def mode(self):
+        if self.counts.empty:
+            return np.nan
+        # Ties resolve to the smallest value, like SimpleImputer(strategy='most_frequent')
+        top = self.counts[self.counts == self.counts.max()].index
+        return min(top)
+
+
+def _read_chunks(input_path, chunksize):
+    for chunk in pd.read_csv(input_path, chunksize=chunksize):
+        chunk.columns = chunk.columns.str.lower()
+        yield chunk
+
+
+def process_data_chunked(input_path='data/raw/data.csv', output_path='data/processed/processed.csv',
+                         pipeline_path=PIPELINE_PATH, store_path=STORE_PATH, chunksize=100_000,
+                         snapshot_date=RFM_SNAPSHOT_DATE, median_sample_size=1_000_000, max_mode_values=100_000,
+                         label_options=None):
+    """
+    Streaming variant of process_data for inputs that do not fit in memory.
+
+    Pass 1 accumulates customer aggregates (feature store), label/one-hot
+    vocabularies and RFM inputs. Pass 2 runs the first pipeline stages per
+    chunk to accumulate imputation medians/modes and scaler mean/variance.
+    Pass 3 fits the dtype stage on the scaled chunks. Pass 4 transforms each
+    chunk with the fitted pipeline and appends it to the output. Memory is bounded by the chunk size plus per-customer state
+    (plus the CSR matrix itself for sparse .npz output).
+    """
+    sparse = storage_format(output_path) == 'sparse'
+    pipeline = build_pipeline(sparse=sparse)
+
+    rfm_aggregates = _fit_chunked(pipeline, input_path, store_path, chunksize, median_sample_size, max_mode_values)
+    dump_atomic(pipeline, pipeline_path)
+    print(f"[✓] Fitted preprocessing pipeline saved to: {pipeline_path}")
+
+    # ----- Labels from the accumulated RFM inputs -----
+    rfm_labels = label_rfm_clusters(rfm_table(rfm_aggregates, snapshot_date), **(label_options or {}))
+
+    print("[INFO] Pass 4/4: transforming and writing chunks...")
+    _write_chunked(pipeline, rfm_labels, input_path, output_path, chunksize, sparse)
+
+
+def _fit_chunked(pipeline, input_path, store_path, chunksize, median_sample_size, max_mode_values):
+    """
+    Fitting passes (1-3) of process_data_chunked.
+
+    Returns:
+        pd.DataFrame: Per-customer RFM inputs accumulated over all chunks.
+    """
+    print("[INFO] Pass 1/4: accumulating customer aggregates and vocabularies...")
+    rfm_aggregates = _fit_chunked_vocabularies(pipeline, input_path, store_path, chunksize)
+
+    print("[INFO] Pass 2/4: accumulating imputation and scaling statistics...")
+    _fit_chunked_statistics(pipeline, input_path, chunksize, median_sample_size, max_mode_values)
+
+    # Dtype stage on the final (imputed and scaled) frames
+    print("[INFO] Pass 3/4: fitting the dtype stage on the scaled chunks...")
+    dtype_step = pipeline.named_steps['dtype_optimization']
+    for chunk in _read_chunks(input_path, chunksize):
+        dtype_step.partial_fit(pipeline[:-1].transform(chunk))
+    return rfm_aggregates
+
+
+def _fit_chunked_vocabularies(pipeline, input_path, store_path, chunksize):
+    """Pass 1: customer aggregates (feature store), vocabularies and RFM inputs."""
+    aggregate_step = pipeline.named_steps['aggregate_features']
+    encoder = pipeline.named_steps['categorical_encoding']
+    feature_store = CustomerFeatureStore()
+    label_vocab = {col: set() for col in encoder.label_encode_cols}
+    one_hot_vocab = {col: set() for col in encoder.one_hot_cols}
+    rfm_aggregates = None
+
+    for chunk in _read_chunks(input_path, chunksize):
+        feature_store.update_many(chunk['customerid'], chunk['amount'])
+        for col in label_vocab:
+            label_vocab[col].update(chunk[col].astype(str).unique())
+        for col in one_hot_vocab:
+            one_hot_vocab[col].update(chunk[col].dropna().unique())
+
+        part = aggregate_rfm_inputs(chunk)
+        if rfm_aggregates is not None:
+            part = pd.concat([rfm_aggregates, part]).groupby(level=0).agg(RFM_COMBINE)
+        rfm_aggregates = part
+
+    feature_store.save(store_path)
+    register_store(feature_store, store_path)
+    print(f"[✓] Customer feature store ({len(feature_store)} customers) saved to: {store_path}")
+
+    aggregate_step.set_params(store=feature_store, store_path=store_path)
+    encoder.set_vocabularies(
+        {col: Vocabulary.fit(list(vocab)) for col, vocab in label_vocab.items()},
+        {col: Vocabulary.fit(list(vocab)) for col, vocab in one_hot_vocab.items()},
+    )
+    return rfm_aggregates
+
+
+def _fit_chunked_statistics(pipeline, input_path, chunksize, median_sample_size, max_mode_values):
+    """Pass 2: imputation medians/modes and scaler mean/variance."""
+    datetime_step, aggregate_step, encoder, imputer, scaler, _ = [step for _, step in pipeline.steps]
+    rng = np.random.default_rng(42)
+    template = None
+    total = 0
+    for chunk in _read_chunks(input_path, chunksize):
+        encoded = encoder.transform(aggregate_step.transform(datetime_step.transform(chunk)))
+        total += len(encoded)
+        if template is None:
+            template = encoded.iloc[:1].copy()
+            num_cols = encoded.select_dtypes(include=['int64', 'float64']).columns
+            cat_cols = encoded.select_dtypes(include=['object', 'category', 'bool']).columns
+            medians = {col: _MedianSample(median_sample_size, rng) for col in num_cols}
+            modes = {col: _ModeCounter(max_mode_values) for col in cat_cols}
+            moments = StandardScaler()
+
+        for col in num_cols:
+            medians[col].add(encoded[col])
+        for col in cat_cols:
+            modes[col].add(encoded[col])
+        # NaNs are ignored here and accounted for once the medians are known
+        moments.partial_fit(encoded[num_cols].astype('float64'))
+
+    # Fit the imputer on a single row holding the medians/modes, then the scaler
+    # on the imputed row, and overwrite its moments with the corrected full-data ones
+    median_values = {col: medians[col].median() for col in num_cols}
+    for col in num_cols:
+        template[col] = median_values[col]
+    for col in cat_cols:
+        template[col] = template[col].astype(object)
+        template.loc[template.index[0], col] = modes[col].mode()
+    imputer.fit(template)
+    scaler.fit(imputer.transform(template))
+
+    observed = np.broadcast_to(moments.n_samples_seen_, (len(num_cols),)).astype(np.float64)
+    missing = total - observed
+    median_array = np.array([median_values[col] for col in num_cols])
+    mean = (observed * moments.mean_ + missing * median_array) / total
+    var = (observed * (moments.var_ + (moments.mean_ - mean) ** 2)
+           + missing * (median_array - mean) ** 2) / total
+    scaler.scaler.mean_ = mean
+    scaler.scaler.var_ = var
+    scaler.scaler.scale_ = np.where(var > 0, np.sqrt(var), 1.0)
+    scaler.scaler.n_samples_seen_ = int(total)
+
+
+def _write_chunked(pipeline, rfm_labels, input_path, output_path, chunksize, sparse):
+    """Pass 4: transform each chunk with the fitted pipeline and write it out."""
+    if sparse:
+        from scipy import sparse as sp
+
+        blocks, labels = [], []
+        for chunk in _read_chunks(input_path, chunksize):
+            chunk_processed = pipeline.transform(chunk)
+            block, feature_names = sparse_feature_matrix(pipeline, chunk_processed)
+            blocks.append(block)
+            labels.append(lookup_labels(rfm_labels, chunk_processed['customerid']))
+        X = sp.vstack(blocks, format='csr')
+        save_sparse_features(output_path, X, np.concatenate(labels), feature_names)
+        print(f"[✓] Processed data ({X.shape[0]} rows) saved to: {output_path}")
+        return
+
+    with ProcessedWriter(output_path) as writer:
+        for chunk in _read_chunks(input_path, chunksize):
+            chunk_processed = pipeline.transform(chunk)
+            chunk_processed['is_high_risk'] = lookup_labels(rfm_labels, chunk_processed['customerid'])
+            writer.write(chunk_processed)
+
+    print(f"[✓] Processed data ({writer.rows} rows) saved to: {output_path}")
 
-    # Apply transformation pipeline
-    df_processed = pipeline.fit_transform(df)
-
-    # ===== High-Risk Target Engineering =====
-    def create_high_risk_label(df, snapshot_date='2025-07-01'):
-        df['transactionstarttime'] = pd.to_datetime(df['transactionstarttime']).dt.tz_localize(None)
-        snapshot_date = pd.to_datetime(snapshot_date).tz_localize(None)
-
-        rfm = df.groupby('customerid').agg({
-            'transactionstarttime': lambda x: (snapshot_date - x.max()).days,
-            'transactionid': 'count',
-            'amount': 'sum'
-        }).rename(columns={
-            'transactionstarttime': 'Recency',
-            'transactionid': 'Frequency',
-            'amount': 'Monetary'
-        }).reset_index()
-
-        rfm['Monetary'] = rfm['Monetary'].fillna(0)
-
-        scaler = StandardScaler()
-        rfm_scaled = scaler.fit_transform(rfm[['Recency', 'Frequency', 'Monetary']])
-
-        kmeans = KMeans(n_clusters=3, random_state=42)
-        rfm['cluster'] = kmeans.fit_predict(rfm_scaled)
-
-        # Scoring: high recency, low freq/monetary = high risk
-        cluster_centers = kmeans.cluster_centers_
-        scores = [
-            (i, center[0] - center[1] - center[2])
-            for i, center in enumerate(cluster_centers)
-        ]
-        high_risk_cluster = max(scores, key=lambda x: x[1])[0]
-        rfm['is_high_risk'] = (rfm['cluster'] == high_risk_cluster).astype(int)
-        return rfm[['customerid', 'is_high_risk']]
-    
 
 # ===== API Input Processor =====
 
+# The fitted pipeline is unpickled once and hot-reloaded if process_data rewrites it
+preprocessors = ModelRegistry({'preprocessor': PIPELINE_PATH})
+_row_preprocessors = {}
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class RowPreprocessor:
+    """
+    Applies a fitted preprocessing pipeline (see build_pipeline) to a single
+    record using plain dict lookups and arithmetic, without building a DataFrame.
+    Produces the same values as ``pipeline.transform`` on a one-row frame.
+    """
+
+    def __init__(self, pipeline):
+        steps = pipeline.named_steps
+        datetime_step = steps['datetime_features']
+        aggregate_step = steps['aggregate_features']
+        encoder = steps['categorical_encoding']
+        imputer = steps['missing_value_imputation']
+        scaler = steps['scaling']
+
+        self.datetime_column = datetime_step.datetime_column
+        self.datetime_parts = getattr(datetime_step, 'parts', DEFAULT_DATETIME_PARTS)
+        self.customer_id_col = aggregate_step.customer_id_col
+        self.amount_col = aggregate_step.amount_col
+        self.aggregate_step = aggregate_step
+        self.vocabularies = encoder.vocabularies_
+        # Expanded here in sparse mode too, where the batch path leaves the
+        # one-hot block to sparse_feature_matrix: rows come out model-ready
+        self.one_hot = {col: cats[1:] for col, cats in encoder.categories_.items()}
+        self.num_fill = dict(zip(imputer.num_cols, imputer.num_imputer.statistics_))
+        self.cat_fill = {
+            col: fill for col, fill in zip(imputer.cat_cols, imputer.cat_imputer.statistics_)
+            if col not in self.one_hot
+        }
+        self.scaling = {
+            col: (mean, scale)
+            for col, mean, scale in zip(scaler.num_cols, scaler.scaler.mean_, scaler.scaler.scale_)
+        }
+        self.downcast = 'dtype_optimization' in steps
+
+    def transform(self, record):
+        row = {str(key).lower(): value for key, value in record.items()}
+        self._add_datetime_parts(row)
+        self._add_aggregates(row)
+        self._encode(row)
+        self._impute_and_scale(row)
+        if self.downcast:
+            self._downcast(row)
+        row.pop('is_high_risk', None)
+        return row
+
+    def _add_datetime_parts(self, row):
+        # The batch path's parser on a one-value column
+        timestamps = parse_timestamps(pd.Series([row.get(self.datetime_column)], dtype=object))
+        if timestamps.dt.tz is not None:
+            timestamps = timestamps.dt.tz_convert('UTC')  # offsets other than Z, like Xente stragglers
+        timestamp = timestamps.iloc[0]
+        row[self.datetime_column] = None if pd.isna(timestamp) else timestamp
+        for part, values in datetime_parts(timestamps, self.datetime_parts).items():
+            row[f'transaction_{part}'] = values[0].item()
+
+    def _add_aggregates(self, row):
+        # The customer's history from the store, else the only transaction we have
+        store = self.aggregate_step.live_store()
+        if store is not None:
+            stats = store.get(row.get(self.customer_id_col))
+            row.update(stats or dict.fromkeys(
+                ['total_amount', 'average_amount', 'transaction_count', 'amount_std'], 0
+            ))
+            return
+        amount = row.get(self.amount_col)
+        observed = not _is_missing(amount)
+        row['total_amount'] = float(amount) if observed else 0.0
+        row['average_amount'] = float(amount) if observed else 0.0
+        row['transaction_count'] = 1 if observed else 0
+        row['amount_std'] = 0.0
+
+    def _encode(self, row):
+        # Label encoding (unseen labels in the unknown bucket, like the batch path)
+        for col, vocab in self.vocabularies.items():
+            label = row.get(col)
+            row[col] = vocab.encode_one(label if _is_missing(label) else str(label))
+
+        # One-hot encoding on the fitted layout
+        for col, categories in self.one_hot.items():
+            value = row.pop(col, None)
+            for cat in categories:
+                row[f'{col}_{cat}'] = value == cat
+
+    def _impute_and_scale(self, row):
+        for col, fill in self.num_fill.items():
+            value = row.get(col)
+            row[col] = float(fill) if _is_missing(value) else float(value)
+        for col, fill in self.cat_fill.items():
+            if _is_missing(row.get(col)):
+                row[col] = fill
+        for col, (mean, scale) in self.scaling.items():
+            row[col] = (row[col] - mean) / scale
+
+    @staticmethod
+    def _downcast(row):
+        # Same precision as the dtype stage: float32 values, 0/1 one-hot flags
+        for col, value in row.items():
+            if isinstance(value, (bool, np.bool_)):
+                row[col] = int(value)
+            elif isinstance(value, float):
+                row[col] = float(np.float32(value))
+
+
+def load_preprocessor():
+    """
+    Return the fitted preprocessing pipeline written by process_data.
+    """
+    return preprocessors.get('preprocessor')
+
+
+def get_row_preprocessor():
+    entry = preprocessors.get_entry('preprocessor')
+    if entry.sha256 not in _row_preprocessors:
+        _row_preprocessors.clear()
+        _row_preprocessors[entry.sha256] = RowPreprocessor(entry.model)
+    return _row_preprocessors[entry.sha256]
+
+
 def process_input(data: dict):
     """
-    Takes a single JSON-like dict (from API request) and applies preprocessing
-    pipeline to return model-ready features.
+    Takes a single JSON-like dict (from API request) and applies the fitted
+    preprocessing pipeline (transform only) to return model-ready features.
     """
     df = pd.DataFrame([data])  # turn dict into one-row DataFrame
 
     # Clean column names to match training
     df.columns = df.columns.str.lower()
 
-    # Define same preprocessing pipeline (without target engineering)
-    pipeline = Pipeline([
-        ('datetime_features', DateTimeFeatures(datetime_column='transactionstarttime')),
-        ('aggregate_features', CustomerAggregateFeatures(customer_id_col='customerid', amount_col='amount')),
-        ('categorical_encoding', CategoricalEncoder(
-            one_hot_cols=['productcategory', 'currencycode'],
-            label_encode_cols=['providerid', 'channelid', 'productid']
-        )),
-        ('missing_value_imputation', MissingValueHandler()), 
-        ('scaling', NumericalScaler())
-    ])
-
-    processed = pipeline.fit_transform(df)
+    processed = load_preprocessor().transform(df)
 
     # Drop target if accidentally created
     if "is_high_risk" in processed.columns:
@@ -201,17 +948,21 @@ def process_input(data: dict):
     return processed
 
 
+def process_input_row(data: dict):
+    """
+    Fast single-record variant of process_input: same values, returned as a
+    dict of feature name -> value without any DataFrame construction.
+    """
+    return get_row_preprocessor().transform(data)
 
 
-    # Generate target labels and merge into processed data
-    rfm_labels = create_high_risk_label(df)
-    df_processed = df_processed.merge(rfm_labels, on='customerid', how='left')
-    df_processed['is_high_risk'] = df_processed['is_high_risk'].fillna(0).astype(int)
-
-    # Save processed data
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    df_processed.to_csv(output_path, index=False)
-    print(f"[✓] Processed data saved to: {output_path}")
-
 if __name__ == "__main__":
-    process_data()
\ No newline at end of file
+    # Run the importable module's process_data, so the pickled pipeline refers
+    # to src.data_processing.* rather than to classes of __main__
+    from src import data_processing
+
+    config = load_config()
+    stage_cache = config.get("stage_cache", {})
+    data_processing.process_data(output_path=config["paths"]["processed"],
+                                 cache_dir=stage_cache.get("dir"),
+                                 cache_max_bytes=int(stage_cache.get("max_size_gb", 5) * 2 ** 30))
@@ -0,0 +1,202 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Probabilities are clipped before taking logits for the stacker
+EPSILON = 1e-7
+
+
+def _logit(p):
+    p = np.clip(np.asarray(p, dtype=np.float64), EPSILON, 1 - EPSILON)
+    return np.log(p) - np.log1p(-p)
+
+
+class EnsembleScorer:
+    """
+    Score a feature matrix with several models concurrently and combine them.
+
+    The fallback (fast) model runs in the calling thread while the others run
+    in a thread pool (sklearn and NumPy release the GIL in their numeric
+    kernels), so the ensemble costs about the slowest model, not the sum.
+    When a latency budget is set and a model has not finished in time (or
+    fails), the fallback model's probability is returned instead. A late
+    model finishes in the background and budgeted calls give it no new work
+    until it does (they answer with the fallback), so slow jobs never pile up
+    behind each other; jobs that have not started when the budget expires
+    are cancelled. Calls without a budget always wait for every model.
+
+    Args:
+        score_fn (callable): (model name, features) -> positive-class probabilities.
+        models (list): Model names, e.g. ["logreg", "random_forest"].
+        method (str): "weighted" (weighted mean of probabilities) or
+            "stacked" (logistic stacker over the models' log-odds).
+        weights (dict): Name -> weight for "weighted" (default: equal).
+        stacker (dict): ``{"coef": {name: w}, "intercept": b}`` for "stacked"
+            (see fit_stacker).
+        fallback (str): Model answering alone when the budget is exceeded.
+        latency_budget_ms (float): Default per-call budget (None: wait for all).
+    """
+
+    def __init__(self, score_fn, models=("logreg", "random_forest"), method="weighted", weights=None,
+                 stacker=None, fallback="logreg", latency_budget_ms=None):
+        self.score_fn = score_fn
+        self.models = list(models)
+        self.method = method
+        self.fallback = fallback if fallback in self.models else self.models[0]
+        self.latency_budget_ms = latency_budget_ms
+
+        if method == "weighted":
+            weights = weights or {name: 1.0 for name in self.models}
+            total = sum(weights.get(name, 0.0) for name in self.models)
+            if total <= 0:
+                raise ValueError("Ensemble weights must sum to a positive value")
+            self.weights = {name: weights.get(name, 0.0) / total for name in self.models}
+        elif method == "stacked":
+            if not stacker or set(stacker.get("coef", {})) != set(self.models):
+                raise ValueError("A stacked ensemble needs a stacker coefficient per model")
+            self.stacker = stacker
+        else:
+            raise ValueError(f"Unknown ensemble method: {method}")
+
+        # One thread per non-fallback model; created on first use
+        self._pool = None
+        # Model name -> its last submitted future, so a busy model is skipped
+        self._running = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, score_fn, config):
+        """
+        Build the scorer from the ``serving.ensemble`` section of config.yaml.
+        """
+        cfg = config.get("serving", {}).get("ensemble", {})
+        return cls(
+            score_fn,
+            models=cfg.get("models", ["logreg", "random_forest"]),
+            method=cfg.get("method", "weighted"),
+            weights=cfg.get("weights"),
+            stacker=cfg.get("stacker"),
+            fallback=cfg.get("fallback", "logreg"),
+            latency_budget_ms=cfg.get("latency_budget_ms"),
+        )
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=max(1, len(self.models) - 1), thread_name_prefix="ensemble"
+            )
+        return self._pool
+
+    def _timed(self, name, features):
+        start = time.perf_counter()
+        proba = np.asarray(self.score_fn(name, features), dtype=np.float64)
+        return proba, (time.perf_counter() - start) * 1e3
+
+    def combine(self, probabilities):
+        """
+        Combine per-model probabilities (name -> array) into one array.
+        """
+        if self.method == "stacked":
+            z = self.stacker.get("intercept", 0.0) + sum(
+                self.stacker["coef"][name] * _logit(probabilities[name]) for name in self.models
+            )
+            return np.exp(-np.logaddexp(0.0, -z))
+        return sum(self.weights[name] * probabilities[name] for name in self.models)
+
+    def _submit(self, features, skip_busy):
+        """Start every model but the fallback in the pool; returns future -> name."""
+        futures = {}
+        with self._lock:
+            for name in self.models:
+                if name == self.fallback:
+                    continue
+                # Only a budgeted call skips a model still busy with an earlier call
+                previous = self._running.get(name)
+                if skip_busy and previous is not None and not previous.done():
+                    continue
+                future = self._running[name] = self.pool.submit(self._timed, name, features)
+                futures[future] = name
+        return futures
+
+    def score(self, features, budget_ms=None):
+        """
+        Ensemble probabilities for every row of ``features``.
+
+        Args:
+            features: Feature matrix accepted by every model.
+            budget_ms (float): Latency budget for this call (default: the
+                scorer's ``latency_budget_ms``).
+
+        Returns:
+            dict: ``probability`` (array), ``model_used`` ("ensemble" or the
+            fallback name), ``fallback`` (bool), ``probabilities`` and
+            ``timings_ms`` per model that finished in time.
+        """
+        start = time.perf_counter()
+        budget_ms = self.latency_budget_ms if budget_ms is None else budget_ms
+        futures = self._submit(features, skip_busy=budget_ms is not None)
+
+        probabilities, timings = {}, {}
+        probabilities[self.fallback], timings[self.fallback] = self._timed(self.fallback, features)
+
+        remaining = None
+        if budget_ms is not None:
+            remaining = max(0.0, budget_ms / 1e3 - (time.perf_counter() - start))
+        done, pending = wait(futures, timeout=remaining)
+        for future in pending:
+            future.cancel()
+
+        failed = False
+        for future in done:
+            name = futures[future]
+            try:
+                probabilities[name], timings[name] = future.result()
+            except Exception:
+                logger.warning("ensemble model %s failed, falling back to %s", name, self.fallback, exc_info=True)
+                failed = True
+
+        complete = len(probabilities) == len(self.models)
+        if complete:
+            probability = self.combine(probabilities)
+        else:
+            if not failed:
+                logger.debug("ensemble over its %.1f ms budget, answering with %s", budget_ms, self.fallback)
+            probability = probabilities[self.fallback]
+
+        timings["total"] = (time.perf_counter() - start) * 1e3
+        return {
+            "probability": probability,
+            "model_used": "ensemble" if complete else self.fallback,
+            "fallback": not complete,
+            "probabilities": probabilities,
+            "timings_ms": timings,
+        }
+
+
+def fit_stacker(probabilities, y):
+    """
+    Fit the logistic stacker of a "stacked" ensemble on out-of-sample
+    predictions (e.g. the hold-out set).
+
+    Args:
+        probabilities (dict): Model name -> positive-class probabilities.
+        y (array-like): True labels (0/1).
+
+    Returns:
+        dict: ``{"coef": {name: w}, "intercept": b}`` for config.yaml.
+    """
+    from sklearn.linear_model import LogisticRegression
+
+    names = list(probabilities)
+    Z = np.column_stack([_logit(probabilities[name]) for name in names])
+    stacker = LogisticRegression().fit(Z, np.asarray(y))
+    return {
+        "coef": {name: float(w) for name, w in zip(names, stacker.coef_[0])},
+        "intercept": float(stacker.intercept_[0]),
+    }
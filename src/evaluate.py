@@ -1,55 +1,263 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import joblib
-import pandas as pd
 import numpy as np
-from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
 from sklearn.model_selection import train_test_split
-import yaml
-import os
 
-def load_config(path="config.yaml"):
-    with open(path, "r") as f:
-        return yaml.safe_load(f)
+from src.utils.config import load_config
+from src.utils.data_io import iter_training_batches, load_processed
 
-def main():
-    print("[INFO] Loading config...")
-    config = load_config()
-    data_path = config["data"]["processed"]
+# Probability histogram resolution: bin i holds scores in (i/N, (i+1)/N],
+# so the 0.5 decision threshold falls on a bin edge
+N_BINS = 1000
+THRESHOLD = 0.5
 
-    print("[INFO] Loading dataset...")
-    df = pd.read_csv(data_path)
 
-    X = df.drop("default", axis=1)
-    y = df["default"]
+# ===== Streaming Metrics =====
 
-    # same split as training
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+class StreamingMetrics:
+    """
+    Incremental binary classification metrics for one model.
+
+    Each batch only updates a 2x2 confusion matrix and per-class score
+    histograms, so memory is constant in the number of rows. ROC AUC,
+    average precision and F1 are derived from the histograms (AUC/AP up to
+    the bin resolution; ties within a bin count half).
+
+    Args:
+        n_bins (int): Histogram bins over [0, 1] (even, so 0.5 is an edge).
+    """
+
+    def __init__(self, n_bins=N_BINS):
+        self.n_bins = n_bins
+        self.hist = np.zeros((2, n_bins), dtype=np.int64)  # [negatives, positives] per bin
+        self.confusion = np.zeros((2, 2), dtype=np.int64)
+
+    def update(self, y_true, proba):
+        y_true = np.asarray(y_true).astype(np.int64)
+        proba = np.asarray(proba, dtype=np.float64)
+        bins = np.clip(np.ceil(proba * self.n_bins).astype(np.int64) - 1, 0, self.n_bins - 1)
+        self.hist += np.bincount(y_true * self.n_bins + bins, minlength=2 * self.n_bins).reshape(2, -1)
+        y_pred = (proba > THRESHOLD).astype(np.int64)
+        self.confusion += np.bincount(y_true * 2 + y_pred, minlength=4).reshape(2, 2)
+
+    def merge(self, other):
+        self.hist += other.hist
+        self.confusion += other.confusion
+        return self
+
+    @property
+    def n_rows(self):
+        return int(self.confusion.sum())
+
+    def summary(self, n_bootstrap=1000, alpha=0.05, random_state=42):
+        """
+        Point estimates with bootstrap confidence intervals for AUC and F1.
+        """
+        auc, f1, ap = histogram_metrics(self.hist[None, ...])
+        report = classification_summary(self.confusion)
+        report.update({
+            "roc_auc": float(auc[0]),
+            "average_precision": float(ap[0]),
+            "f1_from_histogram": float(f1[0]),
+            "confusion_matrix": self.confusion.tolist(),
+            "n_rows": self.n_rows,
+        })
+        if n_bootstrap:
+            report["ci"] = bootstrap_ci(self.hist, n_bootstrap=n_bootstrap, alpha=alpha,
+                                        random_state=random_state)
+        return report
+
+
+def histogram_metrics(hist):
+    """
+    ROC AUC, F1 at the 0.5 threshold and average precision for a stack of
+    score histograms.
+
+    Args:
+        hist (np.ndarray): (n_replicates, 2, n_bins) counts of negatives/positives.
+
+    Returns:
+        tuple: (auc, f1, average_precision), one value per replicate.
+    """
+    hist = np.asarray(hist, dtype=np.float64)
+    neg, pos = hist[:, 0, :], hist[:, 1, :]
+    n_neg, n_pos = neg.sum(axis=1), pos.sum(axis=1)
+
+    # AUC: positives in a bin beat all negatives in lower bins and tie with their own bin
+    neg_below = np.cumsum(neg, axis=1) - neg
+    with np.errstate(invalid="ignore", divide="ignore"):
+        auc = (pos * (neg_below + 0.5 * neg)).sum(axis=1) / (n_pos * n_neg)
+
+        # F1 at the threshold: bins above the middle edge are predicted positive
+        half = hist.shape[2] // 2
+        tp = pos[:, half:].sum(axis=1)
+        fp = neg[:, half:].sum(axis=1)
+        fn = n_pos - tp
+        f1 = 2 * tp / (2 * tp + fp + fn)
+
+        # Average precision: precision at each threshold (high to low), weighted by recall gained
+        tp_cum = np.cumsum(pos[:, ::-1], axis=1)
+        fp_cum = np.cumsum(neg[:, ::-1], axis=1)
+        precision = tp_cum / (tp_cum + fp_cum)
+        ap = (np.nan_to_num(precision) * pos[:, ::-1]).sum(axis=1) / n_pos
+    return auc, f1, ap
+
+
+def bootstrap_ci(hist, n_bootstrap=1000, alpha=0.05, random_state=42, max_cells=2 ** 24):
+    """
+    Bootstrap confidence intervals of AUC, F1 and average precision.
 
-    models = {
-        "Logistic Regression": "models/logreg_best.pkl",
-        "Random Forest": "models/random_forest_best.pkl",
+    Resampling n rows with replacement only changes the histogram counts, so
+    each replicate is one multinomial draw over the (class, bin) cells; all
+    replicates are drawn and scored as matrices, in blocks of ``max_cells``.
+    """
+    rng = np.random.default_rng(random_state)
+    counts = hist.reshape(-1)
+    n = int(counts.sum())
+    probabilities = counts / n
+    block = max(1, max_cells // counts.size)
+    results = {"roc_auc": [], "f1": [], "average_precision": []}
+    for start in range(0, n_bootstrap, block):
+        size = min(block, n_bootstrap - start)
+        samples = rng.multinomial(n, probabilities, size=size).reshape(size, *hist.shape)
+        auc, f1, ap = histogram_metrics(samples)
+        results["roc_auc"].append(auc)
+        results["f1"].append(f1)
+        results["average_precision"].append(ap)
+
+    lower, upper = 100 * alpha / 2, 100 * (1 - alpha / 2)
+    return {
+        name: [float(np.nanpercentile(np.concatenate(values), lower)),
+               float(np.nanpercentile(np.concatenate(values), upper))]
+        for name, values in results.items()
     }
 
-    for name, path in models.items():
+
+def classification_summary(confusion):
+    """
+    Precision/recall/F1 per class and accuracy from a 2x2 confusion matrix.
+    """
+    confusion = np.asarray(confusion, dtype=np.float64)
+    summary = {}
+    for label in (0, 1):
+        tp = confusion[label, label]
+        predicted = confusion[:, label].sum()
+        actual = confusion[label, :].sum()
+        precision = tp / predicted if predicted else 0.0
+        recall = tp / actual if actual else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        summary[str(label)] = {
+            "precision": float(precision), "recall": float(recall), "f1": float(f1), "support": int(actual),
+        }
+    total = confusion.sum()
+    summary["accuracy"] = float(np.trace(confusion) / total) if total else 0.0
+    return summary
+
+
+# ===== Evaluation Engine =====
+
+def holdout_rows(config, path=None):
+    """
+    Sorted row positions of the hold-out set: the ones persisted by train.py,
+    else the same split recomputed from the target column alone.
+    """
+    holdout_path = config["output"].get("holdout_path")
+    if holdout_path and os.path.exists(holdout_path):
+        return np.load(holdout_path)
+
+    print("[WARN] No persisted hold-out rows, re-deriving the split from the target column")
+    path = path or config["paths"]["processed"]
+    split = config["split"]
+    y = load_processed(path, columns=[config["data"]["target"]]).iloc[:, 0].to_numpy()
+    positions = np.arange(len(y))
+    _, test_rows = train_test_split(
+        positions,
+        test_size=split["test_size"],
+        random_state=split["random_state"],
+        stratify=y if split.get("stratify") else None,
+    )
+    return np.sort(test_rows)
+
+
+def evaluate_models(models, batches, n_jobs=None, n_bins=N_BINS):
+    """
+    Score every batch with all models in parallel and accumulate their metrics.
+
+    Args:
+        models (dict): Name -> fitted classifier with predict_proba.
+        batches (iterable): (X, y) batches, e.g. from iter_training_batches.
+        n_jobs (int): Scoring threads (default: one per model).
+
+    Returns:
+        dict: Name -> StreamingMetrics.
+    """
+    metrics = {name: StreamingMetrics(n_bins) for name in models}
+
+    def score(name, X, y):
+        metrics[name].update(y, models[name].predict_proba(X)[:, 1])
+
+    with ThreadPoolExecutor(max_workers=n_jobs or max(1, len(models))) as pool:
+        for X, y in batches:
+            # predict_proba releases the GIL in its numeric kernels
+            futures = [pool.submit(score, name, X, y.to_numpy()) for name in models]
+            for future in futures:
+                future.result()
+    return metrics
+
+
+def print_report(name, report):
+    print(f"\n[INFO] {name} ({report['n_rows']} rows)")
+    print(f"{'':>10} {'precision':>10} {'recall':>10} {'f1':>10} {'support':>10}")
+    for label in ("0", "1"):
+        row = report[label]
+        print(f"{label:>10} {row['precision']:>10.4f} {row['recall']:>10.4f} {row['f1']:>10.4f} {row['support']:>10}")
+    print(f"{'accuracy':>10} {report['accuracy']:>43.4f}")
+    ci = report.get("ci", {})
+    values = {"roc_auc": report["roc_auc"], "average_precision": report["average_precision"], "f1": report["1"]["f1"]}
+    for metric, label in (("roc_auc", "AUC"), ("average_precision", "AP"), ("f1", "F1")):
+        value = values[metric]
+        interval = ci.get(metric)
+        suffix = f" (95% CI {interval[0]:.4f}-{interval[1]:.4f})" if interval else ""
+        print(f"{label}: {value:.4f}{suffix}")
+    print("Confusion Matrix:\n", np.asarray(report["confusion_matrix"]))
+
+
+def main(config_path="config.yaml", batch_size=100000, n_bootstrap=1000, report_path="reports/evaluation.json"):
+    print("[INFO] Loading config...")
+    config = load_config(config_path)
+
+    models = {}
+    for name, key in (("Logistic Regression", "logreg_path"), ("Random Forest", "rf_path")):
+        path = config["output"][key]
         if not os.path.exists(path):
             print(f"[WARN] {name} not found at {path}, skipping...")
             continue
+        models[name] = joblib.load(path)
+    if not models:
+        return {}
 
-        print(f"\n[INFO] Evaluating {name}...")
-        model = joblib.load(path)
-
-        y_pred = model.predict(X_test)
-        y_proba = model.predict_proba(X_test)[:, 1] if hasattr(model, "predict_proba") else None
+    # Hold-out rows only, streamed in batches: memory is bounded by batch_size
+    rows = holdout_rows(config)
+    print(f"[INFO] Evaluating {list(models)} on {len(rows)} hold-out rows...")
+    start = time.perf_counter()
+    metrics = evaluate_models(models, iter_training_batches(config, rows=rows, batch_size=batch_size))
+    print(f"[INFO] Scored in {time.perf_counter() - start:.1f}s")
 
-        print(classification_report(y_test, y_pred))
+    reports = {name: m.summary(n_bootstrap=n_bootstrap) for name, m in metrics.items()}
+    for name, report in reports.items():
+        print_report(name, report)
 
-        if y_proba is not None:
-            auc = roc_auc_score(y_test, y_proba)
-            print(f"AUC: {auc:.4f}")
+    if report_path:
+        os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+        with open(report_path, "w") as f:
+            json.dump(reports, f, indent=2)
+        print(f"\n[✓] Evaluation report saved to: {report_path}")
+    return reports
 
-        cm = confusion_matrix(y_test, y_pred)
-        print("Confusion Matrix:\n", cm)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,304 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+
+# Summarized training data the explainers integrate over, written by train.py
+BACKGROUND_PATH = "models/explainer_background.npz"
+BACKGROUND_SIZE = 100
+
+
+# ===== Background Data =====
+
+def summarize_background(X, size=BACKGROUND_SIZE, random_state=42, feature_names=None):
+    """
+    Summarize training features for explanations: the exact column means plus
+    a small random sample of rows.
+
+    Args:
+        X (pd.DataFrame | np.ndarray | scipy.sparse matrix): Training features.
+        size (int): Rows kept in the sample.
+        feature_names (list): Column names when X has none (e.g. sparse X).
+
+    Returns:
+        dict: ``mean``, ``data`` and ``feature_names`` arrays.
+    """
+    if feature_names is None:
+        feature_names = getattr(X, "columns", [])
+    rng = np.random.default_rng(random_state)
+    rows = np.sort(rng.choice(X.shape[0], size=min(size, X.shape[0]), replace=False))
+    if hasattr(X, "tocsr"):
+        # Sparse: means over the stored values, only the sampled rows densified
+        X = X.tocsr()
+        mean, data = np.asarray(X.mean(axis=0), dtype=np.float64).ravel(), X[rows].toarray().astype(np.float64)
+    else:
+        values = np.asarray(X, dtype=np.float64)
+        mean, data = values.mean(axis=0), values[rows]
+    return {
+        "mean": mean,
+        "data": data,
+        "feature_names": np.asarray(feature_names, dtype=str),
+    }
+
+
+def save_background(X, path=BACKGROUND_PATH, size=BACKGROUND_SIZE, feature_names=None):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez(path, **summarize_background(X, size=size, feature_names=feature_names))
+
+
+def load_background(path=BACKGROUND_PATH):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Explainer background not found: {path} (written by src.train)")
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+# ===== Explainers =====
+
+class LinearShap:
+    """
+    Exact SHAP values of a logistic model in log-odds space (independent
+    features): ``coef * (x - background mean)``. Closed form, no sampling.
+    """
+
+    output = "log_odds"
+
+    def __init__(self, model, background):
+        self.coef = np.asarray(model.coef_[0], dtype=np.float64)
+        self.mean = np.asarray(background["mean"], dtype=np.float64)
+        self.expected_value = float(model.intercept_[0] + self.coef @ self.mean)
+
+    def shap_values(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean) * self.coef
+
+
+class TreeShap:
+    """
+    Tree SHAP (path-dependent) of a random forest, in probability space.
+    ``shap`` is imported only when a forest is explained.
+    """
+
+    output = "probability"
+
+    def __init__(self, model, background=None):
+        import shap
+
+        self.explainer = shap.TreeExplainer(model)
+        expected = np.atleast_1d(self.explainer.expected_value)
+        self.expected_value = float(expected[-1])
+
+    def shap_values(self, X):
+        values = self.explainer.shap_values(np.asarray(X, dtype=np.float64), check_additivity=False)
+        # Older shap: list per class; newer: (n, features, classes)
+        if isinstance(values, list):
+            return np.asarray(values[-1])
+        values = np.asarray(values)
+        return values[..., -1] if values.ndim == 3 else values
+
+
+def make_explainer(model, background):
+    if hasattr(model, "coef_"):
+        return LinearShap(model, background)
+    if hasattr(model, "estimators_"):
+        return TreeShap(model, background)
+    raise TypeError(f"No explainer for model type {type(model).__name__}")
+
+
+# ===== Service =====
+
+class ExplanationService:
+    """
+    Per-row SHAP explanations for the served models.
+
+    One explainer is built per model version (rebuilt when the registry
+    reloads a model) and results are kept in an LRU cache keyed by the
+    model version and a hash of the feature vector, so repeated applicants
+    cost a dictionary lookup. Cache misses are explained in one batch.
+
+    Args:
+        registry (ModelRegistry): Source of the (pickled) models.
+        background_path (str): Output of save_background.
+        cache_size (int): Explained rows kept in the LRU cache.
+    """
+
+    def __init__(self, registry, background_path=BACKGROUND_PATH, cache_size=10000):
+        self.registry = registry
+        self.background_path = background_path
+        self.cache_size = cache_size
+        self._explainers = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def explainer(self, name):
+        """
+        Return (model entry, explainer) for the current version of ``name``.
+        """
+        entry = self.registry.get_entry(name)
+        key = (name, entry.sha256)
+        explainer = self._explainers.get(key)
+        if explainer is None:
+            explainer = make_explainer(entry.model, load_background(self.background_path))
+            with self._lock:
+                # Drop explainers of replaced versions
+                for old in [k for k in self._explainers if k[0] == name]:
+                    del self._explainers[old]
+                self._explainers[key] = explainer
+        return entry, explainer
+
+    def explain(self, name, X):
+        """
+        SHAP values for every row of X (in the model's feature order).
+
+        Returns:
+            dict: ``version``, ``output``, ``expected_value``, ``feature_names``
+            and ``values`` (n_rows x n_features).
+        """
+        entry, explainer = self.explainer(name)
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        keys = [(name, entry.sha256, hashlib.blake2b(row.tobytes(), digest_size=16).digest()) for row in X]
+
+        values = np.empty(X.shape)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    values[i] = cached
+
+        if missing:
+            computed = explainer.shap_values(X[missing])
+            values[missing] = computed
+            with self._lock:
+                for i, row_values in zip(missing, computed):
+                    self._cache[keys[i]] = row_values
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        feature_names = getattr(entry.model, "feature_names_in_", None)
+        return {
+            "version": entry.version,
+            "output": explainer.output,
+            "expected_value": explainer.expected_value,
+            "feature_names": [str(f) for f in feature_names] if feature_names is not None else None,
+            "values": values,
+        }
+
+
+# ===== Global (Offline) Explanations =====
+
+def stratified_sample(X, y, size, random_state=42):
+    """
+    Sample ``size`` rows of X keeping the class proportions of y.
+    """
+    if size is None or size >= len(X):
+        return X
+    y = pd.Series(np.asarray(y), index=X.index)
+    fraction = size / len(X)
+    index = y.groupby(y).sample(frac=fraction, random_state=random_state).index
+    return X.loc[X.index.isin(index)]
+
+
+# Per-process state of the SHAP worker pool
+_worker = {}
+
+
+def _init_worker(model_path, background, inputs_path, values_path):
+    _worker["explainer"] = make_explainer(joblib.load(model_path), background)
+    _worker["inputs"] = np.load(inputs_path, mmap_mode="r")
+    _worker["values"] = np.load(values_path, mmap_mode="r+")
+
+
+def _explain_chunk(bounds):
+    start, stop = bounds
+    values = _worker["values"]
+    values[start:stop] = _worker["explainer"].shap_values(np.asarray(_worker["inputs"][start:stop]))
+    values.flush()
+    return stop - start
+
+
+def compute_shap_values(model, X, output_dir, chunk_size=10000, n_jobs=-1, background=None):
+    """
+    SHAP values for every row of X, computed in chunks across a process pool
+    and written straight into a memory-mapped ``shap_values.npy``.
+
+    Memory stays bounded by ``chunk_size`` rows per worker: the inputs are
+    spilled to ``shap_inputs.npy`` once and workers read and write their
+    slices of the memory-mapped arrays.
+
+    Args:
+        model: Fitted LogisticRegression or RandomForestClassifier.
+        X (pd.DataFrame | np.ndarray): Rows to explain.
+        output_dir (str): Where the .npy files are written.
+        chunk_size (int): Rows per task.
+        n_jobs (int): Worker processes (-1: all CPUs, 1: in-process).
+        background (dict): Output of summarize_background (default: from X).
+
+    Returns:
+        tuple: (values memmap, inputs memmap, expected value)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    n_rows, n_features = X.shape
+    inputs_path = os.path.join(output_dir, "shap_inputs.npy")
+    values_path = os.path.join(output_dir, "shap_values.npy")
+
+    inputs = open_memmap(inputs_path, mode="w+", dtype=np.float64, shape=(n_rows, n_features))
+    for start in range(0, n_rows, chunk_size):
+        chunk = X.iloc[start:start + chunk_size] if hasattr(X, "iloc") else X[start:start + chunk_size]
+        inputs[start:start + chunk_size] = np.asarray(chunk, dtype=np.float64)
+    inputs.flush()
+    open_memmap(values_path, mode="w+", dtype=np.float64, shape=(n_rows, n_features)).flush()
+
+    if background is None:
+        background = summarize_background(inputs)
+    explainer = make_explainer(model, background)
+    chunks = [(start, min(start + chunk_size, n_rows)) for start in range(0, n_rows, chunk_size)]
+    n_jobs = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+
+    if n_jobs <= 1 or len(chunks) == 1:
+        values = np.load(values_path, mmap_mode="r+")
+        for start, stop in chunks:
+            values[start:stop] = explainer.shap_values(np.asarray(inputs[start:stop]))
+        values.flush()
+    else:
+        # Workers load the model once each from a temporary pickle
+        with tempfile.NamedTemporaryFile(suffix=".pkl", dir=output_dir, delete=False) as f:
+            model_path = f.name
+        try:
+            joblib.dump(model, model_path)
+            with ProcessPoolExecutor(
+                max_workers=min(n_jobs, len(chunks)),
+                initializer=_init_worker,
+                initargs=(model_path, background, inputs_path, values_path),
+            ) as pool:
+                done = 0
+                for rows in pool.map(_explain_chunk, chunks):
+                    done += rows
+            print(f"[INFO] SHAP values computed for {done} rows in {len(chunks)} chunks")
+        finally:
+            os.remove(model_path)
+
+    return np.load(values_path, mmap_mode="r"), np.load(inputs_path, mmap_mode="r"), explainer.expected_value
+
+
+def global_importance(values, feature_names, chunk_size=100000):
+    """
+    Mean |SHAP| per feature, accumulated chunk by chunk from a (memory-mapped) array.
+
+    Returns:
+        pd.Series: Importance per feature, sorted descending.
+    """
+    total = np.zeros(values.shape[1])
+    for start in range(0, len(values), chunk_size):
+        total += np.abs(np.asarray(values[start:start + chunk_size])).sum(axis=0)
+    importance = pd.Series(total / max(len(values), 1), index=list(feature_names), name="mean_abs_shap")
+    return importance.sort_values(ascending=False)
@@ -0,0 +1,223 @@
+import math
+import weakref
+
+import numpy as np
+
+# Schemas of live model objects, built without / per live pipeline object
+# (dropped when a reloaded model or pipeline replaces them)
+_schemas = weakref.WeakKeyDictionary()
+_pipeline_schemas = weakref.WeakKeyDictionary()
+
+
+def _encode(value, table, unknown=None):
+    """
+    Numeric value of one field: table code for known labels, else float(value),
+    else the table's unknown code.
+    """
+    if value is None:
+        return math.nan
+    if table is not None:
+        code = table.get(str(value))
+        if code is not None:
+            return code
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        if unknown is None:
+            raise
+        return unknown
+
+
+class FeatureSchema:
+    """
+    Precompiled mapping from request fields to model input columns.
+
+    Derived once from the model's ``feature_names_in_``, so the column order
+    always follows training instead of a hand-maintained list. Requests are
+    written straight into preallocated float32 rows (or a batch matrix);
+    label-encoded categoricals are looked up in precomputed tables, unseen
+    labels taking the vocabulary's unknown code. One-hot features can also
+    be given as their raw column (e.g. ``productcategory="airtime"``), which
+    is expanded on the fitted layout.
+
+    Rows hold raw values; ``normalize`` then applies the pipeline's fitted
+    imputation and scaling, so the model sees what ``pipeline.transform``
+    would give it.
+
+    Args:
+        feature_names (list): Model input columns, in order.
+        categorical_tables (dict): Column -> {raw label: code}.
+        unknown_codes (dict): Column -> code of unseen labels.
+        one_hot_columns (dict): Raw column -> {category: one-hot feature name}.
+        fills (dict): Column -> imputed value of missing entries.
+        scaling (dict): Column -> (mean, scale) of the fitted scaler.
+    """
+
+    def __init__(self, feature_names, categorical_tables=None, unknown_codes=None, one_hot_columns=None,
+                 fills=None, scaling=None):
+        self.feature_names = [str(name) for name in feature_names]
+        self.index = {name: i for i, name in enumerate(self.feature_names)}
+        self.tables = {
+            col: table for col, table in (categorical_tables or {}).items() if col in self.index
+        }
+        unknown_codes = unknown_codes or {}
+        self._fields = [
+            (name, i, self.tables.get(name), unknown_codes.get(name)) for i, name in enumerate(self.feature_names)
+        ]
+        # Raw column -> {category: feature index}, for the features present in the model
+        self.one_hot = {}
+        for raw, columns in (one_hot_columns or {}).items():
+            group = {str(cat): self.index[name] for cat, name in columns.items() if name in self.index}
+            if group:
+                self.one_hot[raw] = group
+        self.one_hot_sources = {
+            self.feature_names[i]: raw for raw, group in self.one_hot.items() for i in group.values()
+        }
+        # Per-column imputation value (NaN: none) and affine scaling, as arrays for normalize
+        self._fill = np.full(self.n_features, np.nan)
+        self._mean = np.zeros(self.n_features)
+        self._scale = np.ones(self.n_features)
+        for col, value in (fills or {}).items():
+            if col in self.index:
+                self._fill[self.index[col]] = value
+        for col, (mean, scale) in (scaling or {}).items():
+            if col in self.index:
+                self._mean[self.index[col]] = mean
+                self._scale[self.index[col]] = scale
+
+    @classmethod
+    def from_model(cls, model, pipeline=None):
+        """
+        Build the schema of a fitted model.
+
+        Args:
+            model: Estimator (or CompiledModel) with ``feature_names_in_``.
+            pipeline: Fitted preprocessing pipeline whose label encoders
+                provide the categorical tables, and whose imputer and
+                scaler provide the fills and scaling (optional).
+        """
+        names = getattr(model, "feature_names_in_", None)
+        if names is None:
+            raise ValueError("Model was fitted without feature names")
+        tables, unknown, one_hot, fills, scaling = {}, {}, {}, {}, {}
+        steps = pipeline.named_steps if pipeline is not None else {}
+        if "missing_value_imputation" in steps:
+            imputer = steps["missing_value_imputation"]
+            fills = dict(zip(imputer.num_cols, imputer.num_imputer.statistics_))
+        if "scaling" in steps:
+            scaler = steps["scaling"]
+            scaling = {
+                col: (mean, scale)
+                for col, mean, scale in zip(scaler.num_cols, scaler.scaler.mean_, scaler.scaler.scale_)
+            }
+        if "categorical_encoding" in steps:
+            encoder = steps["categorical_encoding"]
+            for col, vocab in encoder.vocabularies_.items():
+                tables[col] = {str(label): float(code) for label, code in vocab.codes.items()}
+                unknown[col] = float(vocab.unknown_code)
+            one_hot = {
+                col: {cat: f"{col}_{cat}" for cat in categories[1:]}
+                for col, categories in encoder.categories_.items()
+            }
+        return cls(names, tables, unknown, one_hot, fills, scaling)
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    def check_fields(self, field_names, optional=()):
+        """
+        Fail fast when a request model cannot provide every model feature
+        (directly, or through the raw column of a one-hot feature).
+
+        Raises:
+            ValueError: Listing features that are neither fields nor optional.
+        """
+        missing = [
+            name for name in self.feature_names
+            if name not in field_names and name not in optional and self.one_hot_sources.get(name) not in field_names
+        ]
+        if missing:
+            raise ValueError(f"Request model is missing model features: {missing}")
+
+    def row(self, request, out=None):
+        """
+        Write one request (pydantic model or dict) into a float32 row.
+        Absent or None fields become NaN.
+        """
+        if out is None:
+            out = np.empty(self.n_features, dtype=np.float32)
+        get = request.get if isinstance(request, dict) else lambda name: getattr(request, name, None)
+        for name, i, table, unknown in self._fields:
+            out[i] = _encode(get(name), table, unknown)
+        for raw, group in self.one_hot.items():
+            value = get(raw)
+            if value is not None:
+                for i in group.values():
+                    out[i] = 0.0
+                i = group.get(str(value))
+                if i is not None:
+                    out[i] = 1.0
+        return out
+
+    def normalize(self, X):
+        """
+        Impute and scale raw rows (from row/matrix/from_columns) like the
+        fitted pipeline: missing values take the imputer's fill, then
+        ``(x - mean) / scale``. Columns without a fill stay NaN when missing.
+
+        Returns:
+            np.ndarray: float32 matrix of model inputs.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        X = np.where(np.isnan(X), self._fill, X)
+        return ((X - self._mean) / self._scale).astype(np.float32)
+
+    def matrix(self, requests):
+        """
+        Write many requests into one (n, n_features) float32 matrix.
+        """
+        X = np.empty((len(requests), self.n_features), dtype=np.float32)
+        for r, request in enumerate(requests):
+            self.row(request, out=X[r])
+        return X
+
+    def from_columns(self, columns, n_rows):
+        """
+        Build the float32 matrix from columnar input (feature -> list of values).
+        Features absent from ``columns`` are NaN.
+        """
+        X = np.full((n_rows, self.n_features), np.nan, dtype=np.float32)
+        for name, i, table, unknown in self._fields:
+            values = columns.get(name)
+            if values is None:
+                continue
+            if table is None:
+                try:
+                    X[:, i] = np.asarray(values, dtype=np.float64)
+                    continue
+                except (TypeError, ValueError):
+                    pass
+            X[:, i] = [_encode(value, table, unknown) for value in values]
+        for raw, group in self.one_hot.items():
+            values = columns.get(raw)
+            if values is None:
+                continue
+            values = np.asarray(values, dtype=object)
+            given = np.array([value is not None for value in values], dtype=bool)
+            labels = values.astype(str)
+            for category, i in group.items():
+                X[given, i] = labels[given] == category
+        return X
+
+
+def schema_for(model, pipeline=None):
+    """
+    Schema of ``model`` with ``pipeline``, built on first use and reused while
+    both objects live (a reloaded model or pipeline gets a new schema).
+    """
+    cache = _schemas if pipeline is None else _pipeline_schemas.setdefault(pipeline, weakref.WeakKeyDictionary())
+    schema = cache.get(model)
+    if schema is None:
+        schema = cache[model] = FeatureSchema.from_model(model, pipeline)
+    return schema
@@ -0,0 +1,243 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Snapshot of the online customer feature store, written by process_data
+STORE_PATH = 'models/customer_features.npz'
+
+AGGREGATE_COLUMNS = ['total_amount', 'average_amount', 'transaction_count', 'amount_std']
+
+
+class CustomerFeatureStore:
+    """
+    Online per-customer amount aggregates.
+
+    Keeps running sufficient statistics (count, sum, mean and Welford's M2)
+    in flat NumPy arrays indexed through a customer id -> row dict, so a new
+    transaction is an O(1) update and lookups never rescan history. The
+    aggregates match ``groupby(customerid)[amount].agg(['sum', 'mean', 'count', 'std']).fillna(0)``.
+
+    Updates, growth and lookups hold one lock: the API records transactions
+    from threadpool workers while other requests read the arrays.
+
+    Args:
+        capacity (int): Initial number of customer rows to allocate.
+    """
+
+    def __init__(self, capacity=1024):
+        self.index = {}
+        self.ids = []
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.total = np.zeros(capacity, dtype=np.float64)
+        self.mean = np.zeros(capacity, dtype=np.float64)
+        self.m2 = np.zeros(capacity, dtype=np.float64)
+        self._id_index = None
+        # Transactions recorded so far, and as of the last save (snapshot writers skip unchanged stores)
+        self.updates = 0
+        self.saved_updates = 0
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        # Stores are pickled by the stage cache; locks are not picklable
+        state = self.__dict__.copy()
+        state.pop('_lock', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update({'updates': 0, 'saved_updates': 0, **state})
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, customer_id):
+        return str(customer_id) in self.index
+
+    # ===== Updates =====
+
+    def _grow(self, size):
+        capacity = len(self.count)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ('count', 'total', 'mean', 'm2'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _row(self, customer_id):
+        key = str(customer_id)
+        row = self.index.get(key)
+        if row is None:
+            row = len(self.ids)
+            self._grow(row + 1)
+            self.index[key] = row
+            self.ids.append(key)
+            self._id_index = None
+        return row
+
+    def update(self, customer_id, amount):
+        """
+        Add one transaction (Welford's online update).
+        """
+        if amount is None or np.isnan(amount):
+            return
+        with self._lock:
+            row = self._row(customer_id)
+            n = self.count[row] + 1
+            delta = amount - self.mean[row]
+            self.count[row] = n
+            self.total[row] += amount
+            self.mean[row] += delta / n
+            self.m2[row] += delta * (amount - self.mean[row])
+            self.updates += 1
+
+    def update_many(self, customer_ids, amounts):
+        """
+        Add a batch of transactions: per-customer batch statistics are merged
+        into the running ones with Chan et al.'s parallel update.
+        """
+        customer_ids = pd.Series(customer_ids).to_numpy()
+        amounts = np.asarray(amounts, dtype=np.float64)
+        codes, uniques = pd.factorize(customer_ids)
+        keep = (codes >= 0) & ~np.isnan(amounts)
+        codes, amounts = codes[keep], amounts[keep]
+        if len(codes) == 0:
+            return
+
+        n_b = np.bincount(codes, minlength=len(uniques)).astype(np.int64)
+        present = n_b > 0
+        sum_b = np.bincount(codes, weights=amounts, minlength=len(uniques))
+        mean_b = np.divide(sum_b, n_b, out=np.zeros_like(sum_b), where=present)
+        m2_b = np.bincount(codes, weights=(amounts - mean_b[codes]) ** 2, minlength=len(uniques))
+
+        n_b, sum_b, mean_b, m2_b = n_b[present], sum_b[present], mean_b[present], m2_b[present]
+        with self._lock:
+            rows = np.array([self._row(customer_id) for customer_id in uniques[present]], dtype=np.int64)
+            n_a = self.count[rows]
+            n = n_a + n_b
+            delta = mean_b - self.mean[rows]
+            self.mean[rows] += delta * n_b / n
+            self.m2[rows] += m2_b + delta ** 2 * n_a * n_b / n
+            self.count[rows] = n
+            self.total[rows] += sum_b
+            self.updates += len(codes)
+
+    # ===== Lookups =====
+
+    def _stats(self, rows):
+        count = self.count[rows]
+        variance = np.divide(self.m2[rows], count - 1, out=np.zeros(len(rows)), where=count > 1)
+        return {
+            'total_amount': self.total[rows],
+            'average_amount': self.mean[rows],
+            'transaction_count': count,
+            'amount_std': np.sqrt(np.maximum(variance, 0.0)),
+        }
+
+    def get(self, customer_id):
+        """
+        Aggregates for one customer, or None if the customer is unknown.
+        """
+        with self._lock:
+            row = self.index.get(str(customer_id))
+            if row is None:
+                return None
+            stats = self._stats(np.array([row]))
+        return {name: values[0].item() for name, values in stats.items()}
+
+    def lookup(self, customer_ids):
+        """
+        Vectorized aggregates for many customers (unknown customers get zeros).
+
+        Returns:
+            dict: Column name -> array aligned with ``customer_ids``.
+        """
+        keys = pd.Index(pd.Series(customer_ids).astype(str).to_numpy())
+        with self._lock:
+            if self._id_index is None:
+                self._id_index = pd.Index(self.ids)
+            rows = self._id_index.get_indexer(keys)
+            known = rows >= 0
+            stats = self._stats(np.where(known, rows, 0))
+        return {
+            name: np.where(known, values, 0).astype(values.dtype)
+            for name, values in stats.items()
+        }
+
+    # ===== Persistence =====
+
+    def save(self, path=STORE_PATH):
+        """
+        Snapshot the store to a ``.npz`` file (written atomically).
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        with self._lock:
+            size = len(self.ids)
+            updates = self.updates
+            snapshot = {
+                'ids': np.array(self.ids, dtype=str),
+                'count': self.count[:size].copy(),
+                'total': self.total[:size].copy(),
+                'mean': self.mean[:size].copy(),
+                'm2': self.m2[:size].copy(),
+            }
+        np.savez(tmp_path, **snapshot)
+        os.replace(tmp_path, path)
+        self.saved_updates = updates
+
+    @classmethod
+    def load(cls, path=STORE_PATH):
+        with np.load(path) as snapshot:
+            ids = snapshot['ids'].tolist()
+            store = cls(capacity=max(len(ids), 1))
+            for name in ('count', 'total', 'mean', 'm2'):
+                getattr(store, name)[:len(ids)] = snapshot[name]
+        store.ids = ids
+        store.index = {customer_id: row for row, customer_id in enumerate(ids)}
+        return store
+
+    @classmethod
+    def from_frame(cls, df, customer_id_col='customerid', amount_col='amount'):
+        store = cls(capacity=max(df[customer_id_col].nunique(), 1))
+        store.update_many(df[customer_id_col], df[amount_col])
+        return store
+
+
+# ===== Shared Live Stores =====
+
+# Snapshot path -> the process's live store for it: the pipeline's aggregate
+# stage and the API read and update the same object
+_shared_stores = {}
+_shared_lock = threading.Lock()
+
+
+def shared_store(path=STORE_PATH):
+    """
+    The process-wide live store of a snapshot path, loaded from the snapshot
+    on first use (empty if there is none yet).
+    """
+    key = os.path.abspath(path)
+    with _shared_lock:
+        store = _shared_stores.get(key)
+        if store is None:
+            if os.path.exists(path):
+                store = CustomerFeatureStore.load(path)
+            else:
+                store = CustomerFeatureStore()
+            _shared_stores[key] = store
+        return store
+
+
+def register_store(store, path=STORE_PATH):
+    """
+    Make ``store`` the live store of ``path`` (e.g. right after writing its snapshot).
+    """
+    with _shared_lock:
+        _shared_stores[os.path.abspath(path)] = store
+    return store
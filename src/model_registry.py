@@ -0,0 +1,139 @@
+import hashlib
+import os
+import threading
+import time
+
+import joblib
+
+
+class LoadedModel:
+    """
+    A deserialized model together with the file state it was loaded from.
+    """
+
+    def __init__(self, name, path, model, mtime_ns, size, sha256):
+        self.name = name
+        self.path = path
+        self.model = model
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.sha256 = sha256
+        self.loaded_at = time.time()
+
+    @property
+    def version(self):
+        return self.sha256[:12]
+
+    def info(self):
+        return {
+            "path": self.path,
+            "version": self.version,
+            "sha256": self.sha256,
+            "mtime_ns": self.mtime_ns,
+            "loaded_at": self.loaded_at,
+        }
+
+
+def dump_atomic(obj, path):
+    """
+    joblib.dump to a temporary file in the same directory, then os.replace it
+    over ``path``: registries watching the path never see a partial file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    In-process cache of trained models.
+
+    Each artifact is unpickled once and kept in memory. On access the file's
+    mtime/size is checked (at most every ``check_interval`` seconds); when it
+    changed and the content hash differs, the new model is loaded and swapped
+    in atomically, so a retrained model goes live without a restart. If the
+    new file fails to load, the previous model keeps serving (and the load is
+    retried on a later check).
+
+    Args:
+        paths (dict): Model name -> artifact path.
+        check_interval (float): Minimum seconds between file checks per model.
+        loader (callable): Deserializes an artifact path (joblib.load by default).
+    """
+
+    def __init__(self, paths=None, check_interval=1.0, loader=joblib.load):
+        self.paths = dict(paths or {})
+        self.check_interval = check_interval
+        self.loader = loader
+        self._entries = {}
+        self._last_checked = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, path):
+        with self._lock:
+            self.paths[name] = path
+            self._entries.pop(name, None)
+            self._last_checked.pop(name, None)
+
+    def get(self, name):
+        """
+        Return the in-memory model for ``name``, reloading it if the file changed.
+        """
+        return self.get_entry(name).model
+
+    def get_entry(self, name):
+        if name not in self.paths:
+            raise KeyError(f"Unknown model: {name}")
+
+        entry = self._entries.get(name)
+        now = time.monotonic()
+        if entry is not None and now - self._last_checked.get(name, 0.0) < self.check_interval:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(name)
+            path = self.paths[name]
+            if not os.path.exists(path):
+                if entry is not None:
+                    # Keep serving the last good model while the file is being replaced
+                    return entry
+                raise FileNotFoundError(f"Model file not found: {path}")
+
+            stat = os.stat(path)
+            self._last_checked[name] = now
+            if entry is not None and (stat.st_mtime_ns, stat.st_size) == (entry.mtime_ns, entry.size):
+                return entry
+
+            sha256 = file_sha256(path)
+            if entry is not None and sha256 == entry.sha256:
+                # Touched but unchanged: remember the new stamp, skip the unpickle
+                entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+                return entry
+
+            try:
+                model = self.loader(path)
+            except Exception as e:
+                if entry is None:
+                    raise
+                print(f"[WARN] Reloading model '{name}' from {path} failed ({type(e).__name__}: {e}); "
+                      f"keeping version {entry.version}")
+                return entry
+            entry = LoadedModel(name, path, model, stat.st_mtime_ns, stat.st_size, sha256)
+            self._entries[name] = entry
+            print(f"[INFO] Loaded model '{name}' version {entry.version} from {path}")
+            return entry
+
+    def versions(self):
+        """
+        Loaded version info per model (models not loaded yet are omitted).
+        """
+        return {name: entry.info() for name, entry in self._entries.items()}
@@ -1,51 +1,165 @@
-import pandas as pd
+import numpy as np
 import joblib
+import functools
+import logging
 import os
+import random
+from src.compiled_model import CompiledModel, compiled_path
+from src.ensemble import EnsembleScorer
+from src.model_registry import ModelRegistry
+from src.utils.config import load_config
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Fraction of scoring calls that are logged (keeps stdout I/O off the hot path)
+LOG_SAMPLE_RATE = 0.01
+
+# === Model Paths ===
+MODEL_PATHS = {
+    "logreg": "models/logreg_best.pkl",
+    "random_forest": "models/random_forest_best.pkl"
+}
+
+# Models are unpickled once per process and hot-swapped when the file changes;
+# their NumPy arrays are memory-mapped read-only instead of copied into the heap
+registry = ModelRegistry(MODEL_PATHS, loader=functools.partial(joblib.load, mmap_mode="r"))
+
+# NumPy-compiled exports of the same models (see src/compiled_model.py),
+# preferred for scoring when present
+compiled_registry = ModelRegistry(
+    {name: compiled_path(path) for name, path in MODEL_PATHS.items()}, loader=CompiledModel.load
+)
 
 def load_model(model_path):
     if not os.path.exists(model_path):
         raise FileNotFoundError(f"Model file not found: {model_path}")
-    return joblib.load(model_path)
+    return joblib.load(model_path, mmap_mode="r")
 
-def run_model(model, features):
-    # Log the features being predicted
-    print("Predicting with features:", features)
+def get_model(name):
+    """
+    Scoring model for ``name``: the compiled export if one exists, else the pickled estimator.
+    """
+    try:
+        return compiled_registry.get(name)
+    except FileNotFoundError:
+        return registry.get(name)
 
-    preds = model.predict(features)  # Ensure features is a DataFrame or 2D array
-    proba = model.predict_proba(features)[:, 1]
+def served_versions():
+    """
+    Version info of the artifact each loaded model is scored from (what
+    get_model returns): the compiled export when one is loaded, else the pickle.
+    """
+    compiled, pickled = compiled_registry.versions(), registry.versions()
+    versions = {}
+    for name in MODEL_PATHS:
+        if name in compiled:
+            versions[name] = dict(compiled[name], artifact="compiled")
+        elif name in pickled:
+            versions[name] = dict(pickled[name], artifact="pickle")
+    return versions
 
-    print("Predictions:", preds)
-    print("Probabilities:", proba)
+def run_model(model, features, name=None):
+    # A single predict_proba call serves both outputs, for one row or many
+    with metrics.timer("predict", model=name):
+        proba = model.predict_proba(features)[:, 1]
+        preds = model.classes_[(proba > 0.5).astype(int)]
+
+    # Sampled, one-line summary instead of the full frame
+    if random.random() < LOG_SAMPLE_RATE and logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "prediction model=%s rows=%d positives=%d mean_probability=%.4f",
+            name, len(proba), int((proba > 0.5).sum()), float(proba.mean()) if len(proba) else 0.0,
+        )
 
     return preds, proba
 
-def run_predictions(model_choice="both", features=None):
-    # === Model Paths ===
-    model_paths = {
-        "logreg": "models/logreg_best.pkl",
-        "random_forest": "models/random_forest_best.pkl"
-    }
+# Result key prefix per model
+RESULT_PREFIX = {"logreg": "logreg", "random_forest": "rf"}
+
+_ensemble = []
+
+def score_model(name, features):
+    """Positive-class probabilities of one registry model (ensemble worker)."""
+    with metrics.timer("model_load", model=name):
+        model = get_model(name)
+    return run_model(model, features, name=name)[1]
+
+def get_ensemble():
+    """
+    Concurrent ensemble of the served models, configured by ``serving.ensemble``.
+    """
+    if not _ensemble:
+        _ensemble.append(EnsembleScorer.from_config(score_model, load_config()))
+    return _ensemble[0]
+
+def run_ensemble_predictions(features, budget_ms=None):
+    """
+    Score ``features`` with all ensemble models concurrently.
+
+    Returns:
+        dict: Per-model and ``ensemble_`` arrays of predictions and risk
+        probabilities, plus ``model_used`` ("ensemble", or the fallback model
+        when the latency budget ran out) and per-model ``timings_ms``.
+    """
+    result = get_ensemble().score(features, budget_ms=budget_ms)
+    metrics.observe("ensemble", result["timings_ms"]["total"] / 1e3, model=result["model_used"])
+
+    results = {}
+    for name, proba in result["probabilities"].items():
+        prefix = RESULT_PREFIX.get(name, name)
+        results[f"{prefix}_prediction"] = (proba > 0.5).astype(int)
+        results[f"{prefix}_risk_probability"] = proba
+    results["ensemble_prediction"] = (result["probability"] > 0.5).astype(int)
+    results["ensemble_risk_probability"] = result["probability"]
+    results["model_used"] = result["model_used"]
+    results["timings_ms"] = result["timings_ms"]
+    return results
+
+def run_batch_predictions(model_choice="both", features=None, budget_ms=None):
+    """
+    Score every row of ``features`` with one vectorized call per model.
+
+    Args:
+        model_choice (str): "logreg", "random_forest" or "both" (the
+            concurrent ensemble, see run_ensemble_predictions).
+        features (pd.DataFrame): Feature matrix in training column order.
+        budget_ms (float): Latency budget of the ensemble ("both" only).
+
+    Returns:
+        dict: Per-model arrays of predictions and risk probabilities.
+    """
+    if model_choice == "both":
+        return run_ensemble_predictions(features, budget_ms=budget_ms)
 
     models = {}
 
-    # Load the models
-    if model_choice in ["logreg", "both"]:
-        models["logreg"] = load_model(model_paths["logreg"])
+    # Fetch the models from the in-memory registries
+    if model_choice == "logreg":
+        with metrics.timer("model_load", model="logreg"):
+            models["logreg"] = get_model("logreg")
 
-    if model_choice in ["random_forest", "both"]:
-        models["random_forest"] = load_model(model_paths["random_forest"])
+    if model_choice == "random_forest":
+        with metrics.timer("model_load", model="random_forest"):
+            models["random_forest"] = get_model("random_forest")
 
     # Run Predictions
     results = {}
 
     if "logreg" in models:
-        preds, proba = run_model(models["logreg"], features)
-        results["logreg_prediction"] = preds[0]  # Assuming single input
-        results["logreg_risk_probability"] = proba[0]
+        preds, proba = run_model(models["logreg"], features, name="logreg")
+        results["logreg_prediction"] = preds
+        results["logreg_risk_probability"] = proba
 
     if "random_forest" in models:
-        preds, proba = run_model(models["random_forest"], features)
-        results["rf_prediction"] = preds[0]  # Assuming single input
-        results["rf_risk_probability"] = proba[0]
+        preds, proba = run_model(models["random_forest"], features, name="random_forest")
+        results["rf_prediction"] = preds
+        results["rf_risk_probability"] = proba
+
+    return results
+
+def run_predictions(model_choice="both", features=None, budget_ms=None):
+    results = run_batch_predictions(model_choice=model_choice, features=features, budget_ms=budget_ms)
 
-    return results
\ No newline at end of file
+    # Single input: unwrap the first (only) row of every per-row result
+    return {key: values[0] if isinstance(values, np.ndarray) else values for key, values in results.items()}
@@ -1,89 +1,117 @@
 import os
-import joblib
-import pandas as pd
-from sklearn.model_selection import train_test_split, GridSearchCV
+import time
+import numpy as np
+from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
+from src.compiled_model import build_compiled, compiled_path, save_compiled
+from src.explain import BACKGROUND_PATH, save_background
+from src.model_registry import dump_atomic
+from src.tuning import make_cv_splits, search_model
+from src.utils.config import load_config
+from src.utils.data_io import load_sparse_training_data, load_training_data, storage_format
 
-# ======================
-# 1. Load Processed Data
-# ======================
-print("[INFO] Loading dataset...")
-df = pd.read_csv("data/processed/processed.csv")
+# config.yaml "models" entries -> estimator class and "output" path key
+ESTIMATORS = {
+    "logistic_regression": (LogisticRegression, "logreg_path"),
+    "random_forest": (RandomForestClassifier, "rf_path"),
+}
 
-# ======================
-# 2. Drop Unnecessary Columns
-# ======================
-drop_cols = [
-    "is_high_risk",
-    "transactionid",
-    "batchid",
-    "accountid",
-    "subscriptionid",
-    "customerid",
-    "transactionstarttime"
-]
-drop_cols = [col for col in drop_cols if col in df.columns]  # only drop if exists
 
-X = df.drop(columns=drop_cols)
-y = df["is_high_risk"]
+def main(config_path="config.yaml"):
+    config = load_config(config_path)
 
-# ======================
-# 3. Handle Column Types
-# ======================
-# Convert boolean to int
-bool_cols = X.select_dtypes(include="bool").columns
-if len(bool_cols) > 0:
-    X[bool_cols] = X[bool_cols].astype(int)
-    print(f"[INFO] Converted boolean columns to int: {list(bool_cols)}")
+    # ======================
+    # 1. Load Processed Data
+    # ======================
+    # Only feature/target columns are read; unnecessary columns are projected
+    # away and bool/object columns handled as configured in config.yaml.
+    # Sparse .npz features (see process_data) stay a CSR matrix throughout
+    print("[INFO] Loading dataset...")
+    if storage_format(config["paths"]["processed"]) == "sparse":
+        X, y, feature_names = load_sparse_training_data(config)
+        print(f"[INFO] Sparse feature matrix: {X.shape[0]} x {X.shape[1]}, {X.nnz} non-zeros")
+    else:
+        X, y = load_training_data(config)
+        feature_names = list(X.columns)
 
-# Drop object/string columns
-obj_cols = X.select_dtypes(include="object").columns
-if len(obj_cols) > 0:
-    print(f"[INFO] Dropping object/string columns: {list(obj_cols)}")
-    X = X.drop(columns=obj_cols)
+    # ======================
+    # 2. Train-Test Split
+    # ======================
+    print("[INFO] Splitting data into train/test...")
+    split = config["split"]
+    X_train, X_test, y_train, y_test, _, test_rows = train_test_split(
+        X, y, np.arange(len(y)),
+        test_size=split["test_size"],
+        random_state=split["random_state"],
+        stratify=y if split.get("stratify") else None,
+    )
 
-# ======================
-# 4. Train-Test Split
-# ======================
-print("[INFO] Splitting data into train/test...")
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
+    # Hold-out row positions, so evaluate.py can stream exactly this split
+    holdout_path = config["output"].get("holdout_path")
+    if holdout_path:
+        os.makedirs(os.path.dirname(holdout_path) or ".", exist_ok=True)
+        np.save(holdout_path, np.sort(test_rows))
 
-# ======================
-# 5. Hyperparameter Tuning
-# ======================
-print("[INFO] Running GridSearchCV for Logistic Regression...")
-logreg_params = {
-    "C": [0.01, 0.1, 1, 10],
-    "penalty": ["l2"],
-    "solver": ["liblinear"]
-}
-logreg = LogisticRegression(max_iter=1000)
-logreg_grid = GridSearchCV(logreg, logreg_params, cv=5, scoring="f1", n_jobs=-1)
-logreg_grid.fit(X_train, y_train)
-print(f"[✓] Best Logistic Regression Params: {logreg_grid.best_params_}")
+    # ======================
+    # 3. Hyperparameter Tuning
+    # ======================
+    # CV folds are computed once and shared by every model family
+    tuning = config["tuning"]
+    splits = make_cv_splits(X_train, y_train, n_splits=tuning["cv"], random_state=split["random_state"])
 
-print("[INFO] Running GridSearchCV for Random Forest...")
-rf_params = {
-    "n_estimators": [100, 200],
-    "max_depth": [5, 10, None],
-    "min_samples_split": [2, 5],
-    "min_samples_leaf": [1, 2]
-}
-rf = RandomForestClassifier(random_state=42)
-rf_grid = GridSearchCV(rf, rf_params, cv=5, scoring="f1", n_jobs=-1)
-rf_grid.fit(X_train, y_train)
-print(f"[✓] Best Random Forest Params: {rf_grid.best_params_}")
+    best_models = {}
+    for name, model_cfg in config["models"].items():
+        if not model_cfg.get("enabled", True):
+            continue
+        estimator_cls, output_key = ESTIMATORS[name]
+        print(f"[INFO] Tuning {name} ({tuning.get('strategy', 'grid')} search)...")
+        start = time.perf_counter()
+        result = search_model(
+            estimator_cls(**model_cfg.get("init", {})), model_cfg["grid"], X_train, y_train, splits, tuning
+        )
+        print(f"[✓] Best {name} params: {result.best_params_} "
+              f"(CV {tuning['scoring']}={result.best_score_:.4f}, {time.perf_counter() - start:.1f}s)")
+        best_models[config["output"][output_key]] = result.best_estimator_
+
+    # ======================
+    # 4. Compile and Publish Best Models
+    # ======================
+    # Plain NumPy scorers for serving, checked against sklearn on the test
+    # split before any file is replaced: a failed check leaves every served
+    # artifact (pickle and compiled export) as it was
+    print("[INFO] Compiling models for serving...")
+    os.makedirs(config["paths"]["models_dir"], exist_ok=True)
+    publish_models(best_models, X_test, feature_names)
+
+    # Background summary (means + sample of training rows) for /explain
+    background_path = config["output"].get("background_path", BACKGROUND_PATH)
+    save_background(X_train, background_path, feature_names=feature_names)
+    print(f"   → {background_path}")
+
+
+def publish_models(best_models, X_check, feature_names=None):
+    """
+    Compile and validate every model, then write each compiled export and its
+    pickle. The API prefers the compiled export, so both are only replaced
+    once all models have passed validation.
+
+    Args:
+        best_models (dict): Pickle path -> fitted estimator.
+        X_check: Rows the compiled scorers must reproduce sklearn on.
+        feature_names (list): Column names (for sparse features).
+    """
+    compiled = {
+        path: build_compiled(model, X_check=X_check, feature_names=feature_names)
+        for path, model in best_models.items()
+    }
+    print("[✓] Models saved to:")
+    for path, model in best_models.items():
+        # Replaced atomically: the API hot-reloads these files
+        save_compiled(compiled[path], compiled_path(path))
+        dump_atomic(model, path)
+        print(f"   → {path} (+ {compiled_path(path)})")
 
-# ======================
-# 6. Save Best Models
-# ======================
-os.makedirs("models", exist_ok=True)
-joblib.dump(logreg_grid.best_estimator_, "models/logreg_best.pkl")
-joblib.dump(rf_grid.best_estimator_, "models/random_forest_best.pkl")
 
-print("[✓] Models saved to:")
-print("   → models/logreg_best.pkl")
-print("   → models/random_forest_best.pkl")
+if __name__ == "__main__":
+    main()
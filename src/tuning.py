@@ -0,0 +1,132 @@
+import itertools
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, StratifiedKFold
+
+
+class SearchResult:
+    """
+    Outcome of a hyperparameter search, mirroring the attributes of GridSearchCV.
+    """
+
+    def __init__(self, best_estimator_, best_params_, best_score_):
+        self.best_estimator_ = best_estimator_
+        self.best_params_ = best_params_
+        self.best_score_ = best_score_
+
+
+def make_cv_splits(X, y, n_splits=5, random_state=42):
+    """
+    Stratified CV fold indices, computed once and shared by every model search.
+    """
+    folds = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    return list(folds.split(np.zeros(len(y)), y))
+
+
+def _param_combinations(grid):
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def _take(X, idx):
+    return X.iloc[idx] if hasattr(X, "iloc") else X[idx]
+
+
+# ===== Warm-Started Searches =====
+
+def _path_fold_scores(estimator, params, path_param, path_values, X, y, train_idx, test_idx, scorer):
+    # One model per fold, refitted along the path with warm_start=True
+    model = clone(estimator).set_params(warm_start=True, **params)
+    X_train, y_train = _take(X, train_idx), _take(y, train_idx)
+    X_test, y_test = _take(X, test_idx), _take(y, test_idx)
+    scores = []
+    for value in path_values:
+        model.set_params(**{path_param: value}).fit(X_train, y_train)
+        scores.append(scorer(model, X_test, y_test))
+    return scores
+
+
+def warm_start_search(estimator, grid, path_param, X, y, splits, scoring="f1", n_jobs=None):
+    """
+    Grid search in which ``path_param`` is walked in sorted order on a single
+    warm-started model per (parameter combination, fold) instead of being
+    refitted from scratch for every value:
+
+        n_estimators (random forest)   larger forests only add trees
+        C (logistic regression)        the regularization path; each fit starts
+                                       from the previous coefficients (liblinear
+                                       cannot warm-start, so lbfgs is used here;
+                                       the switch is reported and recorded in
+                                       ``best_params_``)
+    """
+    solver = None
+    if isinstance(estimator, LogisticRegression) and estimator.get_params()["solver"] == "liblinear":
+        solver = "lbfgs"
+        print(f"[WARN] liblinear cannot warm-start: the C path and the returned model use solver='{solver}' "
+              f"(use the grid or halving strategy to keep liblinear)")
+        estimator = clone(estimator).set_params(solver=solver)
+    grid = dict(grid)
+    path_values = sorted(grid.pop(path_param, [estimator.get_params()[path_param]]))
+    combinations = _param_combinations(grid)
+    scorer = get_scorer(scoring)
+
+    fold_scores = Parallel(n_jobs=n_jobs)(
+        delayed(_path_fold_scores)(estimator, params, path_param, path_values, X, y, train_idx, test_idx, scorer)
+        for params in combinations
+        for train_idx, test_idx in splits
+    )
+    # (combination, fold, path value) -> mean over folds
+    mean_scores = np.asarray(fold_scores).reshape(len(combinations), len(splits), len(path_values)).mean(axis=1)
+    best_combination, best_value = np.unravel_index(np.argmax(mean_scores), mean_scores.shape)
+
+    best_params = dict(combinations[best_combination], **{path_param: path_values[best_value]})
+    best_estimator = clone(estimator).set_params(**best_params).fit(X, y)
+    if solver is not None:
+        best_params["solver"] = solver
+    return SearchResult(best_estimator, best_params, float(mean_scores[best_combination, best_value]))
+
+
+# ===== Search Dispatch =====
+
+def search_model(estimator, grid, X, y, splits, tuning):
+    """
+    Tune ``estimator`` over ``grid`` with the strategy from the config's
+    ``tuning`` section:
+
+        grid        exhaustive GridSearchCV
+        halving     successive halving (HalvingGridSearchCV) over samples
+        warm_start  regularization path for logistic regression and
+                    warm-started n_estimators for the random forest
+
+    Every strategy scores on the same precomputed ``splits``.
+    """
+    strategy = tuning.get("strategy", "grid")
+    scoring = tuning.get("scoring", "f1")
+    n_jobs = tuning.get("n_jobs")
+
+    if strategy == "grid":
+        search = GridSearchCV(estimator, grid, cv=splits, scoring=scoring, n_jobs=n_jobs)
+    elif strategy == "halving":
+        halving = tuning.get("halving", {})
+        search = HalvingGridSearchCV(
+            estimator, grid, cv=splits, scoring=scoring, n_jobs=n_jobs,
+            factor=halving.get("factor", 3),
+            min_resources=halving.get("min_resources", "exhaust"),
+            random_state=halving.get("random_state", 42),
+        )
+    elif strategy == "warm_start":
+        if isinstance(estimator, LogisticRegression):
+            return warm_start_search(estimator, grid, "C", X, y, splits, scoring, n_jobs)
+        if "n_estimators" in estimator.get_params():
+            return warm_start_search(estimator, grid, "n_estimators", X, y, splits, scoring, n_jobs)
+        search = GridSearchCV(estimator, grid, cv=splits, scoring=scoring, n_jobs=n_jobs)
+    else:
+        raise ValueError(f"Unknown tuning strategy: {strategy}")
+
+    search.fit(X, y)
+    return SearchResult(search.best_estimator_, search.best_params_, float(search.best_score_))
@@ -0,0 +1,6 @@
+import yaml
+
+
+def load_config(path="config.yaml"):
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
@@ -0,0 +1,368 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.utils.dtypes import memory_usage_mb, optimize_dtypes
+
+
+# File extension -> storage format of the processed dataset
+FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".npz": "sparse",
+}
+
+
+def storage_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Unsupported processed data format '{ext}' (expected one of {sorted(FORMATS)})")
+    return FORMATS[ext]
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Parquet/Feather storage requires pyarrow: pip install pyarrow") from e
+
+
+# ===== Writing =====
+
+class ProcessedWriter:
+    """
+    Incrementally write processed chunks to CSV, Parquet or Feather (Arrow IPC).
+    The schema of the first chunk is enforced on the following ones.
+
+    Usage:
+        with ProcessedWriter(path) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.format = storage_format(path)
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+        if self.format == "sparse":
+            raise ValueError("Sparse .npz features are written whole with save_sparse_features")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if self.format != "csv":
+            _require_pyarrow()
+
+    def write(self, df):
+        if self.format == "csv":
+            df.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        else:
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                self._schema = self._stable_schema(table.schema)
+                table = table.cast(self._schema)
+                if self.format == "parquet":
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self.path, self._schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.path, self._schema)
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def _stable_schema(self, schema):
+        # Categorical columns get a different dictionary (and index width) per
+        # chunk: widen the indices for Parquet, and store plain strings in
+        # Feather files, which cannot replace dictionaries between batches.
+        import pyarrow as pa
+
+        for i, field in enumerate(schema):
+            if pa.types.is_dictionary(field.type):
+                if self.format == "parquet":
+                    field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+                else:
+                    field = field.with_type(field.type.value_type)
+                schema = schema.set(i, field)
+        return schema
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def save_processed(df, path):
+    """
+    Save a processed DataFrame; the format follows the file extension.
+    """
+    with ProcessedWriter(path) as writer:
+        writer.write(df)
+
+
+def save_sparse_features(path, X, y, feature_names, target="is_high_risk"):
+    """
+    Save a sparse feature matrix with its target as one compressed .npz.
+
+    The matrix is stored in the ``scipy.sparse.save_npz`` layout (so
+    ``scipy.sparse.load_npz`` reads it too), next to the column names and
+    the target column.
+
+    Args:
+        X (scipy.sparse matrix): Features, one row per transaction.
+        y (array-like): Target values, same rows.
+        feature_names (list): Column names of X.
+        target (str): Name of the target column.
+    """
+    X = X.tocsr()
+    if X.shape != (len(y), len(feature_names)):
+        raise ValueError(f"Matrix shape {X.shape} does not match {len(y)} targets and {len(feature_names)} names")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(
+        path,
+        format=np.array("csr"),
+        shape=np.asarray(X.shape),
+        data=X.data,
+        indices=X.indices,
+        indptr=X.indptr,
+        feature_names=np.asarray(feature_names, dtype=str),
+        target_name=np.array(target),
+        target=np.asarray(y),
+    )
+
+
+def load_sparse_features(path):
+    """
+    Load a file written by save_sparse_features.
+
+    Returns:
+        tuple: (scipy.sparse.csr_matrix X, np.ndarray y, list of feature names, target name)
+    """
+    from scipy import sparse as sp
+
+    with np.load(path, allow_pickle=False) as data:
+        X = sp.csr_matrix((data["data"], data["indices"], data["indptr"]), shape=tuple(data["shape"]))
+        return X, data["target"], data["feature_names"].tolist(), str(data["target_name"])
+
+
+# ===== Reading =====
+
+def processed_columns(path):
+    """
+    Column names (and, for columnar files, Arrow types) without reading the data.
+
+    Returns:
+        dict: Column name -> type string.
+    """
+    fmt = storage_format(path)
+    if fmt == "csv":
+        return {col: "unknown" for col in pd.read_csv(path, nrows=0).columns}
+    if fmt == "sparse":
+        with np.load(path, allow_pickle=False) as data:
+            columns = dict.fromkeys(data["feature_names"].tolist(), str(data["data"].dtype))
+            columns[str(data["target_name"])] = str(data["target"].dtype)
+        return columns
+
+    _require_pyarrow()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        schema = pq.read_schema(path, memory_map=True)
+    else:
+        import pyarrow as pa
+        with pa.memory_map(path, "r") as source:
+            schema = pa.ipc.open_file(source).schema
+    return {field.name: str(field.type) for field in schema}
+
+
+def load_processed(path, columns=None):
+    """
+    Load the processed dataset, reading only ``columns`` if given.
+    Parquet and Feather files are memory-mapped rather than parsed; the
+    requested columns of sparse .npz files are densified.
+    """
+    fmt = storage_format(path)
+    if fmt == "csv":
+        return pd.read_csv(path, usecols=columns)
+    if fmt == "sparse":
+        X, y, feature_names, target = load_sparse_features(path)
+        columns = columns or feature_names + [target]
+        index = {name: i for i, name in enumerate(feature_names)}
+        return pd.DataFrame({
+            col: y if col == target else X[:, index[col]].toarray().ravel() for col in columns
+        })
+
+    _require_pyarrow()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, columns=columns, memory_map=True)
+    else:
+        import pyarrow.feather as feather
+        table = feather.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas()
+
+
+def _training_columns(config, path):
+    """Columns of ``path`` needed for training: features and target (see load_training_data)."""
+    data_cfg = config["data"]
+    target = data_cfg["target"]
+    drop_cols = set(data_cfg.get("drop_cols", [])) - {target}
+
+    schema = processed_columns(path)
+    string_types = ("string", "large_string", "dictionary<values=string", "dictionary<values=large_string")
+    return [
+        col for col, col_type in schema.items()
+        if col not in drop_cols
+        and not (data_cfg.get("drop_object_columns") and col_type.startswith(string_types))
+    ]
+
+
+def _prepare_features(X, data_cfg, verbose=True):
+    """Dtype handling configured in config.yaml ``data``, applied to a feature frame."""
+    # Narrowest dtypes (int8 one-hot, float32 continuous, ...) instead of int64 casts
+    if data_cfg.get("optimize_dtypes"):
+        memory_before = memory_usage_mb(X)
+        X = optimize_dtypes(X)
+        if verbose:
+            print(f"[INFO] Feature matrix memory: {memory_before:.1f} MB -> {memory_usage_mb(X):.1f} MB")
+
+    # Convert boolean to int
+    if data_cfg.get("cast_bool_to_int"):
+        bool_cols = X.select_dtypes(include="bool").columns
+        if len(bool_cols) > 0:
+            X[bool_cols] = X[bool_cols].astype(int)
+            if verbose:
+                print(f"[INFO] Converted boolean columns to int: {list(bool_cols)}")
+
+    # Drop object/string columns
+    if data_cfg.get("drop_object_columns"):
+        obj_cols = X.select_dtypes(include="object").columns
+        if len(obj_cols) > 0:
+            if verbose:
+                print(f"[INFO] Dropping object/string columns: {list(obj_cols)}")
+            X = X.drop(columns=obj_cols)
+
+    return X
+
+
+def load_sparse_training_data(config, path=None):
+    """
+    Sparse counterpart of load_training_data for .npz features (see
+    save_sparse_features): a CSR matrix without the configured ``drop_cols``.
+
+    Returns:
+        tuple: (scipy.sparse.csr_matrix X, pd.Series y, list of feature names)
+    """
+    path = path or config["paths"]["processed"]
+    X, y, feature_names, target = load_sparse_features(path)
+    drop_cols = set(config["data"].get("drop_cols", []))
+    keep = [i for i, name in enumerate(feature_names) if name not in drop_cols]
+    if len(keep) < len(feature_names):
+        X = X[:, keep]
+        feature_names = [feature_names[i] for i in keep]
+    return X, pd.Series(y, name=target), feature_names
+
+
+def load_training_data(config, path=None):
+    """
+    Load the feature matrix and target described by ``config`` (see config.yaml).
+
+    Only the feature and target columns are read: configured ``drop_cols`` are
+    projected away and, for columnar files with ``drop_object_columns``,
+    string columns are skipped before any data is loaded. For sparse .npz
+    files X is a CSR matrix (see load_sparse_training_data).
+
+    Returns:
+        tuple: (X, y)
+    """
+    data_cfg = config["data"]
+    path = path or config["paths"]["processed"]
+    if storage_format(path) == "sparse":
+        return load_sparse_training_data(config, path)[:2]
+    target = data_cfg["target"]
+    df = load_processed(path, columns=_training_columns(config, path))
+
+    X = df.drop(columns=[target])
+    y = df[target]
+    return _prepare_features(X, data_cfg), y
+
+
+def iter_processed(path, columns=None, batch_size=100000):
+    """
+    Stream the processed dataset in batches of at most ``batch_size`` rows.
+
+    Yields:
+        tuple: (row offset of the batch in the file, pd.DataFrame)
+    """
+    fmt = storage_format(path)
+    offset = 0
+    if fmt == "csv":
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=batch_size):
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            yield offset, chunk
+            offset += len(chunk)
+        return
+
+    _require_pyarrow()
+    for batch in _iter_record_batches(path, fmt, columns, batch_size):
+        chunk = batch.to_pandas()
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        yield offset, chunk
+        offset += len(chunk)
+
+
+def _iter_record_batches(path, fmt, columns, batch_size):
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        yield from pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=batch_size, columns=columns)
+        return
+
+    import pyarrow as pa
+    with pa.memory_map(path, "r") as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if columns:
+                batch = batch.select(columns)
+            for start in range(0, batch.num_rows, batch_size):
+                yield batch.slice(start, batch_size)
+
+
+def iter_training_batches(config, rows=None, path=None, batch_size=100000):
+    """
+    Streaming counterpart of load_training_data: (X, y) batches with the same
+    column projection and dtype handling, optionally restricted to ``rows``.
+
+    Args:
+        rows (np.ndarray): Sorted row positions to keep (e.g. the hold-out set).
+
+    Yields:
+        tuple: (X, y) for each non-empty batch.
+    """
+    data_cfg = config["data"]
+    path = path or config["paths"]["processed"]
+    if storage_format(path) == "sparse":
+        # Already a compact in-memory matrix: batches are row slices of it
+        X, y, _ = load_sparse_training_data(config, path)
+        rows = np.arange(X.shape[0]) if rows is None else rows
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            yield X[batch], y.iloc[batch].reset_index(drop=True)
+        return
+
+    target = data_cfg["target"]
+    for offset, chunk in iter_processed(path, _training_columns(config, path), batch_size):
+        if rows is not None:
+            lo, hi = np.searchsorted(rows, [offset, offset + len(chunk)])
+            if lo == hi:
+                continue
+            chunk = chunk.iloc[rows[lo:hi] - offset]
+        X = chunk.drop(columns=[target])
+        yield _prepare_features(X, data_cfg, verbose=False), chunk[target]
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+INT_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+def memory_usage_mb(df):
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def smallest_int_dtype(min_value, max_value):
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= min_value and max_value <= info.max:
+            return dtype
+    return np.int64
+
+
+def is_bool_like(series):
+    """
+    True for bool columns and for object columns holding only booleans
+    (one-hot columns come out of the imputer as object).
+    """
+    if pd.api.types.is_bool_dtype(series):
+        return True
+    if series.dtype != object or series.isna().any():
+        return False
+    return series.map(type).isin([bool, np.bool_]).all()
+
+
+def optimize_dtypes(df, category_cols=(), int_ranges=None):
+    """
+    Downcast a feature frame to the narrowest dtypes that hold its values:
+    one-hot/bool columns -> int8, integer codes -> int8/16/32 by value range,
+    float64 -> float32 and the given ID columns -> category.
+
+    Args:
+        df (pd.DataFrame): Frame to downcast (not modified).
+        category_cols (iterable): Columns to store as pandas categoricals.
+        int_ranges (dict): Column -> (min, max) to size integer columns with
+            instead of the frame's own values (keeps dtypes stable across chunks).
+            Values outside the range get the next dtype that holds them.
+
+    Returns:
+        pd.DataFrame: Frame with downcast columns.
+    """
+    int_ranges = int_ranges or {}
+    category_cols = set(category_cols)
+    df = df.copy(deep=False)
+
+    for col in df.columns:
+        series = df[col]
+        if col in category_cols:
+            df[col] = series.astype('category')
+        elif is_bool_like(series):
+            df[col] = series.astype(np.int8)
+        elif pd.api.types.is_integer_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+            if len(series) == 0 and col not in int_ranges:
+                continue
+            min_value, max_value = int_ranges.get(col, (series.min(), series.max()))
+            if col in int_ranges and len(series):
+                # Values outside the fitted range widen the dtype instead of wrapping around
+                min_value, max_value = min(min_value, series.min()), max(max_value, series.max())
+            df[col] = series.astype(smallest_int_dtype(min_value, max_value))
+        elif series.dtype == np.float64:
+            df[col] = series.astype(np.float32)
+    return df
@@ -0,0 +1,126 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Log-spaced latency buckets: 1µs .. ~100s, 8 buckets per doubling (≤ 9% error)
+MIN_SECONDS = 1e-6
+BUCKETS_PER_DOUBLING = 8
+DOUBLINGS = 27  # 1µs * 2**27 ≈ 134s
+N_BUCKETS = BUCKETS_PER_DOUBLING * DOUBLINGS
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """
+    Fixed-size histogram of durations on log-spaced buckets.
+
+    Recording is O(1) with no allocation, so it can sit on the request path;
+    quantiles are read from the bucket counts (upper bucket bound).
+    """
+
+    def __init__(self):
+        self.counts = [0] * N_BUCKETS
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def bucket(seconds):
+        if seconds <= MIN_SECONDS:
+            return 0
+        index = int(math.log2(seconds / MIN_SECONDS) * BUCKETS_PER_DOUBLING)
+        return min(index, N_BUCKETS - 1)
+
+    @staticmethod
+    def upper_bound(index):
+        return MIN_SECONDS * 2 ** ((index + 1) / BUCKETS_PER_DOUBLING)
+
+    def observe(self, seconds):
+        index = self.bucket(seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q):
+        """
+        Approximate q-quantile in seconds (0.0 when nothing was recorded).
+        """
+        with self._lock:
+            counts, total, maximum = list(self.counts), self.count, self.max
+        if total == 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if count and seen >= rank:
+                return min(self.upper_bound(index), maximum)
+        return maximum
+
+
+class MetricsRegistry:
+    """
+    Latency histograms per stage and label set, rendered in Prometheus text format.
+
+    Args:
+        name (str): Metric name prefix.
+    """
+
+    def __init__(self, name="credit_scoring_stage_latency_seconds"):
+        self.name = name
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage, **labels):
+        key = (stage, tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None)))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def observe(self, stage, seconds, **labels):
+        self.histogram(stage, **labels).observe(seconds)
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """
+        Time the enclosed block into the ``stage`` histogram.
+        """
+        histogram = self.histogram(stage, **labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render_prometheus(self):
+        """
+        All histograms as Prometheus summaries (p50/p95/p99, sum, count).
+        """
+        lines = [
+            f"# HELP {self.name} Latency per serving stage.",
+            f"# TYPE {self.name} summary",
+        ]
+        for (stage, labels), histogram in sorted(self._histograms.items()):
+            base = [("stage", stage), *labels]
+            label_text = ",".join(f'{k}="{v}"' for k, v in base)
+            for q in QUANTILES:
+                lines.append(f'{self.name}{{{label_text},quantile="{q}"}} {histogram.quantile(q):.9f}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {histogram.sum:.9f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the serving path
+metrics = MetricsRegistry()
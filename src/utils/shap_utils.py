@@ -1,6 +1,5 @@
-import shap
-import matplotlib.pyplot as plt
 import joblib
+import numpy as np
 import pandas as pd
 
 
@@ -21,6 +20,9 @@ def explain_model(model, X, output_dir="reports/figures", sample_size=200):
         output_dir (str): Directory where SHAP plots will be saved.
         sample_size (int): Subset size for faster computation.
     """
+    import matplotlib.pyplot as plt
+    import shap
+
     # Subsample for speed
     if len(X) > sample_size:
         X_sample = X.sample(sample_size, random_state=42)
@@ -47,7 +49,7 @@ def explain_model(model, X, output_dir="reports/figures", sample_size=200):
     print(f"[✓] SHAP plots saved to {output_dir}")
 
 
-def explain_single_prediction(model, X, index=0):
+def explain_single_prediction(model, X, index=0, background_size=100):
     """
     Generate SHAP force plot for a single prediction.
     
@@ -55,8 +57,77 @@ def explain_single_prediction(model, X, index=0):
         model: Trained ML model.
         X (pd.DataFrame): Input features.
         index (int): Row index for explanation.
+        background_size (int): Rows of X summarizing the background.
+    """
+    import shap
+
+    # Small background and only the requested row (see src/explain.py for serving)
+    background = shap.sample(X, background_size, random_state=42) if len(X) > background_size else X
+    explainer = shap.Explainer(model, background)
+    shap_values = explainer(X.iloc[[index]])
+
+    return shap.force_plot(explainer.expected_value, shap_values[0], X.iloc[index, :])
+
+
+def explain_model_full(model, X, y=None, output_dir="reports/figures", sample_size=None,
+                       chunk_size=10000, n_jobs=-1, top_k=3, max_plot_points=5000):
     """
-    explainer = shap.Explainer(model, X)
-    shap_values = explainer(X)
+    Global SHAP report over the full dataset (or a large stratified sample).
+
+    SHAP values are computed in chunks across a process pool into a
+    memory-mapped ``shap_values.npy`` (see src.explain.compute_shap_values);
+    global importance and the plots are then derived from that array, so
+    memory stays bounded by the chunk size.
+
+    Args:
+        model: Trained ML model (LogisticRegression or RandomForestClassifier).
+        X (pd.DataFrame): Input features.
+        y (array-like): Labels for a stratified sample (optional).
+        output_dir (str): Directory for the arrays, importance CSV and plots.
+        sample_size (int): Rows to explain (None: all of X).
+        chunk_size (int): Rows per worker task.
+        n_jobs (int): Worker processes (-1: all CPUs).
+        top_k (int): Number of top features with a dependence plot.
+        max_plot_points (int): Rows drawn in the scatter-based plots.
+    """
+    import matplotlib.pyplot as plt
+    import shap
+
+    from src.explain import compute_shap_values, global_importance, stratified_sample
+
+    if sample_size is not None and sample_size < len(X):
+        X = stratified_sample(X, y, sample_size) if y is not None else X.sample(sample_size, random_state=42)
+
+    values, inputs, expected_value = compute_shap_values(
+        model, X, output_dir, chunk_size=chunk_size, n_jobs=n_jobs
+    )
+    importance = global_importance(values, X.columns)
+    importance.to_csv(f"{output_dir}/shap_importance.csv", header=True)
+
+    # === Global Importance ===
+    plt.figure(figsize=(8, max(3, 0.3 * len(importance))))
+    importance[::-1].plot.barh()
+    plt.xlabel("mean(|SHAP value|)")
+    plt.savefig(f"{output_dir}/shap_importance.png", bbox_inches="tight")
+    plt.close()
+
+    # Plots draw a random subset of the explained rows
+    rng = np.random.default_rng(42)
+    rows = np.sort(rng.choice(len(values), size=min(max_plot_points, len(values)), replace=False))
+    plot_values = np.asarray(values[rows])
+    plot_X = pd.DataFrame(np.asarray(inputs[rows]), columns=X.columns)
+
+    plt.figure()
+    shap.summary_plot(plot_values, plot_X, show=False)
+    plt.savefig(f"{output_dir}/shap_summary.png", bbox_inches="tight")
+    plt.close()
+
+    # === Feature Dependence for Top Features ===
+    for feature in importance.index[:top_k]:
+        plt.figure()
+        shap.dependence_plot(feature, plot_values, plot_X, show=False)
+        plt.savefig(f"{output_dir}/shap_dependence_{feature}.png", bbox_inches="tight")
+        plt.close()
 
-    return shap.force_plot(explainer.expected_value, shap_values[index], X.iloc[index, :])
+    print(f"[✓] SHAP report over {len(values)} rows saved to {output_dir} (expected value {expected_value:.4f})")
+    return importance
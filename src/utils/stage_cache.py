@@ -0,0 +1,181 @@
+import functools
+import hashlib
+import importlib
+import inspect
+import os
+import shutil
+import time
+import uuid
+
+import joblib
+
+
+def fingerprint_file(path, chunk_size=1 << 20):
+    """
+    Content hash of an input file (the root of every stage key).
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Bump to invalidate every cached stage after a change the hashed sources miss
+CODE_VERSION = 1
+
+# Helpers the transformers call into; their source is part of every stage key
+HELPER_MODULES = ("src.utils.timestamps", "src.utils.vocabulary", "src.utils.dtypes", "src.feature_store")
+
+
+def _source(obj):
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        return ""
+
+
+@functools.lru_cache(maxsize=None)
+def helpers_fingerprint(modules=HELPER_MODULES):
+    """
+    Hash of CODE_VERSION and the source of the helper modules (once per process).
+    """
+    return joblib.hash((CODE_VERSION, [_source(importlib.import_module(name)) for name in modules]))
+
+
+def code_key(*objects):
+    """
+    Hash of the helpers' fingerprint and the source of ``objects`` (functions
+    or classes), for cached results that are not pipeline stages.
+    """
+    return joblib.hash((helpers_fingerprint(), [_source(obj) for obj in objects]))
+
+
+def stage_key(parent_key, step):
+    """
+    Key of a pipeline stage: hash of the upstream key, the transformer's
+    class (including its source code), its parameters and the helpers'
+    fingerprint. Any change to a stage or a helper changes its key and the
+    keys of every stage after it.
+    """
+    cls = type(step)
+    return joblib.hash((
+        parent_key, helpers_fingerprint(), cls.__module__, cls.__qualname__, _source(cls),
+        step.get_params(deep=False),
+    ))
+
+
+class StageCache:
+    """
+    Content-addressed on-disk cache of pipeline stage results.
+
+    Each entry is a directory named by its key holding pickled artifacts
+    (e.g. the fitted transformer and its output frame). Entries are evicted
+    least-recently-used first once the cache grows beyond ``max_bytes``.
+
+    Args:
+        cache_dir (str): Root directory of the cache.
+        max_bytes (int): Size budget of all entries together.
+    """
+
+    def __init__(self, cache_dir=".cache/stages", max_bytes=5 * 2 ** 30):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def has(self, key):
+        return os.path.isdir(self._entry(key))
+
+    def get(self, key, name):
+        """
+        Load artifact ``name`` of entry ``key`` (None on a miss) and mark the entry as recently used.
+        """
+        path = os.path.join(self._entry(key), f"{name}.pkl")
+        if not os.path.exists(path):
+            return None
+        os.utime(self._entry(key))
+        return joblib.load(path)
+
+    def put(self, key, **artifacts):
+        """
+        Store artifacts under ``key`` atomically, then enforce the size budget.
+        """
+        if self.has(key):
+            return
+        tmp_dir = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        for name, value in artifacts.items():
+            joblib.dump(value, os.path.join(tmp_dir, f"{name}.pkl"))
+        try:
+            os.replace(tmp_dir, self._entry(key))
+        except OSError:
+            # Written concurrently by another run
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict(keep=key)
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = self._entry(name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path))
+            entries.append((os.stat(path).st_mtime, size, path))
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, keep=None):
+        """
+        Delete least recently used entries until the cache fits ``max_bytes``.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if keep is not None and path == self._entry(keep):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+def fit_transform_cached(pipeline, X, cache, key, steps=slice(None)):
+    """
+    ``fit_transform`` over ``pipeline.steps[steps]`` that reuses cached stages.
+
+    Leading stages whose key is cached are not recomputed: their fitted
+    transformers are loaded and only the output of the last cached stage is
+    read back. The fitted (or loaded) transformers replace the pipeline's steps.
+
+    Returns:
+        tuple: (transformed X, key of the last stage)
+    """
+    indices = range(len(pipeline.steps))[steps]
+    pending = None  # cached stage whose output has not been loaded yet
+    Xt = X
+    for i in indices:
+        name, step = pipeline.steps[i]
+        key = stage_key(key, step)
+        fitted = cache.get(key, "step")
+        if fitted is not None:
+            print(f"[INFO] Stage cache hit: {name}")
+            pipeline.steps[i] = (name, fitted)
+            pending = key
+            continue
+
+        if pending is not None:
+            Xt = cache.get(pending, "output")
+            pending = None
+        start = time.perf_counter()
+        Xt = step.fit_transform(Xt)
+        print(f"[INFO] Stage computed: {name} ({time.perf_counter() - start:.2f}s)")
+        cache.put(key, step=step, output=Xt)
+
+    if pending is not None:
+        Xt = cache.get(pending, "output")
+    return Xt, key
@@ -0,0 +1,169 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Xente transaction times: fixed-width ISO-8601 in UTC, e.g. 2018-11-15T02:18:49Z
+ISO_Z_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+ISO_Z_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z")
+ISO_Z_WIDTH = 20
+
+# Calendar parts datetime_parts can derive
+DATETIME_PARTS = ("hour", "day", "month", "year", "dayofweek", "epoch_seconds")
+
+_SECONDS_PER_DAY = 86400
+_NAT = np.iinfo(np.int64).min
+
+
+def detect_format(values, sample_size=100):
+    """
+    Return ISO_Z_FORMAT when the sampled non-null values are all Xente-style
+    ISO-8601 'Z' strings, else None. Called once per column.
+    """
+    sample = [value for value in values[:sample_size] if isinstance(value, str)]
+    if sample and all(ISO_Z_PATTERN.fullmatch(value) for value in sample):
+        return ISO_Z_FORMAT
+    return None
+
+
+# ===== Civil Calendar Arithmetic =====
+# Proleptic Gregorian conversions on int64 arrays (H. Hinnant's algorithms)
+
+def _days_from_civil(year, month, day):
+    year = year - (month <= 2)
+    era = np.floor_divide(year, 400)
+    year_of_era = year - era * 400
+    day_of_year = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _civil_from_days(days):
+    days = days + 719468
+    era = np.floor_divide(days, 146097)
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    mp = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * mp + 2) // 5 + 1
+    month = np.where(mp < 10, mp + 3, mp - 9)
+    year = year_of_era + era * 400 + (month <= 2)
+    return year, month, day
+
+
+def _parse_iso_z(strings):
+    """
+    Vectorized fixed-width parser: seconds since the epoch per string, and a
+    mask of the strings that are valid ISO-8601 'Z' timestamps.
+    """
+    # One extra character to detect longer strings; UCS-4 code points as a (n, 21) matrix
+    chars = np.asarray(strings, dtype=f"U{ISO_Z_WIDTH + 1}").view(np.uint32)
+    chars = chars.reshape(len(strings), ISO_Z_WIDTH + 1)
+    lengths_ok = (chars[:, ISO_Z_WIDTH] == 0) & (chars[:, ISO_Z_WIDTH - 1] != 0)
+    chars = chars[:, :ISO_Z_WIDTH]
+    digits = chars.astype(np.int64) - ord("0")
+
+    def number(start, stop):
+        return digits[:, start:stop] @ (10 ** np.arange(stop - start - 1, -1, -1))
+
+    year, month, day = number(0, 4), number(5, 7), number(8, 10)
+    hour, minute, second = number(11, 13), number(14, 16), number(17, 19)
+
+    digit_columns = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+    valid = lengths_ok & ((digits[:, digit_columns] >= 0) & (digits[:, digit_columns] <= 9)).all(axis=1)
+    for column, separator in ((4, "-"), (7, "-"), (10, "T"), (13, ":"), (16, ":"), (19, "Z")):
+        valid &= chars[:, column] == ord(separator)
+
+    days = _days_from_civil(year, month, day)
+    # Day must exist in its month: the round trip through the calendar is exact
+    valid &= (month >= 1) & (month <= 12) & (day >= 1) & (hour < 24) & (minute < 60) & (second < 60)
+    valid &= _civil_from_days(days)[2] == day
+    return days * _SECONDS_PER_DAY + hour * 3600 + minute * 60 + second, valid
+
+
+# ===== Parsing =====
+
+def parse_timestamps(values):
+    """
+    Parse a column of timestamp strings to ``datetime64[us, UTC]``, the dtype
+    ``pd.to_datetime(values, errors='coerce')`` gives for Xente data.
+
+    Repeated strings are parsed once (pd.factorize). When the column is in
+    the Xente ISO-8601 'Z' format the distinct strings go through a
+    vectorized fixed-width parser; anything it rejects (and columns in other
+    formats) falls back to pd.to_datetime. Unparseable values become NaT.
+    Columns that are already datetimes are returned unchanged.
+
+    Args:
+        values (pd.Series): Timestamp strings.
+
+    Returns:
+        pd.Series: Parsed timestamps, same index.
+    """
+    values = pd.Series(values) if not isinstance(values, pd.Series) else values
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    codes, uniques = pd.factorize(values)
+    uniques = np.asarray(uniques, dtype=object)
+    if detect_format(uniques) is None:
+        # Other formats: pandas parses the distinct strings, rows take their result
+        parsed = pd.to_datetime(pd.Series(uniques), errors="coerce")
+        return pd.Series(parsed.array.take(codes, allow_fill=True), index=values.index)
+
+    seconds, valid = _parse_iso_z(uniques)
+    micros = np.where(valid, seconds * 1_000_000, _NAT)
+    if not valid.all():
+        rest = pd.to_datetime(pd.Series(uniques[~valid]), format="ISO8601", errors="coerce", utc=True)
+        micros[~valid] = rest.dt.tz_localize(None).to_numpy("datetime64[us]").view(np.int64)
+
+    micros = np.append(micros, _NAT)[codes]  # code -1 (missing) takes the appended NaT
+    timestamps = pd.Series(micros.view("datetime64[us]"), index=values.index)
+    return timestamps.dt.tz_localize("UTC")
+
+
+def datetime_parts(timestamps, parts=DATETIME_PARTS):
+    """
+    Calendar parts of parsed timestamps, derived from their int64
+    representation in one pass instead of one ``.dt`` accessor per part.
+
+    Parts are in the timestamps' time zone (UTC for parse_timestamps output).
+    Like the ``.dt`` accessors, they are int32, or float64 with NaN when
+    some timestamps are NaT. ``dayofweek`` is 0 for Monday.
+
+    Args:
+        timestamps (pd.Series): datetime64 column.
+        parts (tuple): Any of DATETIME_PARTS.
+
+    Returns:
+        dict: Part name -> np.ndarray.
+    """
+    unknown = set(parts) - set(DATETIME_PARTS)
+    if unknown:
+        raise ValueError(f"Unknown datetime parts: {sorted(unknown)}")
+
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_localize(None)  # wall-clock time of the zone
+    raw = timestamps.to_numpy()
+    ticks_per_second = np.timedelta64(1, "s") // np.timedelta64(1, np.datetime_data(raw.dtype)[0])
+    raw = raw.view(np.int64)
+    missing = raw == _NAT
+    seconds = np.floor_divide(np.where(missing, 0, raw), ticks_per_second)
+
+    days = np.floor_divide(seconds, _SECONDS_PER_DAY)
+    values = {
+        "hour": (seconds - days * _SECONDS_PER_DAY) // 3600,
+        "dayofweek": (days + 3) % 7,  # 1970-01-01 was a Thursday
+        "epoch_seconds": seconds,
+    }
+    if {"day", "month", "year"} & set(parts):
+        values["year"], values["month"], values["day"] = _civil_from_days(days)
+
+    result = {}
+    for part in parts:
+        column = values[part]
+        if missing.any():
+            result[part] = np.where(missing, np.nan, column.astype(np.float64))
+        else:
+            result[part] = column.astype(np.int64 if part == "epoch_seconds" else np.int32)
+    return result
@@ -0,0 +1,89 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _sorted_labels(values):
+    """Distinct values in sorted order, a missing value last, like LabelEncoder."""
+    uniques = pd.unique(pd.Series(values, dtype=object))
+    missing = [value for value in uniques if _is_missing(value)]
+    return sorted(value for value in uniques if not _is_missing(value)) + missing[:1]
+
+
+class Vocabulary:
+    """
+    Label -> integer code table, fitted once.
+
+    Known labels get codes 0..n-1 in sorted order (the codes LabelEncoder
+    assigns, so models trained on them stay valid); unseen labels map to an
+    explicit unknown bucket, ``unknown_code`` (n), instead of raising.
+    Batches are encoded with one hash-table lookup (``pd.Index.get_indexer``)
+    and single values with a dict lookup, both from the same table.
+
+    Args:
+        labels (list): Distinct labels, in code order.
+    """
+
+    def __init__(self, labels):
+        self.labels = np.asarray(list(labels), dtype=object)
+        self.codes = {label: code for code, label in enumerate(self.labels.tolist())}
+        self._index = pd.Index(self.labels, dtype=object)
+
+    @classmethod
+    def fit(cls, values):
+        return cls(_sorted_labels(values))
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def unknown_code(self):
+        return len(self.labels)
+
+    def encode(self, values):
+        """
+        Codes of a batch of labels (int64), unknown labels in the unknown bucket.
+        """
+        codes = self._index.get_indexer(pd.Index(np.asarray(values, dtype=object), dtype=object))
+        codes[codes < 0] = self.unknown_code
+        return codes.astype(np.int64, copy=False)
+
+    def encode_one(self, value):
+        """
+        Code of a single label, consistent with ``encode``.
+        """
+        code = self.codes.get(value)
+        if code is None and _is_missing(value) and len(self.labels) and _is_missing(self.labels[-1]):
+            # NaN != NaN, so a missing label is found by position (always last)
+            code = len(self.labels) - 1
+        return self.unknown_code if code is None else code
+
+    def one_hot(self, values, drop_first=True, sparse=False):
+        """
+        One-hot block of a batch on the fixed vocabulary layout.
+
+        Column j stands for ``labels[j + drop_first]``; unknown labels (and
+        the dropped first label) are all-zero rows.
+
+        Args:
+            values (array-like): Labels to encode.
+            drop_first (bool): Omit the first label's column.
+            sparse (bool): Return a ``scipy.sparse`` CSR matrix instead of a
+                dense bool array.
+        """
+        codes = self.encode(values) - int(drop_first)
+        n_columns = len(self.labels) - int(drop_first)
+        rows = np.flatnonzero((codes >= 0) & (codes < n_columns))
+        if sparse:
+            from scipy import sparse as sp
+
+            data = np.ones(len(rows), dtype=np.float64)
+            return sp.csr_matrix((data, (rows, codes[rows])), shape=(len(codes), n_columns))
+        block = np.zeros((len(codes), n_columns), dtype=bool)
+        block[rows, codes[rows]] = True
+        return block
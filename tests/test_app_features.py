@@ -0,0 +1,175 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+pytest.importorskip("httpx")
+
+import app.main as main  # noqa: E402
+from src.data_processing import build_pipeline  # noqa: E402
+from src.feature_schema import FeatureSchema  # noqa: E402
+from src.feature_store import CustomerFeatureStore  # noqa: E402
+
+from test_data_processing import make_raw_transactions  # noqa: E402
+
+REQUEST_FIELDS = ['countrycode', 'providerid', 'productid', 'channelid', 'productcategory', 'amount', 'value',
+                  'pricingstrategy', 'fraudresult', 'customerid']
+
+
+@pytest.fixture
+def serving(monkeypatch):
+    """A store-backed pipeline and model wired into the app in place of the artifacts."""
+    raw = make_raw_transactions()
+    store = CustomerFeatureStore.from_frame(raw)
+    pipeline = build_pipeline(feature_store=store).fit(raw)
+    processed = pipeline.transform(raw)
+    X = processed.drop(columns=['transactionid', 'customerid', 'transactionstarttime']).select_dtypes('number')
+    model = LogisticRegression(max_iter=500).fit(X, np.arange(len(X)) % 2)
+    schema = FeatureSchema.from_model(model, pipeline)
+    monkeypatch.setattr(main, "get_schema", lambda: schema)
+    monkeypatch.setattr(main, "customer_store", store)
+    return raw, processed, X
+
+
+def make_request(raw, i, **overrides):
+    record = raw.iloc[i]
+    fields = {col: record[col] for col in REQUEST_FIELDS}
+    timestamp = np.datetime64(record['transactionstarttime'].rstrip('Z')).astype(object)
+    fields.update(
+        countrycode=str(fields['countrycode']), pricingstrategy=str(fields['pricingstrategy']),
+        transaction_hour=timestamp.hour, transaction_day=timestamp.day,
+        transaction_month=timestamp.month, transaction_year=timestamp.year,
+    )
+    fields.update(overrides)
+    return main.CreditRequest(**fields)
+
+
+def test_store_aggregates_are_scaled_like_the_pipeline(serving):
+    raw, processed, X = serving
+    # Aggregates omitted: looked up from the store by customerid, then scaled
+    features = main.build_request_features([make_request(raw, i) for i in range(10)])
+    np.testing.assert_allclose(features, X.iloc[:10].to_numpy(dtype=np.float64), rtol=1e-5, atol=1e-5)
+
+
+def test_unencodable_request_is_rejected_before_batching(serving):
+    raw, _, _ = serving
+    with pytest.raises(main.HTTPException) as error:
+        main.encode_request(make_request(raw, 0, countrycode="UG"))
+    assert error.value.status_code == 422
+
+    rows = [main.encode_request(make_request(raw, i)) for i in range(3)]
+    items = [(make_request(raw, i), row, None) for i, row in enumerate(rows)]
+    np.testing.assert_array_equal(
+        main.finish_features(np.vstack([row for _, row, _ in items]), [raw['customerid'].iloc[i] for i in range(3)]),
+        main.build_request_features([request for request, _, _ in items]),
+    )
+
+
+def test_experimental_api_scores_normalized_rows(monkeypatch):
+    import src.api.experimental_api as experimental_api
+    import src.data_processing as data_processing
+
+    raw = make_raw_transactions()
+    pipeline = build_pipeline().fit(raw)
+    X = pipeline.transform(raw).drop(columns=['transactionid', 'customerid', 'transactionstarttime'])
+    X = X.select_dtypes('number')
+    model = LogisticRegression(max_iter=500).fit(X, np.arange(len(X)) % 2)
+    monkeypatch.setattr(experimental_api, "get_model", lambda name: model)
+    monkeypatch.setattr(data_processing.preprocessors, "get", lambda name: pipeline)
+
+    steps = pipeline.named_steps
+    unscaled = steps['aggregate_features'].transform(steps['datetime_features'].transform(raw))
+    requests = [{**raw.iloc[i].to_dict(), **unscaled.iloc[i].to_dict()} for i in range(10)]
+    proba = experimental_api.make_scorer("logreg")(requests)
+    np.testing.assert_allclose(proba, model.predict_proba(X.iloc[:10])[:, 1], atol=1e-5)
+
+
+def test_customer_store_is_snapshotted_on_shutdown(tmp_path, monkeypatch):
+    import threading
+
+    from src.feature_store import CustomerFeatureStore
+
+    path = str(tmp_path / 'store.npz')
+    store = CustomerFeatureStore()
+    monkeypatch.setattr(main, "customer_store", store)
+    monkeypatch.setattr(main, "STORE_PATH", path)
+    stop = threading.Event()
+    stop.set()
+
+    # Unchanged stores are not rewritten
+    main.snapshot_customer_store(stop, 0)
+    assert not (tmp_path / 'store.npz').exists()
+    store.update('CustomerId_1', 100.0)
+    main.snapshot_customer_store(stop, 0)
+    assert CustomerFeatureStore.load(path).get('CustomerId_1')['total_amount'] == 100.0
+
+
+@pytest.fixture
+def batch_client(serving, monkeypatch):
+    """TestClient whose ensemble is one model fitted on the serving fixture's features."""
+    from fastapi.testclient import TestClient
+
+    raw, _, X = serving
+    model = LogisticRegression(max_iter=500).fit(X, (X['amount'] > X['amount'].median()).astype(int))
+
+    def run_batch_predictions(model_choice="both", features=None, budget_ms=None):
+        proba = model.predict_proba(features)[:, 1]
+        return {"ensemble_risk_probability": proba, "ensemble_prediction": (proba > 0.5).astype(int),
+                "model_used": "ensemble"}
+
+    monkeypatch.setattr(main, "run_batch_predictions", run_batch_predictions)
+    return TestClient(main.app), raw, model.predict_proba(X)[:, 1]
+
+
+def batch_bodies(raw, rows):
+    """The same rows as a list body, a columnar body and an Arrow IPC stream."""
+    pa = pytest.importorskip("pyarrow")
+
+    records = [make_request(raw, i).model_dump(mode='json', exclude_none=True) for i in rows]
+    columns = {name: [record[name] for record in records] for name in records[0]}
+    sink = pa.BufferOutputStream()
+    table = pa.table(columns)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return records, columns, sink.getvalue().to_pybytes()
+
+
+def test_batch_bodies_are_scored_in_request_order(batch_client):
+    client, raw, expected = batch_client
+    rows = [7, 2, 11, 0, 5]
+    records, columns, stream = batch_bodies(raw, rows)
+
+    responses = [
+        client.post("/predict/batch", json=records),
+        client.post("/predict/batch", json={"columns": columns}),
+        client.post("/predict/batch/arrow", content=stream,
+                    headers={"Content-Type": "application/vnd.apache.arrow.stream"}),
+    ]
+    for response in responses:
+        assert response.status_code == 200, response.text
+        results = response.json()["results"]
+        np.testing.assert_allclose([r["probability_of_default"] for r in results], expected[rows], atol=1e-5)
+        assert [r["prediction"] for r in results] == [
+            "default" if p > 0.5 else "no default" for p in expected[rows]
+        ]
+    assert client.post("/predict/batch", json=[]).json()["results"] == []
+
+
+def test_batch_with_an_invalid_row_is_rejected(batch_client):
+    client, raw, _ = batch_client
+    records, columns, _ = batch_bodies(raw, [0, 1, 2])
+
+    # A value the schema cannot encode, in the list and the columnar body
+    records[1]["countrycode"] = "UG"
+    columns["countrycode"][1] = "UG"
+    for body in (records, {"columns": columns}):
+        response = client.post("/predict/batch", json=body)
+        assert response.status_code == 422
+        assert "Invalid feature value" in response.text
+
+    # A value the request model rejects
+    records[1]["countrycode"], records[2]["amount"] = "256", "a lot"
+    assert client.post("/predict/batch", json=records).status_code == 422
+    # Columns of different lengths
+    columns["countrycode"][1] = "256"
+    columns["amount"].pop()
+    assert "same length" in client.post("/predict/batch", json={"columns": columns}).text
@@ -0,0 +1,66 @@
+import time
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient  # noqa: E402
+
+import app.main as main  # noqa: E402
+import src.data_processing as data_processing  # noqa: E402
+import src.predict as predict  # noqa: E402
+from src.compiled_model import CompiledModel, compiled_path  # noqa: E402
+from src.data_processing import build_pipeline  # noqa: E402
+from src.feature_store import CustomerFeatureStore  # noqa: E402
+from src.model_registry import ModelRegistry  # noqa: E402
+
+from test_data_processing import make_raw_transactions  # noqa: E402
+
+
+@pytest.fixture
+def artifacts(tmp_path, monkeypatch):
+    """Serving artifacts trained into tmp_path, run from tmp_path rather than the repo root."""
+    raw = make_raw_transactions()
+    pipeline = build_pipeline().fit(raw)
+    X = pipeline.transform(raw).drop(columns=['transactionid', 'customerid', 'transactionstarttime'])
+    X = X.select_dtypes('number')
+    model = LogisticRegression(max_iter=500).fit(X, np.arange(len(X)) % 2)
+
+    paths = {name: str(tmp_path / f"{name}.pkl") for name in predict.MODEL_PATHS}
+    for path in paths.values():
+        joblib.dump(model, path)
+    pipeline_path = str(tmp_path / "pipeline.pkl")
+    joblib.dump(pipeline, pipeline_path)
+    (tmp_path / "config.yaml").write_text("serving:\n  feature_store:\n    snapshot_interval_s: 300\n")
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(predict, "MODEL_PATHS", paths)
+    monkeypatch.setattr(main, "MODEL_PATHS", paths)
+    monkeypatch.setattr(predict, "registry", ModelRegistry(paths))
+    monkeypatch.setattr(predict, "compiled_registry", ModelRegistry(
+        {name: compiled_path(path) for name, path in paths.items()}, loader=CompiledModel.load))
+    monkeypatch.setattr(data_processing, "preprocessors", ModelRegistry({"preprocessor": pipeline_path}))
+    monkeypatch.setattr(main, "customer_store", CustomerFeatureStore())
+    monkeypatch.setattr(main, "STORE_PATH", str(tmp_path / "store.npz"))
+    monkeypatch.setitem(main.readiness, "ready", False)
+    monkeypatch.setitem(main.readiness, "error", None)
+    return paths
+
+
+def test_ready_after_warm_up(artifacts):
+    assert TestClient(main.app).get("/ready").status_code == 503
+    # Liveness does not wait for the models
+    assert TestClient(main.app).get("/").status_code == 200
+
+    # Entering the client runs the lifespan, which warms up in the background
+    with TestClient(main.app) as client:
+        deadline = time.monotonic() + 30
+        while client.get("/ready").status_code != 200:
+            assert time.monotonic() < deadline, main.readiness["error"]
+            time.sleep(0.01)
+        assert client.get("/ready").json()["startup_seconds"] >= 0
+        # Served from the fixture's pickles
+        versions = client.get("/models").json()
+        assert {entry["path"] for entry in versions.values()} == set(artifacts.values())
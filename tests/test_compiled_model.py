@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+import os
+
+from src.compiled_model import CompiledModel, compile_model, compiled_path, export_compiled
+
+
+def make_classification(n=600, n_features=6, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n, n_features)), columns=[f'f{i}' for i in range(n_features)])
+    # Rounded column: many ties exactly at split thresholds
+    X['f0'] = X['f0'].round(1)
+    y = (X['f0'] + X['f1'] * X['f2'] + rng.normal(0, 0.5, n) > 0).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize('model', [
+    LogisticRegression(C=0.5, max_iter=500),
+    RandomForestClassifier(n_estimators=25, max_depth=None, random_state=0),
+    RandomForestClassifier(n_estimators=10, max_depth=3, class_weight='balanced', random_state=0),
+])
+def test_compiled_scores_match_sklearn(model, tmp_path):
+    X, y = make_classification()
+    model.fit(X, y)
+    path = compiled_path(str(tmp_path / 'model.pkl'))
+    export_compiled(model, path, X_check=X)
+
+    compiled = CompiledModel.load(path)
+    X_new, _ = make_classification(seed=1)
+    np.testing.assert_allclose(compiled.predict_proba(X_new), model.predict_proba(X_new), atol=1e-9)
+    np.testing.assert_array_equal(compiled.predict(X_new), model.predict(X_new))
+    # Single row, reordered columns and raw arrays
+    np.testing.assert_allclose(compiled.positive_proba(X_new.iloc[[3], ::-1]),
+                               model.predict_proba(X_new.iloc[[3]])[:, 1], atol=1e-9)
+    np.testing.assert_allclose(compiled.positive_proba(X_new.to_numpy()[0]),
+                               model.predict_proba(X_new.iloc[[0]])[:, 1], atol=1e-9)
+
+
+def test_compile_rejects_multiclass():
+    X, y = make_classification()
+    model = LogisticRegression().fit(X, np.arange(len(y)) % 3)
+    with pytest.raises(ValueError):
+        compile_model(model)
+
+
+def test_shared_artifact_is_memory_mapped_and_replaced_atomically(tmp_path):
+    X, y = make_classification()
+    path = compiled_path(str(tmp_path / 'forest.pkl'))
+    first = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+    export_compiled(first, path)
+
+    compiled = CompiledModel.load(path)
+    assert isinstance(compiled.arrays['threshold'].base, np.memmap)
+    assert not compiled.arrays['threshold'].flags.writeable
+
+    # Re-export: only the new model's payloads remain next to the manifest
+    second = RandomForestClassifier(n_estimators=5, random_state=1).fit(X, y)
+    export_compiled(second, path)
+    payloads = [f for f in os.listdir(os.path.dirname(path)) if f.endswith('.npy')]
+    assert len(payloads) == len(compile_model(second))
+    np.testing.assert_allclose(CompiledModel.load(path).predict_proba(X), second.predict_proba(X), atol=1e-9)
+    # The already-mapped old model keeps scoring from its (unlinked) pages
+    np.testing.assert_allclose(compiled.predict_proba(X), first.predict_proba(X), atol=1e-9)
+
+
+def test_retrain_publishes_nothing_when_a_model_fails_validation(tmp_path, monkeypatch):
+    import joblib
+
+    import src.compiled_model as compiled_model
+    from src.train import publish_models
+
+    X, y = make_classification()
+    paths = [str(tmp_path / 'logreg.pkl'), str(tmp_path / 'forest.pkl')]
+    old = {paths[0]: LogisticRegression().fit(X, y),
+           paths[1]: RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)}
+    publish_models(old, X)
+
+    new = {paths[0]: LogisticRegression(C=0.01).fit(X, y),
+           paths[1]: RandomForestClassifier(n_estimators=5, random_state=1).fit(X, y)}
+    validate = compiled_model.validate_compiled
+
+    def fail_on_forest(model, compiled, X_check, atol=1e-6):
+        if compiled.kind == 'forest':
+            raise ValueError('Compiled model deviates from sklearn')
+        return validate(model, compiled, X_check, atol)
+
+    monkeypatch.setattr(compiled_model, 'validate_compiled', fail_on_forest)
+    with pytest.raises(ValueError):
+        publish_models(new, X)
+    # Neither the pickles nor the compiled exports were replaced
+    for path, model in old.items():
+        np.testing.assert_allclose(joblib.load(path).predict_proba(X), model.predict_proba(X))
+        np.testing.assert_allclose(CompiledModel.load(compiled_path(path)).predict_proba(X),
+                                   model.predict_proba(X), atol=1e-9)
+
+
+def test_legacy_npz_still_loads(tmp_path):
+    X, y = make_classification()
+    model = LogisticRegression().fit(X, y)
+    export_compiled(model, str(tmp_path / 'model.npz'))
+    np.testing.assert_allclose(CompiledModel.load(str(tmp_path / 'model.npz')).predict_proba(X),
+                               model.predict_proba(X), atol=1e-9)
+
+
+@pytest.mark.parametrize('model', [
+    LogisticRegression(C=0.5, max_iter=500),
+    RandomForestClassifier(n_estimators=10, max_depth=4, random_state=0),
+])
+def test_models_fitted_on_sparse_matrices(model, tmp_path):
+    from scipy import sparse as sp
+
+    X, y = make_classification()
+    X_sparse = sp.csr_matrix(X.where(X.abs() > 0.5, 0.0).to_numpy())
+    model.fit(X_sparse, y)
+    path = compiled_path(str(tmp_path / 'model.pkl'))
+    export_compiled(model, path, X_check=X_sparse, feature_names=list(X.columns))
+
+    compiled = CompiledModel.load(path)
+    assert list(compiled.feature_names_in_) == list(X.columns)
+    np.testing.assert_allclose(compiled.positive_proba(X_sparse), model.predict_proba(X_sparse)[:, 1], atol=1e-9)
+    np.testing.assert_allclose(compiled.positive_proba(X_sparse), compiled.positive_proba(X_sparse.toarray()))
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.data_io import (
+    ProcessedWriter,
+    iter_training_batches,
+    load_processed,
+    load_training_data,
+    processed_columns,
+    save_sparse_features,
+)
+
+CONFIG = {
+    "paths": {"processed": None},
+    "data": {
+        "target": "is_high_risk",
+        "drop_cols": ["is_high_risk", "customerid"],
+        "cast_bool_to_int": True,
+        "drop_object_columns": True,
+    },
+}
+
+
+def make_processed(n=50):
+    return pd.DataFrame({
+        "customerid": [f"CustomerId_{i % 7}" for i in range(n)],
+        "amount": [float(i) for i in range(n)],
+        "transaction_hour": pd.Series(range(n), dtype="int32"),
+        "productcategory_tv": [i % 2 == 0 for i in range(n)],
+        "is_high_risk": [i % 3 == 0 for i in range(n)],
+    }).astype({"is_high_risk": int})
+
+
+@pytest.mark.parametrize("ext", ["csv", "parquet", "feather"])
+def test_chunked_write_and_projected_load(tmp_path, ext):
+    if ext != "csv":
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"processed.{ext}")
+    df = make_processed()
+    with ProcessedWriter(path) as writer:
+        writer.write(df.iloc[:20])
+        writer.write(df.iloc[20:])
+
+    assert list(processed_columns(path)) == list(df.columns)
+    X, y = load_training_data(CONFIG, path)
+    assert list(X.columns) == ["amount", "transaction_hour", "productcategory_tv"]
+    assert X["productcategory_tv"].tolist() == [int(i % 2 == 0) for i in range(50)]
+    assert y.tolist() == df["is_high_risk"].tolist()
+
+
+def test_sparse_features_round_trip(tmp_path):
+    from scipy import sparse as sp
+
+    path = str(tmp_path / "processed.npz")
+    df = make_processed()
+    names = ["customerid", "amount", "productcategory_tv"]
+    X = sp.csr_matrix(np.column_stack([np.arange(50) % 7, df["amount"], df["productcategory_tv"]]))
+    save_sparse_features(path, X, df["is_high_risk"], names)
+
+    assert list(processed_columns(path)) == names + ["is_high_risk"]
+    # Readable as a plain scipy matrix too
+    assert (sp.load_npz(path) != X).nnz == 0
+
+    X_train, y = load_training_data(CONFIG, path)
+    assert sp.issparse(X_train) and X_train.shape == (50, 2)  # customerid dropped
+    assert y.tolist() == df["is_high_risk"].tolist()
+    assert load_processed(path, columns=["productcategory_tv"])["productcategory_tv"].tolist() == \
+        df["productcategory_tv"].astype(float).tolist()
+
+    rows = np.array([3, 10, 40, 41])
+    batches = list(iter_training_batches(CONFIG, rows=rows, path=path, batch_size=3))
+    assert [len(y_batch) for _, y_batch in batches] == [3, 1]
+    np.testing.assert_array_equal(sp.vstack([X_batch for X_batch, _ in batches]).toarray(), X_train[rows].toarray())
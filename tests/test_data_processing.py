@@ -1,70 +1,271 @@
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-
-def create_high_risk_label(df, snapshot_date='2025-07-01'):
-    # Ensure transaction date column is datetime
-    df['transactionstarttime'] = pd.to_datetime(df['transactionstarttime'])
-    
-    # Convert snapshot_date to datetime
-    snapshot_date = pd.to_datetime(snapshot_date)
-
-    # Aggregate per customer
-    rfm = df.groupby('customerid').agg({
+
+from src.data_processing import (
+    aggregate_rfm_inputs,
+    compare_label_methods,
+    create_high_risk_label,
+    rfm_table,
+)
+
+# ===== Preprocessing pipeline tests =====
+
+import math
+
+import numpy as np
+import pytest
+
+from src.data_processing import RowPreprocessor, build_pipeline
+
+
+def make_raw_transactions(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    customers = rng.integers(1, 40, n)
+    seconds = rng.integers(0, 60 * 86400, n).astype('timedelta64[s]')
+    amount = np.round(rng.lognormal(7, 1.5, n)) * np.where(rng.random(n) < 0.3, -1, 1)
+    return pd.DataFrame({
+        'transactionid': [f'TransactionId_{i}' for i in range(n)],
+        'customerid': [f'CustomerId_{i}' for i in customers],
+        'currencycode': 'UGX',
+        'countrycode': 256,
+        'providerid': [f'ProviderId_{i}' for i in rng.integers(1, 7, n)],
+        'productid': [f'ProductId_{i}' for i in rng.integers(1, 20, n)],
+        'productcategory': rng.choice(['airtime', 'financial_services', 'tv', 'utility_bill'], n),
+        'channelid': [f'ChannelId_{i}' for i in rng.integers(1, 5, n)],
+        'amount': amount,
+        'value': np.abs(amount).astype(int),
+        'transactionstarttime': np.datetime_as_string(np.datetime64('2018-11-15T00:00:00') + seconds) + 'Z',
+        'pricingstrategy': rng.integers(0, 5, n),
+        'fraudresult': (rng.random(n) < 0.01).astype(int),
+    })
+
+
+@pytest.mark.parametrize('parts', [None, ('hour', 'day', 'month', 'year', 'dayofweek', 'epoch_seconds')])
+def test_row_preprocessor_matches_pipeline_transform(parts):
+    raw = make_raw_transactions()
+    pipeline = build_pipeline()
+    if parts:
+        pipeline.set_params(datetime_features__parts=parts)
+    pipeline.fit(raw)
+    row_preprocessor = RowPreprocessor(pipeline)
+
+    for i in range(10):
+        record = raw.iloc[i].to_dict()
+        expected = pipeline.transform(raw.iloc[[i]]).iloc[0].to_dict()
+        actual = row_preprocessor.transform(record)
+        assert list(actual) == list(expected)
+        for col, value in expected.items():
+            if col == 'transactionstarttime':
+                continue
+            if isinstance(value, float):
+                assert math.isclose(actual[col], value, rel_tol=1e-9, abs_tol=1e-12), col
+            else:
+                assert actual[col] == value, col
+
+
+def test_row_preprocessor_parses_timestamps_like_the_batch_path():
+    raw = make_raw_transactions()
+    pipeline = build_pipeline()
+    pipeline.set_params(datetime_features__parts=('hour', 'day', 'dayofweek', 'epoch_seconds'))
+    pipeline.fit(raw)
+    row_preprocessor = RowPreprocessor(pipeline)
+    parts = ['transaction_hour', 'transaction_day', 'transaction_dayofweek', 'transaction_epoch_seconds']
+
+    record = raw.iloc[0].to_dict()
+    record['transactionstarttime'] = '2018-11-15T23:30:00Z'
+    expected = pipeline.transform(pd.DataFrame([record])).iloc[0]
+    # A 'Z' suffix, and an offset converted to UTC
+    for value in ('2018-11-15T23:30:00Z', '2018-11-16T02:30:00+03:00'):
+        actual = row_preprocessor.transform({**record, 'transactionstarttime': value})
+        assert [actual[col] for col in parts] == [expected[col] for col in parts], value
+    assert actual['transaction_day'] == 15
+
+    # Missing times, like the pipeline
+    record['transactionstarttime'] = None
+    expected = pipeline.transform(pd.DataFrame([record])).iloc[0]
+    actual = row_preprocessor.transform(record)
+    assert actual['transactionstarttime'] is None
+    np.testing.assert_allclose([actual[col] for col in parts], [expected[col] for col in parts], rtol=1e-6)
+
+
+def test_one_hot_layout_does_not_depend_on_batch():
+    raw = make_raw_transactions()
+    pipeline = build_pipeline().fit(raw)
+    full = pipeline.transform(raw)
+    single = pipeline.transform(raw.iloc[[0]])
+    assert list(single.columns) == list(full.columns)
+
+
+def test_chunked_processing_matches_in_memory(tmp_path):
+    from src.data_processing import process_data
+
+    raw = make_raw_transactions(n=600)
+    raw.loc[raw.sample(30, random_state=1).index, 'amount'] = np.nan
+    raw_path = tmp_path / 'raw.csv'
+    raw.to_csv(raw_path, index=False)
+
+    outputs = {}
+    for name, chunksize in [('full', None), ('chunked', 128)]:
+        output_path = str(tmp_path / name / 'processed.csv')
+        process_data(
+            str(raw_path), output_path,
+            pipeline_path=str(tmp_path / name / 'pipeline.pkl'),
+            store_path=str(tmp_path / name / 'store.npz'),
+            chunksize=chunksize,
+        )
+        outputs[name] = pd.read_csv(output_path)
+
+    pd.testing.assert_frame_equal(outputs['full'], outputs['chunked'], check_exact=False, rtol=1e-9)
+
+
+def test_chunked_dtype_stage_is_fitted_like_in_memory(tmp_path):
+    import joblib
+
+    from src.data_processing import process_data
+
+    raw = make_raw_transactions(n=600)
+    raw_path = tmp_path / 'raw.csv'
+    raw.to_csv(raw_path, index=False)
+
+    stages = {}
+    for name, chunksize in [('full', None), ('chunked', 128)]:
+        pipeline_path = str(tmp_path / name / 'pipeline.pkl')
+        process_data(str(raw_path), str(tmp_path / name / 'processed.csv'), pipeline_path=pipeline_path,
+                     store_path=str(tmp_path / name / 'store.npz'), chunksize=chunksize)
+        stages[name] = joblib.load(pipeline_path).named_steps['dtype_optimization']
+
+    # Integer ranges of the scaled frame only, and the same categorical IDs
+    assert stages['chunked'].int_ranges_ == stages['full'].int_ranges_
+    assert stages['chunked'].category_cols_ == stages['full'].category_cols_ == ['customerid']
+
+
+def test_sparse_output_one_hot_encodes_ids(tmp_path):
+    from src.data_processing import process_data
+    from src.utils.data_io import load_sparse_features
+
+    raw = make_raw_transactions(n=600)
+    raw_path = tmp_path / 'raw.csv'
+    raw.to_csv(raw_path, index=False)
+
+    outputs = {}
+    for name, chunksize, ext in [('dense', None, 'csv'), ('sparse', None, 'npz'), ('chunked', 128, 'npz')]:
+        output_path = str(tmp_path / name / f'processed.{ext}')
+        process_data(
+            str(raw_path), output_path,
+            pipeline_path=str(tmp_path / name / 'pipeline.pkl'),
+            store_path=str(tmp_path / name / 'store.npz'),
+            chunksize=chunksize,
+        )
+        outputs[name] = pd.read_csv(output_path) if ext == 'csv' else load_sparse_features(output_path)
+
+    dense = outputs['dense']
+    X, y, names, target = outputs['sparse']
+    assert target == 'is_high_risk' and y.tolist() == dense['is_high_risk'].tolist()
+    # IDs are one-hot columns (one per category but the first) instead of label codes
+    assert 'providerid' not in names and 'providerid_ProviderId_2' in names
+    assert 'providerid_ProviderId_1' not in names
+    provider_block = X[:, [i for i, name in enumerate(names) if name.startswith('providerid_')]]
+    np.testing.assert_array_equal(provider_block.sum(axis=1).A1, raw['providerid'] != 'ProviderId_1')
+    # Shared columns match the dense output
+    for i, name in enumerate(names):
+        if name in dense.columns:
+            np.testing.assert_allclose(X[:, i].toarray().ravel(), dense[name], rtol=1e-6, err_msg=name)
+
+    X_chunked, y_chunked, names_chunked, _ = outputs['chunked']
+    assert names_chunked == names and y_chunked.tolist() == y.tolist()
+    np.testing.assert_allclose(X_chunked.toarray(), X.toarray(), rtol=1e-9)
+
+
+def test_row_preprocessor_expands_sparse_one_hot_columns():
+    from src.data_processing import sparse_feature_matrix
+
+    raw = make_raw_transactions()
+    pipeline = build_pipeline(sparse=True).fit(raw)
+    row_preprocessor = RowPreprocessor(pipeline)
+
+    for i in range(10):
+        X, names = sparse_feature_matrix(pipeline, pipeline.transform(raw.iloc[[i]]))
+        row = row_preprocessor.transform(raw.iloc[i].to_dict())
+        # The model's features, with the IDs as one-hot columns rather than raw labels
+        assert 'providerid' not in row
+        np.testing.assert_allclose([row[name] for name in names], X.toarray()[0], rtol=1e-6, err_msg=i)
+
+
+# ===== High-risk labeling tests =====
+
+def test_rfm_table_matches_groupby_lambda_reference():
+    raw = make_raw_transactions()
+    snapshot_date = pd.to_datetime('2025-07-01')
+
+    timestamps = pd.to_datetime(raw['transactionstarttime']).dt.tz_localize(None)
+    expected = raw.assign(transactionstarttime=timestamps).groupby('customerid').agg({
         'transactionstarttime': lambda x: (snapshot_date - x.max()).days,
-        'transactionid': 'count',      # Frequency
-        'amount': 'sum'                # Monetary
-    }).rename(columns={
-        'transactionstarttime': 'Recency',
-        'transactionid': 'Frequency',
-        'amount': 'Monetary'
-    }).reset_index()
-
-    # Handle cases where monetary might be zero or missing - optional
-    rfm['Monetary'] = rfm['Monetary'].fillna(0)
-
-    # Scale RFM features
-    scaler = StandardScaler()
-    rfm_scaled = scaler.fit_transform(rfm[['Recency', 'Frequency', 'Monetary']])
-
-    # Apply KMeans clustering
-    kmeans = KMeans(n_clusters=3, random_state=42)
-    rfm['cluster'] = kmeans.fit_predict(rfm_scaled)
-
-    # Analyze cluster centers to find high-risk cluster
-    cluster_centers = kmeans.cluster_centers_
-
-    # In scaled space: High Recency = high positive value (long ago),
-    # low Frequency & Monetary = low or negative values.
-    # Find cluster with highest Recency and lowest Frequency & Monetary
-    # We'll use a heuristic: cluster with max Recency mean and min Frequency and Monetary means.
-
-    import numpy as np
-
-    recency_idx = 0
-    frequency_idx = 1
-    monetary_idx = 2
-
-    scores = []
-    for i, center in enumerate(cluster_centers):
-        # Score: high recency + low freq + low monetary
-        score = center[recency_idx] - center[frequency_idx] - center[monetary_idx]
-        scores.append((i, score))
-
-    # Cluster with max score is high risk
-    high_risk_cluster = max(scores, key=lambda x: x[1])[0]
-
-    # Assign is_high_risk label
-    rfm['is_high_risk'] = (rfm['cluster'] == high_risk_cluster).astype(int)
-
-    # Drop cluster column if you want
-    rfm = rfm.drop(columns=['cluster'])
-
-    return rfm[['customerid', 'is_high_risk']]
-
-# Usage example: 
-# rfm_labels = create_high_risk_label(df)
-# Then merge back:
-# df = df.merge(rfm_labels, on='customerid', how='left')
-# Fill any missing is_high_risk with 0 (if some customers not present in RFM)
-# df['is_high_risk'] = df['is_high_risk'].fillna(0).astype(int)
+        'transactionid': 'count',
+        'amount': 'sum'
+    })
+
+    rfm = rfm_table(aggregate_rfm_inputs(raw), '2025-07-01').set_index('customerid')
+    assert rfm['Recency'].tolist() == expected['transactionstarttime'].tolist()
+    assert rfm['Frequency'].tolist() == expected['transactionid'].tolist()
+    np.testing.assert_allclose(rfm['Monetary'], expected['amount'])
+
+
+def test_labeling_modes_are_seeded_and_comparable():
+    raw = make_raw_transactions(n=2000)
+    exact = create_high_risk_label(raw)
+    sampled = create_high_risk_label(raw, method='minibatch', sample_size=20, batch_size=64)
+
+    assert exact['customerid'].tolist() == sampled['customerid'].tolist()
+    assert set(exact['is_high_risk']) <= {0, 1}
+    pd.testing.assert_frame_equal(
+        sampled, create_high_risk_label(raw, method='minibatch', sample_size=20, batch_size=64)
+    )
+
+    report = compare_label_methods(rfm_table(aggregate_rfm_inputs(raw)), sample_size=20)
+    assert report['method'].tolist() == ['exact', 'minibatch', 'minibatch_sampled']
+    assert report.loc[0, 'agreement_with_exact'] == 1.0
+
+
+# ===== Copy-free execution tests =====
+
+def _transform_peak_bytes(pipeline, frame):
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        output = pipeline.transform(frame)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return output, peak
+
+
+def test_copy_free_pipeline_matches_and_uses_less_memory():
+    raw = make_raw_transactions(n=20000)
+    copying = build_pipeline(copy=True).fit(raw.copy())
+    in_place = build_pipeline(copy=False).fit(raw.copy())
+
+    expected, copying_peak = _transform_peak_bytes(copying, raw.copy())
+    actual, in_place_peak = _transform_peak_bytes(in_place, raw.copy())
+
+    pd.testing.assert_frame_equal(actual, expected)
+    assert in_place_peak < copying_peak
+
+
+def test_cli_pipeline_loads_outside_main(tmp_path):
+    import os
+    import subprocess
+    import sys
+
+    import joblib
+
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    (tmp_path / 'data' / 'raw').mkdir(parents=True)
+    make_raw_transactions().to_csv(tmp_path / 'data' / 'raw' / 'data.csv', index=False)
+    (tmp_path / 'config.yaml').write_text('paths:\n  processed: data/processed/processed.csv\n')
+
+    env = dict(os.environ, PYTHONPATH=repo)
+    subprocess.run([sys.executable, '-m', 'src.data_processing'], cwd=tmp_path, env=env, check=True,
+                   capture_output=True)
+
+    pipeline = joblib.load(tmp_path / 'models' / 'preprocessing_pipeline.pkl')
+    assert type(pipeline.named_steps['datetime_features']).__module__ == 'src.data_processing'
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from src.data_processing import DtypeOptimizer
+from src.utils.dtypes import optimize_dtypes
+
+
+def test_columns_are_narrowed_by_kind_and_range():
+    df = pd.DataFrame({
+        'flag': [True, False, True],
+        'onehot': pd.Series([True, False, False], dtype=object),
+        'code': [0, 120, 7],
+        'count': [0, 40000, 3],
+        'amount': [1.5, -2.0, 3.25],
+        'providerid': ['ProviderId_1', 'ProviderId_2', 'ProviderId_1'],
+    })
+    optimized = optimize_dtypes(df, category_cols=['providerid'])
+    assert optimized.dtypes.to_dict() == {
+        'flag': np.int8, 'onehot': np.int8, 'code': np.int8, 'count': np.int32,
+        'amount': np.float32, 'providerid': 'category',
+    }
+    pd.testing.assert_frame_equal(optimized.astype(df.dtypes.to_dict()), df, check_dtype=False)
+    # The input frame is left alone
+    assert df['code'].dtype == np.int64
+
+
+def test_values_outside_the_fitted_range_widen_instead_of_wrapping():
+    optimizer = DtypeOptimizer().fit(pd.DataFrame({'code': [0, 5, 100]}))
+    assert optimizer.transform(pd.DataFrame({'code': [3]}))['code'].dtype == np.int8
+
+    # 300 does not fit int8, -70000 does not fit int16
+    for value, dtype in ((300, np.int16), (-70000, np.int32)):
+        served = optimizer.transform(pd.DataFrame({'code': [3, value]}))
+        assert served['code'].dtype == dtype
+        assert served['code'].tolist() == [3, value]
+
+
+def test_only_repeating_id_columns_become_categoricals():
+    df = pd.DataFrame({
+        'customerid': ['CustomerId_1', 'CustomerId_2'] * 5,
+        'transactionid': [f'TransactionId_{i}' for i in range(10)],
+    })
+    optimizer = DtypeOptimizer(category_cols=['customerid', 'transactionid', 'absent']).fit(df)
+    assert optimizer.category_cols_ == ['customerid']
+    optimized = optimizer.transform(df)
+    assert isinstance(optimized['customerid'].dtype, pd.CategoricalDtype)
+    assert not isinstance(optimized['transactionid'].dtype, pd.CategoricalDtype)
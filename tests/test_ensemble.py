@@ -0,0 +1,97 @@
+import time
+
+import numpy as np
+import pytest
+
+from src.ensemble import EnsembleScorer, fit_stacker
+
+
+def make_score_fn(delays, probabilities, failing=()):
+    def score(name, features):
+        time.sleep(delays[name])
+        if name in failing:
+            raise RuntimeError(f"{name} is broken")
+        return np.full(len(features), probabilities[name])
+    return score
+
+
+def test_models_run_concurrently_and_are_weighted():
+    score = make_score_fn({"fast": 0.05, "slow": 0.1}, {"fast": 0.2, "slow": 0.6})
+    scorer = EnsembleScorer(score, models=["fast", "slow"], weights={"fast": 1, "slow": 3}, fallback="fast")
+
+    result = scorer.score(np.zeros((4, 2)))
+    assert result["model_used"] == "ensemble" and not result["fallback"]
+    np.testing.assert_allclose(result["probability"], 0.25 * 0.2 + 0.75 * 0.6)
+    assert set(result["timings_ms"]) == {"fast", "slow", "total"}
+    # About the slower model, not the sum of both
+    assert result["timings_ms"]["total"] < 140
+
+
+def test_budget_and_errors_fall_back_to_fast_model():
+    score = make_score_fn({"fast": 0.0, "slow": 0.2}, {"fast": 0.2, "slow": 0.6})
+    scorer = EnsembleScorer(score, models=["fast", "slow"], fallback="fast", latency_budget_ms=20)
+
+    result = scorer.score(np.zeros((3, 2)))
+    assert result["model_used"] == "fast" and result["fallback"]
+    np.testing.assert_allclose(result["probability"], 0.2)
+    assert result["timings_ms"]["total"] < 150
+    # Per-call budget overrides the default (once the late job has finished)
+    time.sleep(0.25)
+    assert scorer.score(np.zeros((3, 2)), budget_ms=1000)["model_used"] == "ensemble"
+
+    broken = EnsembleScorer(make_score_fn({"fast": 0.0, "slow": 0.0}, {"fast": 0.2, "slow": 0.6}, failing={"slow"}),
+                            models=["fast", "slow"], fallback="fast")
+    assert broken.score(np.zeros((1, 2)))["model_used"] == "fast"
+
+
+def test_repeated_over_budget_calls_do_not_queue_slow_jobs():
+    calls = []
+    slow = make_score_fn({"fast": 0.0, "slow": 0.2}, {"fast": 0.2, "slow": 0.6})
+
+    def score(name, features):
+        calls.append(name)
+        return slow(name, features)
+
+    scorer = EnsembleScorer(score, models=["fast", "slow"], fallback="fast", latency_budget_ms=10)
+    for _ in range(20):
+        result = scorer.score(np.zeros((2, 2)))
+        assert result["model_used"] == "fast"
+        assert result["timings_ms"]["total"] < 100
+    # The busy model is skipped instead of getting a job per call
+    assert calls.count("fast") == 20
+    assert calls.count("slow") <= 2
+
+    # Once the late job is done, the ensemble answers again
+    time.sleep(0.25)
+    assert scorer.score(np.zeros((2, 2)), budget_ms=1000)["model_used"] == "ensemble"
+
+
+def test_concurrent_calls_without_budget_wait_for_every_model():
+    from concurrent.futures import ThreadPoolExecutor
+
+    score = make_score_fn({"fast": 0.0, "slow": 0.05}, {"fast": 0.2, "slow": 0.6})
+    scorer = EnsembleScorer(score, models=["fast", "slow"], fallback="fast")
+    with ThreadPoolExecutor(4) as callers:
+        results = list(callers.map(lambda _: scorer.score(np.zeros((2, 2))), range(4)))
+    assert [result["model_used"] for result in results] == ["ensemble"] * 4
+    for result in results:
+        np.testing.assert_allclose(result["probability"], 0.4)
+
+
+def test_stacked_ensemble():
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, 500)
+    probabilities = {
+        "a": np.clip(0.3 + 0.4 * y + rng.normal(0, 0.2, 500), 0.01, 0.99),
+        "b": rng.uniform(size=500),
+    }
+    stacker = fit_stacker(probabilities, y)
+    assert stacker["coef"]["a"] > abs(stacker["coef"]["b"])
+
+    scorer = EnsembleScorer(lambda name, X: probabilities[name], models=["a", "b"],
+                            method="stacked", stacker=stacker)
+    proba = scorer.score(np.zeros((500, 1)))["probability"]
+    assert ((proba > 0.5) == y).mean() > 0.8
+
+    with pytest.raises(ValueError):
+        EnsembleScorer(lambda name, X: None, models=["a", "b"], method="stacked", stacker={"coef": {"a": 1.0}})
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from sklearn.metrics import average_precision_score, confusion_matrix, f1_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from src.evaluate import StreamingMetrics, holdout_rows
+from src.utils.data_io import iter_training_batches, save_processed
+
+
+def make_scores(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    y = (rng.random(n) < 0.3).astype(int)
+    proba = 1 / (1 + np.exp(-(rng.normal(0, 1, n) + 1.5 * y - 0.8)))
+    return y, proba
+
+
+def test_streaming_metrics_match_sklearn():
+    y, proba = make_scores()
+    metrics = StreamingMetrics()
+    for start in range(0, len(y), 3000):
+        metrics.update(y[start:start + 3000], proba[start:start + 3000])
+    report = metrics.summary(n_bootstrap=200)
+
+    np.testing.assert_array_equal(report['confusion_matrix'], confusion_matrix(y, proba > 0.5))
+    assert abs(report['1']['f1'] - f1_score(y, proba > 0.5)) < 1e-12
+    assert abs(report['f1_from_histogram'] - report['1']['f1']) < 1e-12
+    assert abs(report['roc_auc'] - roc_auc_score(y, proba)) < 1e-3
+    assert abs(report['average_precision'] - average_precision_score(y, proba)) < 5e-3
+
+    low, high = report['ci']['roc_auc']
+    assert low < report['roc_auc'] < high and high - low < 0.05
+
+
+def test_holdout_batches_follow_the_training_split(tmp_path):
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({'x': rng.normal(size=1000), 'is_high_risk': (rng.random(1000) < 0.2).astype(int)})
+    path = str(tmp_path / 'processed.parquet')
+    save_processed(df, path)
+    config = {
+        'paths': {'processed': path},
+        'data': {'target': 'is_high_risk', 'drop_cols': ['is_high_risk']},
+        'split': {'test_size': 0.2, 'random_state': 42, 'stratify': True},
+        'output': {},
+    }
+
+    _, X_test, _, y_test = train_test_split(df[['x']], df['is_high_risk'], test_size=0.2,
+                                            random_state=42, stratify=df['is_high_risk'])
+    rows = holdout_rows(config)
+    np.testing.assert_array_equal(rows, np.sort(X_test.index))
+
+    batches = list(iter_training_batches(config, rows=rows, batch_size=128))
+    X = pd.concat([X for X, _ in batches])
+    np.testing.assert_allclose(X['x'].to_numpy(), df.loc[rows, 'x'].to_numpy(), rtol=1e-6)
+    assert len(X) == len(y_test)
@@ -0,0 +1,88 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from src.explain import ExplanationService, LinearShap, save_background, summarize_background
+from src.model_registry import ModelRegistry
+
+
+def make_data(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n, 4)), columns=['a', 'b', 'c', 'd'])
+    y = (X['a'] - X['b'] + rng.normal(0, 0.5, n) > 0).astype(int)
+    return X, y
+
+
+def test_linear_shap_is_exact_and_additive():
+    X, y = make_data()
+    model = LogisticRegression().fit(X, y)
+    explainer = LinearShap(model, summarize_background(X))
+
+    values = explainer.shap_values(X)
+    np.testing.assert_allclose(values.sum(axis=1) + explainer.expected_value, model.decision_function(X))
+    # A feature at its background mean contributes nothing
+    at_mean = X.mean().to_numpy()[None, :]
+    np.testing.assert_allclose(explainer.shap_values(at_mean), 0, atol=1e-12)
+
+
+def test_service_caches_rows_and_rebuilds_per_version(tmp_path):
+    X, y = make_data()
+    model_path, background_path = tmp_path / 'model.pkl', tmp_path / 'background.npz'
+    joblib.dump(LogisticRegression().fit(X, y), model_path)
+    save_background(X, str(background_path))
+    service = ExplanationService(ModelRegistry({'logreg': str(model_path)}, check_interval=0),
+                                 background_path=str(background_path), cache_size=50)
+
+    first = service.explain('logreg', X.head(10))
+    calls = []
+    explainer = service.explainer('logreg')[1]
+    original = explainer.shap_values
+    explainer.shap_values = lambda rows: calls.append(len(rows)) or original(rows)
+
+    again = service.explain('logreg', X.head(12))
+    np.testing.assert_allclose(again['values'][:10], first['values'])
+    assert calls == [2]  # only the two new rows were computed
+    assert first['feature_names'] == ['a', 'b', 'c', 'd']
+
+    # Retrained model: new version, new explainer, no stale cache hits
+    joblib.dump(LogisticRegression(C=0.01).fit(X, y), model_path)
+    retrained = service.explain('logreg', X.head(10))
+    assert retrained['version'] != first['version']
+    assert not np.allclose(retrained['values'], first['values'])
+
+
+def test_tree_explainer_matches_forest_probability(tmp_path):
+    pytest.importorskip('shap')
+    X, y = make_data()
+    model_path, background_path = tmp_path / 'model.pkl', tmp_path / 'background.npz'
+    model = RandomForestClassifier(n_estimators=10, max_depth=4, random_state=0).fit(X, y)
+    joblib.dump(model, model_path)
+    save_background(X, str(background_path))
+    service = ExplanationService(ModelRegistry({'rf': str(model_path)}), background_path=str(background_path))
+
+    result = service.explain('rf', X.head(20))
+    np.testing.assert_allclose(result['values'].sum(axis=1) + result['expected_value'],
+                               model.predict_proba(X.head(20))[:, 1], atol=1e-6)
+
+
+def test_chunked_pool_values_match_in_memory(tmp_path):
+    from src.explain import compute_shap_values, global_importance, stratified_sample
+
+    X, y = make_data(n=2500)
+    model = LogisticRegression().fit(X, y)
+    sample = stratified_sample(X, y, 1000)
+    assert abs(len(sample) - 1000) <= 2
+    assert abs(y[sample.index].mean() - y.mean()) < 0.01
+
+    values, inputs, expected = compute_shap_values(model, X, str(tmp_path), chunk_size=300, n_jobs=2)
+    reference = LinearShap(model, summarize_background(X))
+    np.testing.assert_allclose(values, reference.shap_values(X))
+    np.testing.assert_array_equal(inputs, X.to_numpy())
+    assert expected == pytest.approx(reference.expected_value)
+
+    importance = global_importance(values, X.columns, chunk_size=700)
+    np.testing.assert_allclose(importance[X.columns], np.abs(reference.shap_values(X)).mean(axis=0))
+    assert set(importance.index[:2]) == {'a', 'b'}
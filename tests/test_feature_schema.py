@@ -0,0 +1,115 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from src.data_processing import CategoricalEncoder
+from src.feature_schema import FeatureSchema, schema_for
+
+
+def make_schema():
+    X = pd.DataFrame({'amount': [1.0, 2.0, 3.0, 4.0], 'providerid': [0, 1, 0, 1], 'fraudresult': [0, 0, 1, 1]})
+    model = LogisticRegression().fit(X, [0, 1, 0, 1])
+    encoder = CategoricalEncoder(label_encode_cols=['providerid'])
+    encoder.fit(pd.DataFrame({'providerid': ['ProviderId_1', 'ProviderId_5']}))
+    return model, FeatureSchema.from_model(model, Pipeline([('categorical_encoding', encoder)]))
+
+
+def test_rows_follow_model_column_order():
+    model, schema = make_schema()
+    request = {'fraudresult': None, 'providerid': 'ProviderId_5', 'amount': 2.5, 'customerid': 'ignored'}
+
+    row = schema.row(request)
+    assert row.dtype == np.float32
+    assert row[:2].tolist() == [2.5, 1.0]  # label looked up in the encoder table
+    assert math.isnan(row[2])
+
+    # Unknown labels fall back to their numeric value, else the unknown code
+    assert schema.row({'amount': 1, 'providerid': '7', 'fraudresult': 0}).tolist() == [1.0, 7.0, 0.0]
+    assert schema.row({'amount': 1, 'providerid': 'ProviderId_9', 'fraudresult': 0}).tolist() == [1.0, 2.0, 0.0]
+
+
+def test_matrix_and_columns_agree():
+    _, schema = make_schema()
+    requests = [
+        {'amount': 1.0, 'providerid': 'ProviderId_1', 'fraudresult': 1},
+        {'amount': 3.0, 'providerid': 'ProviderId_5', 'fraudresult': 0},
+    ]
+    columns = {name: [r[name] for r in requests] for name in requests[0]}
+    np.testing.assert_array_equal(schema.matrix(requests), schema.from_columns(columns, 2))
+
+
+def test_missing_request_fields_fail_fast():
+    model, schema = make_schema()
+    with pytest.raises(ValueError, match='fraudresult'):
+        schema.check_fields({'amount', 'providerid'})
+    schema.check_fields({'amount', 'providerid'}, optional={'fraudresult'})
+    assert schema_for(model) is schema_for(model)
+
+
+def test_schemas_are_cached_per_model_and_pipeline():
+    model, _ = make_schema()
+    pipelines = []
+    for label in ('ProviderId_1', 'ProviderId_7'):
+        encoder = CategoricalEncoder(label_encode_cols=['providerid'])
+        encoder.fit(pd.DataFrame({'providerid': [label]}))
+        pipelines.append(Pipeline([('categorical_encoding', encoder)]))
+
+    bare = schema_for(model)
+    first, reloaded = schema_for(model, pipelines[0]), schema_for(model, pipelines[1])
+    # A schema built without a pipeline is not handed to callers that have one
+    assert first is not bare and not bare.tables
+    assert first is schema_for(model, pipelines[0])
+    # A reloaded pipeline gets its own tables
+    assert reloaded is not first
+    assert 'ProviderId_7' in reloaded.tables['providerid']
+
+
+def test_raw_category_expands_to_one_hot_columns():
+    X = pd.DataFrame({'amount': [1.0, 2.0, 3.0], 'productcategory_tv': [0, 1, 0], 'productcategory_utility_bill': [0, 0, 1]})
+    model = LogisticRegression().fit(X, [0, 1, 0])
+    encoder = CategoricalEncoder(one_hot_cols=['productcategory'])
+    encoder.fit(pd.DataFrame({'productcategory': ['airtime', 'tv', 'utility_bill']}))
+    schema = FeatureSchema.from_model(model, Pipeline([('categorical_encoding', encoder)]))
+
+    schema.check_fields({'amount', 'productcategory'})
+    flags = {'amount': 2.0, 'productcategory_tv': 1, 'productcategory_utility_bill': 0}
+    np.testing.assert_array_equal(schema.row({'amount': 2.0, 'productcategory': 'tv'}), schema.row(flags))
+    # First and unseen categories are all zeros
+    assert schema.row({'amount': 1.0, 'productcategory': 'airtime'}).tolist() == [1.0, 0.0, 0.0]
+    assert schema.row({'amount': 1.0, 'productcategory': 'movies'}).tolist() == [1.0, 0.0, 0.0]
+
+    columns = {'amount': [2.0, 3.0], 'productcategory': ['tv', 'utility_bill']}
+    np.testing.assert_array_equal(
+        schema.from_columns(columns, 2),
+        schema.matrix([{'amount': 2.0, 'productcategory': 'tv'}, {'amount': 3.0, 'productcategory': 'utility_bill'}]),
+    )
+
+
+def test_normalized_rows_match_pipeline_transform():
+    from test_data_processing import make_raw_transactions
+
+    from src.data_processing import build_pipeline
+
+    raw = make_raw_transactions()
+    raw.loc[raw.index[:5], 'pricingstrategy'] = np.nan
+    pipeline = build_pipeline().fit(raw)
+    processed = pipeline.transform(raw)
+    X = processed.drop(columns=['transactionid', 'customerid', 'transactionstarttime']).select_dtypes('number')
+    model = LogisticRegression(max_iter=500).fit(X, np.arange(len(X)) % 2)
+    schema = FeatureSchema.from_model(model, pipeline)
+
+    # Requests carry raw fields plus the (unscaled) aggregates and time parts
+    steps = pipeline.named_steps
+    unscaled = steps['aggregate_features'].transform(steps['datetime_features'].transform(raw))
+    requests = [
+        {**raw.iloc[i].to_dict(), **unscaled.iloc[i].to_dict(),
+         'pricingstrategy': None if i < 5 else raw['pricingstrategy'].iloc[i]}
+        for i in range(20)
+    ]
+    features = schema.normalize(schema.matrix(requests))
+    np.testing.assert_allclose(features, X.iloc[:20].to_numpy(dtype=np.float64), rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(model.predict_proba(features)[:, 1], model.predict_proba(X.iloc[:20])[:, 1], atol=1e-5)
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from src.feature_store import CustomerFeatureStore
+
+
+def make_transactions(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'customerid': [f'CustomerId_{i}' for i in rng.integers(1, 30, n)],
+        'amount': rng.normal(1000, 400, n).round(),
+    })
+
+
+def test_store_matches_groupby_aggregates(tmp_path):
+    df = make_transactions()
+    expected = df.groupby('customerid')['amount'].agg(['sum', 'mean', 'count', 'std']).fillna(0)
+
+    # Mix batch and single updates, starting from a tiny capacity to force growth
+    store = CustomerFeatureStore(capacity=2)
+    store.update_many(df['customerid'][:200], df['amount'][:200])
+    for customer_id, amount in zip(df['customerid'][200:250], df['amount'][200:250]):
+        store.update(customer_id, amount)
+    store.update_many(df['customerid'][250:], df['amount'][250:])
+
+    path = str(tmp_path / 'store.npz')
+    store.save(path)
+    stats = CustomerFeatureStore.load(path).lookup(expected.index)
+
+    np.testing.assert_allclose(stats['total_amount'], expected['sum'])
+    np.testing.assert_allclose(stats['average_amount'], expected['mean'])
+    np.testing.assert_array_equal(stats['transaction_count'], expected['count'])
+    np.testing.assert_allclose(stats['amount_std'], expected['std'])
+
+
+def test_unknown_customer():
+    store = CustomerFeatureStore.from_frame(make_transactions())
+    assert store.get('CustomerId_unknown') is None
+    assert store.lookup(['CustomerId_unknown'])['transaction_count'][0] == 0
+
+
+def test_concurrent_updates_are_not_lost():
+    import threading
+
+    store = CustomerFeatureStore(capacity=1)
+
+    def record(worker):
+        for i in range(2000):
+            store.update(f'CustomerId_{worker}_{i % 300}', 1.0)
+            store.lookup([f'CustomerId_{worker}_0'])
+
+    threads = [threading.Thread(target=record, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(store) == 1200
+    assert store.lookup(store.ids)['transaction_count'].sum() == 8000
+
+
+def test_pipeline_references_the_live_store_by_path(tmp_path):
+    import joblib
+
+    from src.data_processing import RowPreprocessor, build_pipeline
+    from src.feature_store import register_store, shared_store
+    from test_data_processing import make_raw_transactions
+
+    raw = make_raw_transactions()
+    path = str(tmp_path / 'store.npz')
+    store = register_store(CustomerFeatureStore.from_frame(raw), path)
+    store.save(path)
+    pipeline = build_pipeline(feature_store=store, store_path=path).fit(raw)
+
+    # The pickled pipeline does not carry a frozen copy of the store
+    joblib.dump(pipeline, tmp_path / 'pipeline.pkl')
+    loaded = joblib.load(tmp_path / 'pipeline.pkl')
+    assert loaded.named_steps['aggregate_features'].store is None
+
+    # Online updates to the live store reach both transform paths
+    shared_store(path).update('CustomerId_new', 250.0)
+    record = {**raw.iloc[0].to_dict(), 'customerid': 'CustomerId_new'}
+    batch = loaded.named_steps['aggregate_features'].transform(pd.DataFrame([record]))
+    assert batch['total_amount'].iloc[0] == 250.0
+    assert RowPreprocessor(loaded).aggregate_step.live_store().get('CustomerId_new')['transaction_count'] == 1
@@ -0,0 +1,27 @@
+import numpy as np
+
+from src.utils.metrics import LatencyHistogram, MetricsRegistry
+
+
+def test_histogram_quantiles_within_bucket_error():
+    durations = np.random.default_rng(0).lognormal(np.log(1e-3), 1.0, 20000)
+    histogram = LatencyHistogram()
+    for seconds in durations:
+        histogram.observe(seconds)
+
+    assert histogram.count == len(durations)
+    for q in (0.5, 0.95, 0.99):
+        expected = np.quantile(durations, q)
+        assert abs(histogram.quantile(q) - expected) / expected < 0.1
+
+
+def test_prometheus_rendering():
+    registry = MetricsRegistry(name='latency_seconds')
+    with registry.timer('predict', model='logreg'):
+        pass
+    registry.observe('predict', 0.5, model='logreg')
+
+    text = registry.render_prometheus()
+    assert '# TYPE latency_seconds summary' in text
+    assert 'latency_seconds{stage="predict",model="logreg",quantile="0.99"} 0.5' in text
+    assert 'latency_seconds_count{stage="predict",model="logreg"} 2' in text
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from src.api.micro_batcher import MicroBatcher
+
+
+def run_concurrently(batcher, items):
+    async def main():
+        return await asyncio.gather(*[batcher.submit(item) for item in items])
+    return asyncio.run(main())
+
+
+def test_concurrent_requests_are_coalesced():
+    batches = []
+
+    def score(items):
+        batches.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(score, max_batch_size=8, max_wait_ms=50)
+    assert run_concurrently(batcher, list(range(20))) == [i * 2 for i in range(20)]
+    assert batches == [8, 8, 4]
+
+
+def test_batch_errors_reach_every_caller():
+    def score(items):
+        raise RuntimeError("model failed")
+
+    batcher = MicroBatcher(score, max_batch_size=4, max_wait_ms=1)
+    with pytest.raises(RuntimeError):
+        run_concurrently(batcher, [1, 2, 3])
+    # The worker survives a failed batch (and a new event loop)
+    batcher.score_fn = lambda items: items
+    assert run_concurrently(batcher, [5]) == [5]
+
+
+def test_failing_item_does_not_fail_its_batch():
+    def score(items):
+        if 'bad' in items:
+            raise ValueError("cannot score 'bad'")
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(score, max_batch_size=8, max_wait_ms=50)
+
+    async def main():
+        return await asyncio.gather(*[batcher.submit(item) for item in ['a', 'bad', 'c']], return_exceptions=True)
+
+    good, bad, other = asyncio.run(main())
+    assert (good, other) == ('A', 'C')
+    assert isinstance(bad, ValueError)
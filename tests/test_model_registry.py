@@ -0,0 +1,87 @@
+import os
+
+import joblib
+from sklearn.linear_model import LogisticRegression
+
+from src.model_registry import ModelRegistry
+
+
+def test_registry_caches_and_hot_swaps(tmp_path):
+    path = str(tmp_path / "model.pkl")
+    joblib.dump(LogisticRegression(C=1.0), path)
+    registry = ModelRegistry({"logreg": path}, check_interval=0)
+
+    first = registry.get("logreg")
+    assert registry.get("logreg") is first
+
+    # Touching the file without changing it must not trigger a reload
+    os.utime(path)
+    assert registry.get("logreg") is first
+
+    # Replace the artifact atomically, as a retrain would
+    joblib.dump(LogisticRegression(C=5.0), path + ".tmp")
+    os.replace(path + ".tmp", path)
+    second = registry.get("logreg")
+    assert second is not first
+    assert second.C == 5.0
+    assert registry.versions()["logreg"]["sha256"].startswith(registry.versions()["logreg"]["version"])
+
+
+def test_registry_memory_maps_model_arrays(tmp_path):
+    import functools
+
+    import numpy as np
+
+    path = str(tmp_path / "model.pkl")
+    X = np.random.default_rng(0).normal(size=(50, 3))
+    joblib.dump(LogisticRegression().fit(X, X[:, 0] > 0), path)
+    registry = ModelRegistry({"logreg": path}, loader=functools.partial(joblib.load, mmap_mode="r"))
+
+    model = registry.get("logreg")
+    assert isinstance(model.coef_, np.memmap)
+    assert model.predict(X).shape == (50,)
+
+
+def test_failed_reload_keeps_the_last_good_model(tmp_path):
+    from src.model_registry import dump_atomic
+
+    path = str(tmp_path / "model.pkl")
+    dump_atomic(LogisticRegression(C=1.0), path)
+    assert os.listdir(tmp_path) == ["model.pkl"]
+    registry = ModelRegistry({"logreg": path}, check_interval=0)
+    first = registry.get("logreg")
+
+    # A half-written pickle, as an in-place dump would expose
+    with open(path, "wb") as f:
+        f.write(b"\x80\x04truncated")
+    assert registry.get("logreg") is first
+
+    # The next complete file is picked up
+    dump_atomic(LogisticRegression(C=5.0), path)
+    assert registry.get("logreg").C == 5.0
+
+
+def test_served_versions_report_the_compiled_export(tmp_path, monkeypatch):
+    import numpy as np
+
+    import src.predict as predict
+    from src.compiled_model import CompiledModel, compiled_path, export_compiled
+
+    X = np.random.default_rng(0).normal(size=(50, 3))
+    paths = {"logreg": str(tmp_path / "logreg.pkl"), "random_forest": str(tmp_path / "forest.pkl")}
+    for path in paths.values():
+        joblib.dump(LogisticRegression().fit(X, X[:, 0] > 0), path)
+    export_compiled(joblib.load(paths["logreg"]), compiled_path(paths["logreg"]))
+    monkeypatch.setattr(predict, "MODEL_PATHS", paths)
+    monkeypatch.setattr(predict, "registry", ModelRegistry(paths))
+    monkeypatch.setattr(predict, "compiled_registry", ModelRegistry(
+        {name: compiled_path(path) for name, path in paths.items()}, loader=CompiledModel.load))
+
+    assert predict.served_versions() == {}
+    for name in paths:
+        predict.get_model(name)
+    versions = predict.served_versions()
+    # logreg is scored from its compiled export, the forest from its pickle
+    assert versions["logreg"]["artifact"] == "compiled"
+    assert versions["logreg"]["path"] == compiled_path(paths["logreg"])
+    assert versions["random_forest"]["artifact"] == "pickle"
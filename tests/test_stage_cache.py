@@ -0,0 +1,98 @@
+import os
+
+import pandas as pd
+
+from src.data_processing import build_pipeline, process_data
+from src.utils.stage_cache import StageCache, fit_transform_cached, stage_key
+from tests.test_data_processing import make_raw_transactions
+
+
+def test_cached_pipeline_matches_uncached(tmp_path, capsys):
+    raw = make_raw_transactions(300)
+    cache = StageCache(str(tmp_path / 'cache'))
+
+    expected = build_pipeline().fit_transform(raw.copy())
+    first, key = fit_transform_cached(build_pipeline(), raw.copy(), cache, 'input')
+    capsys.readouterr()
+    pipeline = build_pipeline()
+    second, cached_key = fit_transform_cached(pipeline, raw.copy(), cache, 'input')
+
+    assert key == cached_key
+    # Every stage of the second run came from the cache
+    output = capsys.readouterr().out
+    assert output.count('Stage cache hit') == len(pipeline.steps) and 'Stage computed' not in output
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(second, expected)
+    # Loaded stages are fitted and usable for serving
+    pd.testing.assert_frame_equal(pipeline.transform(raw.copy()), expected)
+
+
+def test_param_change_invalidates_downstream_stages():
+    a, b = build_pipeline(), build_pipeline()
+    b.set_params(scaling__copy=False)
+    keys_a, keys_b = ['input'], ['input']
+    for (_, step_a), (_, step_b) in zip(a.steps, b.steps):
+        keys_a.append(stage_key(keys_a[-1], step_a))
+        keys_b.append(stage_key(keys_b[-1], step_b))
+    # Stages before "scaling" are shared, it and everything after are not
+    assert keys_a[:5] == keys_b[:5]
+    assert all(x != y for x, y in zip(keys_a[5:], keys_b[5:]))
+
+
+def test_helper_or_version_change_invalidates_every_stage(monkeypatch):
+    import inspect
+
+    from src.utils import stage_cache
+
+    step = build_pipeline().steps[0][1]
+    key = stage_key('input', step)
+
+    def edited(obj):
+        source = stage_cache.inspect.getsource(obj)
+        return source + '# edited' if inspect.ismodule(obj) else source
+
+    for name, value in (('_source', edited), ('CODE_VERSION', stage_cache.CODE_VERSION + 1)):
+        with monkeypatch.context() as patch:
+            patch.setattr(stage_cache, name, value)
+            stage_cache.helpers_fingerprint.cache_clear()
+            assert stage_key('input', step) != key, name
+    stage_cache.helpers_fingerprint.cache_clear()
+    assert stage_key('input', step) == key
+
+
+def test_lru_eviction_keeps_recent_entries(tmp_path):
+    cache = StageCache(str(tmp_path), max_bytes=10 ** 9)
+    payload = b'x' * 10000
+    for key in ['a', 'b', 'c']:
+        cache.put(key, blob=payload)
+        os.utime(os.path.join(str(tmp_path), key), (0, {'a': 1, 'b': 2, 'c': 3}[key]))
+    cache.get('a', 'blob')  # touch: "b" is now least recently used
+
+    cache.max_bytes = 2 * cache.size() // 3 + 1
+    cache.evict()
+    assert cache.has('a') and cache.has('c') and not cache.has('b')
+
+
+def test_process_data_reuses_cache(tmp_path, capsys, monkeypatch):
+    from src import data_processing
+    from src.utils import stage_cache
+
+    raw_path = tmp_path / 'raw.csv'
+    make_raw_transactions(300).to_csv(raw_path, index=False)
+    outputs, logs = [], []
+    for i in range(3):
+        if i == 2:
+            # An edit to the labeling code
+            source = stage_cache._source
+            monkeypatch.setattr(stage_cache, '_source', lambda obj: source(obj) + (
+                '# edited' if obj is data_processing.label_rfm_clusters else ''))
+        out = tmp_path / f'processed_{i}.parquet'
+        process_data(str(raw_path), str(out), str(tmp_path / 'pipeline.pkl'), str(tmp_path / 'store.npz'),
+                     cache_dir=str(tmp_path / 'cache'))
+        outputs.append(pd.read_parquet(out))
+        logs.append(capsys.readouterr().out)
+    pd.testing.assert_frame_equal(outputs[0], outputs[1])
+    assert 'Stage cache hit' not in logs[0]
+    assert 'Stage cache hit: rfm_labels' in logs[1] and 'Stage computed' not in logs[1]
+    # The labels are recomputed, the pipeline stages still come from the cache
+    assert 'Stage cache hit: rfm_labels' not in logs[2] and 'Stage computed' not in logs[2]
@@ -0,0 +1,24 @@
+import pandas as pd
+
+from benchmarks.synthetic import generate_transactions, write_transactions
+from src.data_processing import process_data
+
+
+def test_generator_is_seeded():
+    a = generate_transactions(500, seed=3)
+    pd.testing.assert_frame_equal(a, generate_transactions(500, seed=3))
+    assert not a.equals(generate_transactions(500, seed=4))
+    assert a['TransactionId'].is_unique
+
+
+def test_generated_file_runs_through_process_data(tmp_path):
+    raw_path = tmp_path / 'raw.csv'
+    write_transactions(str(raw_path), 2500, seed=0, chunk_rows=1000)
+    raw = pd.read_csv(raw_path)
+    assert len(raw) == 2500 and raw['TransactionId'].is_unique
+
+    out = tmp_path / 'processed.parquet'
+    process_data(str(raw_path), str(out), str(tmp_path / 'pipeline.pkl'), str(tmp_path / 'store.npz'))
+    processed = pd.read_parquet(out)
+    assert len(processed) == 2500
+    assert {'transaction_hour', 'total_amount', 'is_high_risk'} <= set(processed.columns)
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.timestamps import ISO_Z_FORMAT, datetime_parts, detect_format, parse_timestamps
+
+
+def make_times(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    seconds = rng.integers(-10 ** 8, 2 * 10 ** 9, n)
+    return pd.Series(np.datetime_as_string(np.datetime64('1970-01-01T00:00:00') + seconds) + 'Z')
+
+
+def test_parse_matches_pandas_including_invalid_values():
+    values = pd.concat([make_times(), pd.Series([
+        None, np.nan, 'garbage', '2019-02-30T00:00:00Z', '2019-02-28T24:00:00Z', '2019-01-01T00:00:00Zx',
+        '2019-01-01T00:00:00Z', '2019-01-01T00:00:00Z',
+    ])], ignore_index=True)
+    assert detect_format(values.dropna().to_numpy()) == ISO_Z_FORMAT
+
+    parsed = parse_timestamps(values)
+    pd.testing.assert_series_equal(parsed, pd.to_datetime(values, errors='coerce'))
+    # Already parsed columns pass through
+    assert parse_timestamps(parsed) is parsed
+
+
+def test_other_formats_fall_back_to_pandas():
+    values = pd.Series(['2019/01/02 03:04:05', '2019/01/02 03:04:05', None, '2020/12/31 23:59:59'])
+    assert detect_format(values.dropna().to_numpy()) is None
+    pd.testing.assert_series_equal(parse_timestamps(values), pd.to_datetime(values, errors='coerce'))
+
+
+def test_parts_match_dt_accessors():
+    values = make_times()
+    parsed = pd.to_datetime(values)
+    parts = datetime_parts(parse_timestamps(values))
+    for part in ('hour', 'day', 'month', 'year', 'dayofweek'):
+        np.testing.assert_array_equal(parts[part], getattr(parsed.dt, part).to_numpy())
+        assert parts[part].dtype == np.int32
+    np.testing.assert_array_equal(parts['epoch_seconds'], parsed.astype('int64').to_numpy() // 10 ** 6)
+
+    with_missing = datetime_parts(parse_timestamps(pd.Series(['2019-01-01T05:00:00Z', None])), ('hour',))
+    np.testing.assert_array_equal(with_missing['hour'], [5.0, np.nan])
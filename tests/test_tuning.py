@@ -0,0 +1,50 @@
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV
+
+from src.tuning import make_cv_splits, search_model
+
+
+def make_data():
+    return make_classification(n_samples=300, n_features=8, weights=[0.8], random_state=0)
+
+
+def test_warm_started_forest_matches_grid_search():
+    X, y = make_data()
+    splits = make_cv_splits(X, y, n_splits=3)
+    grid = {"n_estimators": [10, 20], "max_depth": [3, None]}
+    estimator = RandomForestClassifier(random_state=0)
+
+    warm = search_model(estimator, grid, X, y, splits, {"strategy": "warm_start", "scoring": "f1"})
+    exhaustive = GridSearchCV(estimator, grid, cv=splits, scoring="f1").fit(X, y)
+
+    assert warm.best_params_ == exhaustive.best_params_
+    assert np.isclose(warm.best_score_, exhaustive.best_score_)
+
+
+def test_strategies_share_splits_and_return_fitted_models():
+    X, y = make_data()
+    splits = make_cv_splits(X, y, n_splits=3)
+    grid = {"C": [0.1, 1, 10], "penalty": ["l2"]}
+    for strategy in ("grid", "halving", "warm_start"):
+        result = search_model(LogisticRegression(max_iter=1000), grid, X, y, splits,
+                              {"strategy": strategy, "scoring": "f1"})
+        assert result.best_params_["C"] in grid["C"]
+        assert result.best_estimator_.predict_proba(X).shape == (300, 2)
+
+
+def test_warm_start_path_switches_liblinear_to_lbfgs(capsys):
+    X, y = make_data()
+    splits = make_cv_splits(X, y, n_splits=3)
+    estimator = LogisticRegression(solver="liblinear", max_iter=1000)
+    result = search_model(estimator, {"C": [0.1, 1, 10]}, X, y, splits, {"strategy": "warm_start", "scoring": "f1"})
+    assert result.best_estimator_.solver == "lbfgs"
+    # The switch is reported and recorded with the best parameters
+    assert "[WARN]" in capsys.readouterr().out
+    assert result.best_params_["solver"] == "lbfgs"
+    # The configured estimator and the other strategies keep liblinear
+    assert estimator.solver == "liblinear"
+    grid = search_model(estimator, {"C": [0.1, 1, 10]}, X, y, splits, {"strategy": "grid", "scoring": "f1"})
+    assert grid.best_estimator_.solver == "liblinear"
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+from src.utils.vocabulary import Vocabulary
+
+
+def test_codes_match_label_encoder_with_unknown_bucket():
+    values = np.array(['ProviderId_5', 'ProviderId_1', 'ProviderId_10', 'ProviderId_1'], dtype=object)
+    vocab = Vocabulary.fit(values)
+    np.testing.assert_array_equal(vocab.encode(values), LabelEncoder().fit_transform(values))
+
+    batch = vocab.encode(['ProviderId_10', 'ProviderId_99', None])
+    assert batch.dtype == np.int64
+    assert batch.tolist() == [1, vocab.unknown_code, vocab.unknown_code]
+    # Single values go through the same table
+    assert [vocab.encode_one(v) for v in ['ProviderId_10', 'ProviderId_99', None]] == batch.tolist()
+
+
+def test_missing_label_is_a_known_category():
+    vocab = Vocabulary.fit(['b', np.nan, 'a'])
+    assert len(vocab) == 3 and vocab.unknown_code == 3
+    assert vocab.encode(['a', np.nan, 'c']).tolist() == [0, 2, 3]
+    assert vocab.encode_one(np.nan) == 2
+
+
+@pytest.mark.parametrize('drop_first', [True, False])
+def test_one_hot_dense_and_sparse_share_the_layout(drop_first):
+    vocab = Vocabulary.fit(['airtime', 'tv', 'utility_bill'])
+    values = ['tv', 'airtime', 'movies', 'utility_bill']
+    dense = vocab.one_hot(values, drop_first=drop_first)
+    sparse = vocab.one_hot(values, drop_first=drop_first, sparse=True)
+
+    assert dense.dtype == bool and dense.shape == (4, 3 - drop_first)
+    np.testing.assert_array_equal(sparse.toarray(), dense)
+    # Unknown (and dropped first) labels are all-zero rows
+    assert dense.sum(axis=1).tolist() == [1, int(not drop_first), 0, 1]
+    np.testing.assert_array_equal(vocab.one_hot(['tv'], drop_first=drop_first), dense[:1])